@@ -1,10 +1,36 @@
 import { type NextRequest, NextResponse } from "next/server"
+import { callPricingService } from "@/lib/pricing-service"
 
-// Mock object detection API endpoint
-// In production, this would integrate with actual ML models
+interface DetectResponse {
+  camera_id: string
+  detector: string
+  results: {
+    detections: { name: string; confidence: number; bbox: number[] }[]
+    stock_updates: { product_id: string; shelf_count: number; cameras: number; camera_id: string }[]
+  }[]
+}
+
+// Runs the shelf detection worker in the Python pricing service when
+// PRICING_SERVICE_URL is set; the mock detections below are the fallback
 export async function POST(request: NextRequest) {
   try {
-    const { imageData } = await request.json()
+    const { imageData, cameraId, location } = await request.json()
+
+    const startTime = Date.now()
+    const detected = await callPricingService<DetectResponse>("/detect", {
+      imageData,
+      camera_id: cameraId,
+      location,
+    })
+    if (detected && detected.results.length > 0) {
+      return NextResponse.json({
+        success: true,
+        detections: detected.results[0].detections,
+        stockUpdates: detected.results[0].stock_updates,
+        detector: detected.detector,
+        processingTime: `${((Date.now() - startTime) / 1000).toFixed(3)}s`,
+      })
+    }
 
     // Simulate processing time
     await new Promise((resolve) => setTimeout(resolve, 1000))
@@ -15,11 +41,6 @@ export async function POST(request: NextRequest) {
       { name: "banana", confidence: 0.87, bbox: [300, 150, 400, 250] },
     ]
 
-    // In real implementation, you would:
-    // 1. Decode base64 image data
-    // 2. Run inference with YOLOv8/TensorFlow model
-    // 3. Return actual detection results
-
     return NextResponse.json({
       success: true,
       detections: mockDetections,
@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server"
 import type { ProductData } from "@/lib/pathway-client"
+import { callPricingService } from "@/lib/pricing-service"
 
 // Enhanced pricing model that integrates with live data
 interface PricingRecommendation {
@@ -277,12 +278,45 @@ class RealtimePricingEngine {
   }
 }
 
-// Global pricing engine instance
+// Local engine, used only when the Python pricing service (PRICING_SERVICE_URL) is not available
 const pricingEngine = new RealtimePricingEngine()
 
+interface BatchRecommendations {
+  recommendations: Partial<PricingRecommendation>[]
+  count: number
+  model_version: string
+}
+
+// One call for every SKU in the refresh: the Python model prices the batch with a
+// single vectorized pass and keeps the only price history. `fields` limits each
+// recommendation to those keys, so price-only refreshes skip reasoning and metrics.
+async function recommendPrices(products: ProductData[], fields?: string[]): Promise<BatchRecommendations> {
+  const remote = await callPricingService<BatchRecommendations>("/recommendations", { products, fields })
+  if (remote) {
+    return remote
+  }
+
+  const recommendations = products.map((product) => {
+    const recommendation = pricingEngine.calculateOptimalPrice(product)
+    return fields
+      ? Object.fromEntries(fields.map((field) => [field, recommendation[field as keyof PricingRecommendation]]))
+      : recommendation
+  })
+  return {
+    recommendations,
+    count: recommendations.length,
+    model_version: "v2.1-realtime",
+  }
+}
+
 export async function POST(request: Request) {
   try {
-    const { product_data } = await request.json()
+    const { product_data, products, fields } = await request.json()
+
+    if (Array.isArray(products)) {
+      console.log("[v0] Realtime pricing batch request for", products.length, "products")
+      return NextResponse.json(await recommendPrices(products, Array.isArray(fields) ? fields : undefined))
+    }
 
     if (!product_data) {
       return NextResponse.json({ error: "Product data is required" }, { status: 400 })
@@ -291,7 +325,7 @@ export async function POST(request: Request) {
     console.log("[v0] Realtime pricing request for:", product_data.product_id)
 
     // Generate pricing recommendation
-    const recommendation = pricingEngine.calculateOptimalPrice(product_data)
+    const [recommendation] = (await recommendPrices([product_data])).recommendations
 
     console.log("[v0] Generated pricing recommendation:", {
       product_id: recommendation.product_id,
@@ -312,14 +346,20 @@ export async function GET(request: Request) {
     const action = searchParams.get("action")
 
     switch (action) {
-      case "performance":
-        return NextResponse.json(pricingEngine.getModelPerformance())
+      case "performance": {
+        const remote = await callPricingService("/model")
+        return NextResponse.json(remote ?? pricingEngine.getModelPerformance())
+      }
 
       case "history": {
         const productId = searchParams.get("product_id")
         if (!productId) {
           return NextResponse.json({ error: "Product ID required" }, { status: 400 })
         }
+        const remote = await callPricingService(`/price/history?product_id=${encodeURIComponent(productId)}`)
+        if (remote) {
+          return NextResponse.json(remote)
+        }
         const history = pricingEngine.getPriceHistory(productId)
         return NextResponse.json({ product_id: productId, history })
       }
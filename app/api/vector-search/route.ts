@@ -1,6 +1,8 @@
 import { NextResponse } from "next/server"
+import { callPricingService } from "@/lib/pricing-service"
 
-// Mock vector search functionality (in production, this would interface with Python vector store)
+// Served by the Python ProductVectorStore through the pricing service when
+// PRICING_SERVICE_URL is set; the mock products below are the fallback
 interface ProductSearchResult {
   product_id: string
   name: string
@@ -79,7 +81,7 @@ function calculateSimilarity(query: string, product: any): number {
 
 export async function POST(request: Request) {
   try {
-    const { query, top_k = 5, filters = {} } = await request.json()
+    const { query, top_k = 5, page = 1, filters = {} } = await request.json()
 
     if (!query) {
       return NextResponse.json({ error: "Query is required" }, { status: 400 })
@@ -87,6 +89,18 @@ export async function POST(request: Request) {
 
     console.log("[v0] Vector search query:", query)
 
+    const remote = await callPricingService("/search", { query, page, page_size: top_k, filters })
+    if (remote) {
+      return NextResponse.json({
+        query,
+        results: remote.results,
+        total_found: remote.total_found,
+        page: remote.page,
+        has_more: remote.has_more,
+        search_time_ms: remote.search_time_ms,
+      })
+    }
+
     // Filter products based on criteria
     let filteredProducts = mockProducts
 
@@ -128,11 +142,41 @@ export async function POST(request: Request) {
   }
 }
 
+async function searchRemote(action: string | null, searchParams: URLSearchParams): Promise<any | null> {
+  switch (action) {
+    case "similar": {
+      const productId = searchParams.get("product_id")
+      if (!productId) return null
+      const data = await callPricingService(`/search/similar?product_id=${encodeURIComponent(productId)}&page_size=3`)
+      return data && { similar_products: data.results }
+    }
+    case "expiring": {
+      const days = searchParams.get("days") || "7"
+      const data = await callPricingService(`/search/expiring?days=${encodeURIComponent(days)}&page_size=100`)
+      return data && { expiring_products: data.expiring_products, total_found: data.total_found }
+    }
+    case "low-stock": {
+      const threshold = searchParams.get("threshold") || "20"
+      const data = await callPricingService(`/search/low-stock?threshold=${encodeURIComponent(threshold)}&page_size=100`)
+      return data && { low_stock_products: data.low_stock_products, total_found: data.total_found }
+    }
+    case "analytics":
+      return callPricingService("/search/analytics")
+    default:
+      return null
+  }
+}
+
 export async function GET(request: Request) {
   try {
     const { searchParams } = new URL(request.url)
     const action = searchParams.get("action")
 
+    const remote = await searchRemote(action, searchParams)
+    if (remote) {
+      return NextResponse.json(remote)
+    }
+
     switch (action) {
       case "similar": {
         const productId = searchParams.get("product_id")
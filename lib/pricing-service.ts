@@ -0,0 +1,34 @@
+// Bridge to the Python pricing service (scripts/pricing_service.py), which keeps the
+// pricing model and vector store warm in one process. Set PRICING_SERVICE_URL
+// (e.g. http://127.0.0.1:8765) to enable it; when unset or unreachable, callers get
+// null and fall back to their built-in logic.
+
+const PRICING_SERVICE_URL = process.env.PRICING_SERVICE_URL
+const PRICING_SERVICE_TIMEOUT_MS = Number.parseInt(process.env.PRICING_SERVICE_TIMEOUT_MS || "2000")
+
+export function pricingServiceEnabled(): boolean {
+  return Boolean(PRICING_SERVICE_URL)
+}
+
+export async function callPricingService<T = any>(path: string, body?: unknown): Promise<T | null> {
+  if (!PRICING_SERVICE_URL) return null
+
+  try {
+    const response = await fetch(`${PRICING_SERVICE_URL.replace(/\/$/, "")}${path}`, {
+      method: body === undefined ? "GET" : "POST",
+      headers: { "Content-Type": "application/json" },
+      body: body === undefined ? undefined : JSON.stringify(body),
+      cache: "no-store",
+      signal: AbortSignal.timeout(PRICING_SERVICE_TIMEOUT_MS),
+    })
+
+    if (!response.ok) {
+      console.warn(`[v0] Pricing service ${path} returned ${response.status}`)
+      return null
+    }
+    return (await response.json()) as T
+  } catch (error) {
+    console.warn(`[v0] Pricing service unavailable for ${path}:`, error)
+    return null
+  }
+}
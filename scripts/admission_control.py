@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+class AdmissionController:
+    """Decides whether a pricing request may use the full ML path
+
+    Requests are shed to the rule-based kernel when too many are already in
+    flight, when the rolling p99 latency of the full path exceeds the latency
+    budget, or when the caller's own deadline is shorter than the expected
+    full-path latency. While degraded because of latency, one probe request is
+    let through every `probe_interval_s` so the latency window can recover;
+    each probe refreshes the percentiles and the pre-spike samples age out
+    after `max_sample_age_s`, so recovery is seen within a few probes.
+    Only successful requests contribute latency samples.
+    """
+
+    def __init__(self, latency_budget_ms: float = 50.0, max_in_flight: int = 32,
+                 window_size: int = 200, min_samples: int = 20,
+                 probe_interval_s: float = 0.5, max_sample_age_s: float = 10.0):
+        self.latency_budget_ms = latency_budget_ms
+        self.max_in_flight = max_in_flight
+        self.min_samples = min_samples
+        self.probe_interval_s = probe_interval_s
+        self.max_sample_age_s = max_sample_age_s
+
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        # (monotonic time, latency ms) of recent successful full-path requests
+        self.latencies_ms = deque(maxlen=window_size)
+        self._p99_ms = 0.0
+        self._p50_ms = 0.0
+        self._samples_since_refresh = 0
+        self._last_admit_time = 0.0
+
+        self.served_full = 0
+        self.shed_counts = {}
+        self.fallback_counts = {}
+
+    def _refresh_percentiles(self):
+        cutoff = time.monotonic() - self.max_sample_age_s
+        while self.latencies_ms and self.latencies_ms[0][0] < cutoff:
+            self.latencies_ms.popleft()
+        if self.latencies_ms:
+            samples = np.fromiter((latency for _, latency in self.latencies_ms), dtype=np.float64)
+            self._p50_ms, self._p99_ms = np.percentile(samples, [50, 99])
+        else:
+            self._p50_ms = self._p99_ms = 0.0
+        self._samples_since_refresh = 0
+
+    def _degraded(self) -> bool:
+        return len(self.latencies_ms) >= self.min_samples and self._p99_ms > self.latency_budget_ms
+
+    def _shed_reason(self, deadline_ms: Optional[float]) -> Optional[str]:
+        if self.in_flight >= self.max_in_flight:
+            return 'queue_depth'
+
+        warmed_up = len(self.latencies_ms) >= self.min_samples
+        if warmed_up and deadline_ms is not None and self._p50_ms > deadline_ms:
+            return 'deadline'
+
+        if warmed_up and self._p99_ms > self.latency_budget_ms:
+            # Let an occasional probe through so the window reflects recovery
+            if time.monotonic() - self._last_admit_time < self.probe_interval_s:
+                return 'p99_latency'
+            # Admit as a probe, first ageing out samples from before the spike
+            self._refresh_percentiles()
+
+        return None
+
+    def try_admit(self, deadline_ms: Optional[float] = None, items: int = 1) -> Optional[str]:
+        """Admit a request to the full path, or return the reason it was shed
+
+        A batch of `items` products takes one in-flight slot. Every admitted
+        request must be followed by a call to `release`.
+        """
+        with self.lock:
+            reason = self._shed_reason(deadline_ms)
+            if reason is not None:
+                self.shed_counts[reason] = self.shed_counts.get(reason, 0) + items
+                return reason
+
+            self.in_flight += 1
+            self._last_admit_time = time.monotonic()
+            return None
+
+    def release(self, elapsed_seconds: float, succeeded: bool = True, items: int = 1):
+        """Record the latency of an admitted request and free its slot
+
+        Batches of `items` products record their per-product latency, so a
+        large batch does not look like one very slow request.
+        """
+        with self.lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if not succeeded:
+                # A failed request's latency says nothing about the full path
+                return
+            self.served_full += items
+            self.latencies_ms.append((time.monotonic(), elapsed_seconds * 1000 / max(items, 1)))
+
+            # Percentiles are refreshed in batches to keep admission O(1), but on
+            # every sample while degraded so recovery is noticed immediately
+            self._samples_since_refresh += 1
+            if (self._samples_since_refresh >= 16 or len(self.latencies_ms) <= self.min_samples
+                    or self._degraded()):
+                self._refresh_percentiles()
+
+    def record_fallback(self, reason: str):
+        """Count a request served by rules for a reason other than shedding"""
+        with self.lock:
+            self.fallback_counts[reason] = self.fallback_counts.get(reason, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Served/shed counters and the current latency picture"""
+        with self.lock:
+            total_shed = sum(self.shed_counts.values())
+            total = self.served_full + total_shed + sum(self.fallback_counts.values())
+            return {
+                'served_full': self.served_full,
+                'shed': dict(self.shed_counts),
+                'fallback': dict(self.fallback_counts),
+                'shed_rate': total_shed / total if total else 0.0,
+                'in_flight': self.in_flight,
+                'rolling_p50_ms': float(self._p50_ms),
+                'rolling_p99_ms': float(self._p99_ms),
+                'latency_budget_ms': self.latency_budget_ms,
+                'max_in_flight': self.max_in_flight
+            }
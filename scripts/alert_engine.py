@@ -0,0 +1,296 @@
+"""
+Incremental Alert Engine
+
+Alert rules are registered once. Stock rules are evaluated only for rows
+that changed in an update batch (stream rows or simulator deltas); expiry
+rules are driven by a min-heap of the next instant each product's
+days-to-expiry changes, so a clock tick only touches products whose alert
+state can actually change. Active alerts are deduplicated per
+(alert type, product) and read back in priority order.
+
+Rows may carry an absolute expiry date or a relative `days_to_expiry`;
+relative values are anchored to the end of that many days from the start
+of the current day, so resending an unchanged row is a no-op.
+"""
+
+import heapq
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SECONDS_PER_DAY = 86400
+
+SEVERITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+
+AlertKey = Tuple[str, str]
+
+def _field(record: Dict[str, Any], *names: str) -> Any:
+    """First present value among canonical and CSV/demo column names"""
+    for name in names:
+        value = record.get(name)
+        if value is not None:
+            return value
+    return None
+
+class ThresholdRule:
+    """Severity tiers for a numeric product field
+
+    `tiers` is a list of (threshold, severity) checked in order; the first
+    tier the value falls under (strictly below, or at-or-below when
+    `inclusive`) wins. `action_threshold` marks alerts that need action.
+    """
+
+    def __init__(self, alert_type: str, tiers: List[Tuple[float, str]], action_threshold: float,
+                 inclusive: bool = False):
+        self.alert_type = alert_type
+        self.tiers = sorted(tiers)
+        self.action_threshold = action_threshold
+        self.inclusive = inclusive
+        self.limit = max(threshold for threshold, _ in tiers)
+
+    def matches(self, value: float, threshold: float) -> bool:
+        return value <= threshold if self.inclusive else value < threshold
+
+    def severity(self, value: Optional[float]) -> Optional[str]:
+        if value is None:
+            return None
+        for threshold, severity in self.tiers:
+            if self.matches(value, threshold):
+                return severity
+        return None
+
+    def action_required(self, value: float) -> bool:
+        return self.matches(value, self.action_threshold)
+
+class LowStockRule(ThresholdRule):
+    def __init__(self, tiers: Optional[List[Tuple[float, str]]] = None, action_threshold: float = 15):
+        super().__init__('low_stock', tiers or [(10, 'high'), (20, 'medium')], action_threshold)
+
+    def message(self, value: float) -> str:
+        return f"Only {int(value)} units remaining"
+
+class ExpiryRule(ThresholdRule):
+    def __init__(self, tiers: Optional[List[Tuple[float, str]]] = None, action_threshold: float = 2):
+        super().__init__('expiring', tiers or [(1, 'high'), (3, 'medium')], action_threshold, inclusive=True)
+
+    def message(self, value: float) -> str:
+        if value < 0:
+            return "Expired"
+        return f"Expires in {int(value)} day(s)"
+
+class AlertEngine:
+    def __init__(self, rules: Optional[List[ThresholdRule]] = None):
+        self.stock_rules: List[LowStockRule] = []
+        self.expiry_rules: List[ExpiryRule] = []
+        for rule in rules if rules is not None else [ExpiryRule(), LowStockRule()]:
+            self.register_rule(rule)
+
+        self.products: Dict[str, Dict[str, Any]] = {}
+        self.stock_levels: Dict[str, float] = {}
+        self.expiry_seconds: Dict[str, int] = {}
+        self.active: Dict[AlertKey, Dict[str, Any]] = {}
+
+        # (fire_at_seconds, product_key, generation); stale entries are skipped on pop
+        self.expiry_heap: List[Tuple[int, str, int]] = []
+        self.expiry_generation: Dict[str, int] = {}
+
+        self.evaluations = 0
+
+    def register_rule(self, rule: ThresholdRule):
+        """Register a rule once; stock rules run on row changes, expiry rules on time"""
+        if isinstance(rule, ExpiryRule):
+            self.expiry_rules.append(rule)
+        else:
+            self.stock_rules.append(rule)
+
+    @property
+    def expiry_horizon_days(self) -> float:
+        return max((rule.limit for rule in self.expiry_rules), default=-1)
+
+    @staticmethod
+    def product_key(record: Dict[str, Any]) -> str:
+        return str(_field(record, 'product_id', 'Product_ID', 'name', 'Product_Name'))
+
+    def _expiry_instant(self, record: Dict[str, Any], day_start_seconds: int) -> Optional[int]:
+        days = _field(record, 'days_to_expiry', 'Days_to_Expiry')
+        if days is not None:
+            # Last second of the day `days` days from today: stable for the whole day
+            return day_start_seconds + (int(days) + 1) * SECONDS_PER_DAY - 1
+        expiry_date = _field(record, 'expiry_date', 'Expiration_Date')
+        if expiry_date is None:
+            return None
+        try:
+            from pricing_context import parse_datetime
+            return int(parse_datetime(expiry_date).timestamp())
+        except Exception:
+            return None
+
+    def update(self, records: Iterable[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Apply changed product rows; returns alerts raised, escalated or resolved"""
+        now = now or datetime.now()
+        now_seconds = int(now.timestamp())
+        day_start_seconds = int(now.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
+        changes = []
+
+        for record in records:
+            key = self.product_key(record)
+            product = self.products.setdefault(key, {})
+            product.update(record)
+
+            stock = _field(record, 'stock_left', 'Stock_Quantity')
+            if stock is not None and self.stock_levels.get(key) != float(stock):
+                self.stock_levels[key] = float(stock)
+                for rule in self.stock_rules:
+                    changes.extend(self._evaluate(rule, key, float(stock), now))
+
+            expiry = self._expiry_instant(record, day_start_seconds)
+            if expiry is not None and self.expiry_seconds.get(key) != expiry:
+                self.expiry_seconds[key] = expiry
+                self.expiry_generation[key] = self.expiry_generation.get(key, 0) + 1
+                changes.extend(self._evaluate_expiry(key, now_seconds, now))
+
+        self._compact_heap()
+        return changes
+
+    def remove(self, keys: Iterable[str], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Stop tracking products; their active alerts come back resolved"""
+        now = now or datetime.now()
+        removed = set(keys)
+        changes = [
+            dict(self.active.pop(alert_key), status='resolved', timestamp=now.isoformat())
+            for alert_key in [alert_key for alert_key in self.active if alert_key[1] in removed]
+        ]
+        for key in removed:
+            self.products.pop(key, None)
+            self.stock_levels.pop(key, None)
+            self.expiry_seconds.pop(key, None)
+            # Any scheduled check for the product is now stale
+            self.expiry_generation.pop(key, None)
+        self._compact_heap()
+        return changes
+
+    def sync(self, records: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Apply a full catalog snapshot: update its rows and retire products missing from it"""
+        changes = self.update(records, now)
+        present = {self.product_key(record) for record in records}
+        changes.extend(self.remove([key for key in self.products if key not in present], now))
+        return changes
+
+    def _compact_heap(self):
+        """Drop superseded expiry checks once they outnumber the live ones"""
+        if len(self.expiry_heap) > 2 * len(self.expiry_seconds) + 64:
+            self.expiry_heap = [entry for entry in self.expiry_heap
+                                if entry[2] == self.expiry_generation.get(entry[1])]
+            heapq.heapify(self.expiry_heap)
+
+    def advance(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Re-evaluate only products whose days-to-expiry changed since the last tick"""
+        now = now or datetime.now()
+        now_seconds = int(now.timestamp())
+        changes = []
+        while self.expiry_heap and self.expiry_heap[0][0] <= now_seconds:
+            _, key, generation = heapq.heappop(self.expiry_heap)
+            if generation == self.expiry_generation.get(key):
+                changes.extend(self._evaluate_expiry(key, now_seconds, now))
+        return changes
+
+    def _evaluate_expiry(self, key: str, now_seconds: int, now: datetime) -> List[Dict[str, Any]]:
+        expiry = self.expiry_seconds[key]
+        days = (expiry - now_seconds) // SECONDS_PER_DAY
+        changes = []
+        for rule in self.expiry_rules:
+            changes.extend(self._evaluate(rule, key, days, now))
+
+        # Next instant days-to-expiry drops: into the alert horizon, or by one more day
+        horizon = self.expiry_horizon_days
+        if days >= 0 and horizon >= 0:
+            next_days = min(days, horizon + 1)
+            fire_at = expiry - next_days * SECONDS_PER_DAY + 1
+            heapq.heappush(self.expiry_heap, (int(fire_at), key, self.expiry_generation[key]))
+        return changes
+
+    def _evaluate(self, rule: ThresholdRule, key: str, value: float, now: datetime) -> List[Dict[str, Any]]:
+        """Raise, update or resolve one (rule, product) alert"""
+        self.evaluations += 1
+        alert_key = (rule.alert_type, key)
+        severity = rule.severity(value)
+        existing = self.active.get(alert_key)
+
+        if severity is None:
+            if existing is None:
+                return []
+            del self.active[alert_key]
+            return [dict(existing, status='resolved', timestamp=now.isoformat())]
+
+        message = rule.message(value)
+        if existing is not None and existing['severity'] == severity and existing['message'] == message:
+            return []
+
+        product = self.products[key]
+        name = _field(product, 'name', 'Product_Name') or key
+        alert = {
+            'id': f"{rule.alert_type}_{name}",
+            'type': rule.alert_type,
+            'severity': severity,
+            'product_id': key,
+            'product_name': name,
+            'message': message,
+            'value': value,
+            'timestamp': now.isoformat(),
+            'action_required': rule.action_required(value),
+            'status': 'escalated' if existing is not None else 'raised'
+        }
+        self.active[alert_key] = alert
+        return [alert]
+
+    def get_alerts(self, limit: Optional[int] = None, alert_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Active alerts, most severe and most urgent first"""
+        alerts = self.active.values()
+        if alert_type is not None:
+            alerts = [alert for alert in alerts if alert['type'] == alert_type]
+        sort_key = lambda alert: (SEVERITY_RANK.get(alert['severity'], len(SEVERITY_RANK)),
+                                  not alert['action_required'], alert['value'])
+        if limit is None:
+            return sorted(alerts, key=sort_key)
+        return heapq.nsmallest(limit, alerts, key=sort_key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tracked_products': len(self.products),
+            'active_alerts': len(self.active),
+            'scheduled_expiry_checks': len(self.expiry_heap),
+            'evaluations': self.evaluations
+        }
+
+if __name__ == "__main__":
+    from datetime import timedelta
+    import random
+    import time
+
+    engine = AlertEngine()
+    rng = random.Random(42)
+    now = datetime.now()
+    catalog = [
+        {'product_id': str(i), 'name': f"Product {i}", 'stock_left': rng.randint(0, 200),
+         'days_to_expiry': rng.randint(0, 30)}
+        for i in range(100_000)
+    ]
+
+    start = time.perf_counter()
+    engine.update(catalog, now)
+    print(f"Initial load: {len(engine.active)} active alerts in {time.perf_counter() - start:.2f}s")
+
+    evaluations = engine.evaluations
+    deltas = [{'product_id': str(rng.randrange(100_000)), 'stock_left': rng.randint(0, 200)} for _ in range(1000)]
+    start = time.perf_counter()
+    changes = engine.update(deltas, now)
+    print(f"1000 stock deltas: {len(changes)} alert changes, {engine.evaluations - evaluations} evaluations "
+          f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    evaluations = engine.evaluations
+    start = time.perf_counter()
+    changes = engine.advance(now + timedelta(days=1))
+    print(f"Advance one day: {len(changes)} alert changes, {engine.evaluations - evaluations} evaluations "
+          f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    for alert in engine.get_alerts(limit=5):
+        print(f"  [{alert['severity']}] {alert['product_name']}: {alert['message']}")
@@ -0,0 +1,371 @@
+"""
+Pricing Policy Backtester
+
+Replays inventory snapshots day by day through a pricing policy and
+simulates demand, sell-through and expiry waste for every SKU at once.
+Policies are callables mapping the day's state arrays to a price array, so
+the ML ensemble, the Q-table and every rule profile can be compared on the
+same scenarios. Scenario grids (policy x demand/elasticity assumptions x
+seed) run across a process pool.
+
+Given one snapshot, demand is simulated forward from it. Given a dated
+series of snapshots (e.g. successive inventory CSV exports), each one is
+replayed until the next snapshot's date, re-anchoring stock and expiry to
+what was actually recorded instead of letting the simulation drift.
+
+Usage:
+    python scripts/backtest.py [csv_path ...] [days]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from demand_forecast import SALES_VOLUME_PERIOD_DAYS
+from pricing_rules import apply_rule_pricing, days_until, parse_expiry_dates
+from product_table import numeric_column
+
+# Same bins and actions as public/data/q-table.txt / dynamic_pricing_app_full.py
+Q_DAYS_TO_EXPIRY_BINS = [0, 2, 5, 10, 30, 100]
+Q_STOCK_BINS = [0, 10, 20, 50, 100, 1000]
+Q_ACTION_DISCOUNTS = np.array([0.0, 0.10, 0.20])
+
+DEFAULT_ELASTICITY = -0.8
+
+class InventorySnapshot:
+    """Column arrays describing the catalog at the start of a backtest"""
+
+    def __init__(self, product_ids: List[str], base_price, stock, days_to_expiry,
+                 daily_demand, elasticity, shelf_life_days=None):
+        self.product_ids = list(product_ids)
+        self.base_price = np.asarray(base_price, dtype=np.float64)
+        self.stock = np.asarray(stock, dtype=np.float64)
+        self.days_to_expiry = np.asarray(days_to_expiry, dtype=np.int64)
+        self.daily_demand = np.asarray(daily_demand, dtype=np.float64)
+        self.elasticity = np.asarray(elasticity, dtype=np.float64)
+        if shelf_life_days is None:
+            shelf_life_days = np.clip(self.days_to_expiry, 3, 30)
+        self.shelf_life_days = np.asarray(shelf_life_days, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], now: Optional[datetime] = None) -> 'InventorySnapshot':
+        """Build a snapshot from normalized product records (or simulator rows)"""
+        from realtime_pricing_model import CATEGORY_ELASTICITY
+
+        expiry = parse_expiry_dates([record.get('expiry_date') for record in records])
+        days = days_until(expiry, now, default=14)
+        elasticity = [
+            CATEGORY_ELASTICITY.get(str(record.get('category', '')).lower(), DEFAULT_ELASTICITY)
+            for record in records
+        ]
+        sales_volume = numeric_column(records, 'sales_volume', 0)
+
+        return cls(
+            product_ids=[record.get('product_id', str(i)) for i, record in enumerate(records)],
+            base_price=numeric_column(records, 'current_price', 0),
+            stock=numeric_column(records, 'stock_left', 0, np.int64),
+            days_to_expiry=days,
+            daily_demand=np.maximum(sales_volume / SALES_VOLUME_PERIOD_DAYS, 0.1),
+            elasticity=elasticity
+        )
+
+    @classmethod
+    def from_simulator(cls, simulator, now: Optional[datetime] = None) -> 'InventorySnapshot':
+        """Build a snapshot from InventorySimulator's current products"""
+        return cls.from_records(simulator.products, now)
+
+    @classmethod
+    def from_csv(cls, csv_path: str) -> Tuple[Optional[datetime], 'InventorySnapshot']:
+        """(as-of date, snapshot) for an inventory CSV export
+
+        The as-of date is the latest Date_Received in the file rather than
+        today, so historical CSVs do not start out fully expired.
+        """
+        import pandas as pd
+        from inventory_schema import load_inventory_records
+
+        received = pd.to_datetime(pd.read_csv(csv_path, usecols=['Date_Received'])['Date_Received'],
+                                  errors='coerce', format='mixed')
+        as_of = received.max().to_pydatetime() if received.notna().any() else None
+        return as_of, cls.from_records(load_inventory_records(csv_path), now=as_of)
+
+# ---------------------------------------------------------------------------
+# Policies: callables taking the day's state dict and returning prices
+# ---------------------------------------------------------------------------
+
+class RuleProfilePolicy:
+    """Price with a named profile of the shared rule table"""
+
+    def __init__(self, profile: str):
+        self.profile = profile
+
+    def __call__(self, state: Dict[str, np.ndarray]) -> np.ndarray:
+        prices, _ = apply_rule_pricing(state['base_price'], state['days_to_expiry'], state['stock'],
+                                       profile=self.profile)
+        return prices
+
+class NoDiscountPolicy:
+    """Baseline: always charge the base price"""
+
+    def __call__(self, state: Dict[str, np.ndarray]) -> np.ndarray:
+        return state['base_price'].copy()
+
+def build_default_q_table() -> np.ndarray:
+    """The tabular policy defined in public/data/q-table.txt"""
+    q_table = np.zeros((len(Q_DAYS_TO_EXPIRY_BINS) + 1, len(Q_STOCK_BINS) + 1, 3))
+    for i in range(q_table.shape[0]):
+        for j in range(q_table.shape[1]):
+            if i <= 2 and j >= 3:
+                q_table[i, j] = [0.2, 0.3, 0.5]  # Favor 20%
+            elif i <= 3 and j >= 2:
+                q_table[i, j] = [0.3, 0.4, 0.3]  # Balanced
+            else:
+                q_table[i, j] = [0.7, 0.2, 0.1]  # Favor 0%
+    return q_table / q_table.sum(axis=2, keepdims=True)
+
+class QTablePolicy:
+    """Greedy action of the (days-to-expiry bin, stock bin) Q-table"""
+
+    def __init__(self, q_table: Optional[np.ndarray] = None, q_table_path: str = "q_table.npy"):
+        if q_table is None:
+            q_table = np.load(q_table_path) if os.path.exists(q_table_path) else build_default_q_table()
+        self.greedy_discount = Q_ACTION_DISCOUNTS[np.argmax(q_table, axis=2)]
+
+    def __call__(self, state: Dict[str, np.ndarray]) -> np.ndarray:
+        day_bins = np.digitize(state['days_to_expiry'], Q_DAYS_TO_EXPIRY_BINS)
+        stock_bins = np.digitize(state['stock'], Q_STOCK_BINS)
+        return state['base_price'] * (1 - self.greedy_discount[day_bins, stock_bins])
+
+class ModelPolicy:
+    """Ensemble price from a trained RealtimePricingModel, one batch per day
+
+    Pickles as its model path, so scenario grid workers load their own copy
+    of the saved model.
+    """
+
+    def __init__(self, model=None, product_fields: Optional[List[Dict[str, Any]]] = None,
+                 model_path: Optional[str] = None):
+        self.model = model
+        self.product_fields = product_fields
+        self.model_path = model_path or (model.model_path if model is not None else None)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['model'] = None
+        return state
+
+    def __call__(self, state: Dict[str, np.ndarray]) -> np.ndarray:
+        if self.model is None:
+            from realtime_pricing_model import RealtimePricingModel
+
+            self.model = RealtimePricingModel(model_path=self.model_path)
+            self.model.load_model()
+        n = len(state['base_price'])
+        fields = self.product_fields or [{} for _ in range(n)]
+        products = [
+            dict(fields[i], product_id=state['product_ids'][i], current_price=float(state['base_price'][i]),
+                 stock_left=int(state['stock'][i]), days_to_expiry=int(state['days_to_expiry'][i]))
+            for i in range(n)
+        ]
+        return self.model.predict_price_array(products)
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+def run_backtest(snapshot: InventorySnapshot, policy: Callable[[Dict[str, np.ndarray]], np.ndarray],
+                 days: int = 30, demand_scale: float = 1.0, elasticity_scale: float = 1.0,
+                 restock: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """Simulate `days` days of pricing, demand and expiry for every SKU"""
+    rng = np.random.default_rng(seed)
+    n = len(snapshot)
+
+    stock = snapshot.stock.copy()
+    days_to_expiry = snapshot.days_to_expiry.copy()
+    initial_stock = snapshot.stock.copy()
+    elasticity = snapshot.elasticity * elasticity_scale
+    base_price = snapshot.base_price
+    safe_base = np.where(base_price > 0, base_price, 1.0)
+
+    revenue = 0.0
+    units_sold = 0.0
+    waste_units = 0.0
+    waste_value = 0.0
+    discount_sum = 0.0
+    priced_sku_days = 0
+
+    start = time.perf_counter()
+    for day in range(days):
+        state = {
+            'day': day,
+            'product_ids': snapshot.product_ids,
+            'base_price': base_price,
+            'stock': stock,
+            'days_to_expiry': days_to_expiry
+        }
+        prices = np.asarray(policy(state), dtype=np.float64)
+
+        # Constant-elasticity demand response around the base price
+        price_ratio = np.clip(prices / safe_base, 0.05, 10.0)
+        expected = snapshot.daily_demand * demand_scale * price_ratio ** elasticity
+        demand = rng.poisson(expected)
+        sold = np.minimum(demand, stock)
+
+        in_stock = stock > 0
+        revenue += float(np.dot(sold, prices))
+        units_sold += float(sold.sum())
+        discount_sum += float(((base_price - prices) / safe_base)[in_stock].sum())
+        priced_sku_days += int(in_stock.sum())
+        stock = stock - sold
+
+        # End of day: age stock and write off anything past expiry
+        days_to_expiry = days_to_expiry - 1
+        expired = days_to_expiry < 0
+        waste_units += float(stock[expired].sum())
+        waste_value += float(np.dot(stock[expired], base_price[expired]))
+        stock = np.where(expired, 0.0, stock)
+
+        if restock:
+            # Replenish empty or expired SKUs with a fresh batch
+            empty = stock <= 0
+            stock = np.where(empty, initial_stock, stock)
+            days_to_expiry = np.where(empty, snapshot.shelf_life_days, days_to_expiry)
+
+    elapsed = time.perf_counter() - start
+    sku_days = n * days
+    return {
+        'revenue': round(revenue, 2),
+        'units_sold': units_sold,
+        'waste_units': waste_units,
+        'waste_value': round(waste_value, 2),
+        'sell_through': units_sold / (units_sold + waste_units) if units_sold + waste_units else 0.0,
+        'avg_discount_percent': 100 * discount_sum / priced_sku_days if priced_sku_days else 0.0,
+        'skus': n,
+        'days': days,
+        'sku_days_per_sec': round(sku_days / elapsed) if elapsed > 0 else None
+    }
+
+DatedSnapshots = List[Tuple[Optional[datetime], InventorySnapshot]]
+
+def run_replay(snapshots: DatedSnapshots, policy: Callable[[Dict[str, np.ndarray]], np.ndarray],
+               days: int = 30, demand_scale: float = 1.0, elasticity_scale: float = 1.0,
+               restock: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """Replay a dated snapshot series, each until the next snapshot's date
+
+    The last snapshot runs for `days`; metrics are summed over segments.
+    """
+    ordered = sorted(snapshots, key=lambda item: item[0] or datetime.min)
+    totals = {'revenue': 0.0, 'units_sold': 0.0, 'waste_units': 0.0, 'waste_value': 0.0}
+    discount_weighted = 0.0
+    sku_days = 0
+    total_days = 0
+    start = time.perf_counter()
+    for i, (as_of, snapshot) in enumerate(ordered):
+        next_as_of = ordered[i + 1][0] if i + 1 < len(ordered) else None
+        segment_days = max((next_as_of - as_of).days, 1) if as_of and next_as_of else days
+        report = run_backtest(snapshot, policy, days=segment_days, demand_scale=demand_scale,
+                              elasticity_scale=elasticity_scale, restock=restock, seed=seed + i)
+        for metric in totals:
+            totals[metric] += report[metric]
+        discount_weighted += report['avg_discount_percent'] * len(snapshot) * segment_days
+        sku_days += len(snapshot) * segment_days
+        total_days += segment_days
+
+    elapsed = time.perf_counter() - start
+    sold_or_wasted = totals['units_sold'] + totals['waste_units']
+    return {
+        'revenue': round(totals['revenue'], 2),
+        'units_sold': totals['units_sold'],
+        'waste_units': totals['waste_units'],
+        'waste_value': round(totals['waste_value'], 2),
+        'sell_through': totals['units_sold'] / sold_or_wasted if sold_or_wasted else 0.0,
+        'avg_discount_percent': discount_weighted / sku_days if sku_days else 0.0,
+        'skus': max(len(snapshot) for _, snapshot in ordered),
+        'days': total_days,
+        'segments': len(ordered),
+        'sku_days_per_sec': round(sku_days / elapsed) if elapsed > 0 else None
+    }
+
+def default_policies(model=None) -> Dict[str, Callable]:
+    """Baseline, Q-table, every rule profile and, given a trained model, the ML ensemble"""
+    from pricing_rules import RULE_PROFILES
+
+    policies = {'no_discount': NoDiscountPolicy(), 'q_table': QTablePolicy()}
+    for profile in RULE_PROFILES:
+        policies[f'rules:{profile}'] = RuleProfilePolicy(profile)
+    if model is not None and model.is_trained:
+        policies['model'] = ModelPolicy(model)
+    return policies
+
+def _run_scenario(args):
+    snapshot, policy_name, policy, scenario = args
+    if isinstance(snapshot, list):
+        report = run_replay(snapshot, policy, **scenario)
+    else:
+        report = run_backtest(snapshot, policy, **scenario)
+    return dict(report, policy=policy_name, **{f'scenario_{key}': value for key, value in scenario.items()})
+
+def run_scenario_grid(snapshot, policies: Dict[str, Callable],
+                      scenarios: List[Dict[str, Any]], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run every policy under every scenario across a process pool
+
+    `snapshot` is one InventorySnapshot, or a list of (date, snapshot) pairs
+    to replay. Policies must be picklable; each scenario is a dict of
+    run_backtest keyword arguments (days, demand_scale, elasticity_scale,
+    restock, seed).
+    """
+    tasks = [(snapshot, name, policy, scenario) for scenario in scenarios for name, policy in policies.items()]
+    if max_workers == 1:
+        return [_run_scenario(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_scenario, tasks))
+
+def summarize_by_policy(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Average revenue/waste/sell-through per policy across scenarios"""
+    summary = {}
+    for policy in dict.fromkeys(result['policy'] for result in results):
+        rows = [result for result in results if result['policy'] == policy]
+        summary[policy] = {
+            metric: float(np.mean([row[metric] for row in rows]))
+            for metric in ['revenue', 'waste_units', 'waste_value', 'sell_through', 'avg_discount_percent']
+        }
+    return summary
+
+if __name__ == "__main__":
+    from realtime_pricing_model import RealtimePricingModel
+
+    args = sys.argv[1:]
+    days = int(args.pop()) if args and args[-1].isdigit() else 30
+    csv_paths = args or ["public/data/grocery-inventory.csv"]
+
+    snapshots = [InventorySnapshot.from_csv(csv_path) for csv_path in csv_paths]
+    snapshot = snapshots if len(snapshots) > 1 else snapshots[0][1]
+
+    # The saved ensemble joins the grid when one has been trained
+    model = RealtimePricingModel()
+    model.load_model()
+
+    scenarios = [
+        {'days': days, 'demand_scale': demand_scale, 'elasticity_scale': elasticity_scale, 'seed': seed}
+        for demand_scale in [0.8, 1.0, 1.2]
+        for elasticity_scale in [0.5, 1.0, 1.5]
+        for seed in range(3)
+    ]
+
+    start = time.perf_counter()
+    results = run_scenario_grid(snapshot, default_policies(model), scenarios)
+    elapsed = time.perf_counter() - start
+
+    print(f"Backtested {len(results)} runs over {results[0]['skus']} SKUs x {results[0]['days']} days "
+          f"({len(snapshots)} snapshots) in {elapsed:.2f}s")
+    for policy, metrics in summarize_by_policy(results).items():
+        print(f"  {policy:28s} revenue ${metrics['revenue']:>12,.2f}  waste {metrics['waste_units']:>9,.0f} units"
+              f"  sell-through {metrics['sell_through']:.1%}  avg discount {metrics['avg_discount_percent']:.1f}%")
@@ -0,0 +1,95 @@
+"""
+Batch Pricing
+
+Whole-batch pricing helpers shared by the pricing service, report export
+and the streaming pipeline. Each takes a RealtimePricingModel and a list of
+product records and is meant to run off the event loop (on the pricing
+service's worker thread, or a caller's own thread).
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from pricing_result import RESULT_FIELDS, project, validate_fields
+
+# Default /recommendations row; model_performance is sent once per response instead
+RECOMMENDATION_RESPONSE_FIELDS = [field for field in RESULT_FIELDS if field != 'model_performance']
+
+def recommend_products(model, products: List[Dict[str, Any]],
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Recommendations projected to `fields` for a batch on the worker thread
+
+    Explanations (reasoning, business metrics) are only computed when
+    requested, and serialization happens here rather than on the event loop.
+    Admission works as in price_products: a shed batch is priced by the rule
+    kernel. Rule-priced rows (untrained model or shed batch) keep
+    fallback_mode, and shed rows fallback_reason, whatever the projection.
+    """
+    fields = RECOMMENDATION_RESPONSE_FIELDS if fields is None else validate_fields(fields)
+    context = model.begin_pricing_pass()
+    if not model.is_trained:
+        return [dict(project(result, fields), fallback_mode=True)
+                for result in model.recommend_prices(products, context)]
+
+    shed_reason = model.admission.try_admit(items=len(products))
+    if shed_reason is not None:
+        return [dict(project(result, fields), fallback_mode=True, fallback_reason=shed_reason)
+                for result in model.fallback_pricing_batch(products, context)]
+
+    start_time = time.perf_counter()
+    succeeded = False
+    try:
+        results = model.recommend_prices(products, context, fields)
+        succeeded = True
+        return results
+    finally:
+        model.admission.release(time.perf_counter() - start_time, succeeded, items=len(products))
+
+def price_products(model, products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Price a batch with one vectorized model call (runs on the worker thread)
+
+    The batch is admitted as a whole; when the admission controller sheds it,
+    every product is priced by the rule kernel and tagged with the reason.
+    """
+    context = model.begin_pricing_pass()
+    if not model.is_trained:
+        recommendations = model.fallback_pricing_batch(products, context)
+        model.record_discounts(recommendations)
+        return recommendations
+
+    shed_reason = model.admission.try_admit(items=len(products))
+    if shed_reason is not None:
+        recommendations = model.fallback_pricing_batch(products, context)
+        for recommendation in recommendations:
+            recommendation['fallback_reason'] = shed_reason
+        model.record_discounts(recommendations)
+        return recommendations
+
+    start_time = time.perf_counter()
+    succeeded = False
+    try:
+        prices = model.predict_price_array(products, context)
+        succeeded = True
+    finally:
+        model.admission.release(time.perf_counter() - start_time, succeeded, items=len(products))
+
+    current_prices = np.array([float(p.get('current_price', 0)) for p in products], dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discounts = np.where(current_prices > 0, (current_prices - prices) / current_prices * 100, 0.0)
+    timestamp = context.now.isoformat()
+
+    recommendations = [
+        {
+            'product_id': product.get('product_id', ''),
+            'current_price': float(current_prices[i]),
+            'final_recommended_price': round(float(prices[i]), 2),
+            'discount_percent': round(float(discounts[i]), 2),
+            'fallback_mode': False,
+            'timestamp': timestamp
+        }
+        for i, product in enumerate(products)
+    ]
+    model.record_discounts(recommendations)
+    return recommendations
@@ -0,0 +1,269 @@
+"""
+Performance Benchmarks
+
+Micro-benchmarks for the hot paths of the pricing system. Each benchmark
+builds synthetic inputs, times the operation (best of several runs) and
+reports throughput.
+
+Usage:
+    python scripts/benchmarks.py                 # run everything
+    python scripts/benchmarks.py rule_pricing    # run selected benchmarks
+"""
+
+import sys
+import time
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+BENCHMARKS: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def benchmark(name: str):
+    """Register a benchmark function under a name"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+def best_time(func: Callable[[], Any], repeat: int = 5) -> float:
+    """Best wall-clock time of several runs, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+@benchmark('rule_pricing')
+def bench_rule_pricing(rows: int = 1_000_000) -> Dict[str, Any]:
+    """Vectorized rule-based pricing kernel over every profile"""
+    from pricing_rules import RULE_PROFILES, apply_rule_pricing
+
+    rng = np.random.default_rng(42)
+    prices = rng.uniform(0.5, 30.0, rows)
+    days = rng.integers(-2, 30, rows)
+    stock = rng.integers(0, 250, rows)
+
+    results = {'rows': rows}
+    for profile in RULE_PROFILES:
+        elapsed = best_time(lambda: apply_rule_pricing(prices, days, stock, profile=profile))
+        results[f'{profile}_rows_per_sec'] = round(rows / elapsed)
+    return results
+
+@benchmark('backtest')
+def bench_backtest(skus: int = 100_000, days: int = 30) -> Dict[str, Any]:
+    """Vectorized backtest simulation throughput per policy"""
+    from backtest import InventorySnapshot, default_policies, run_backtest
+
+    rng = np.random.default_rng(42)
+    snapshot = InventorySnapshot(
+        product_ids=[str(i) for i in range(skus)],
+        base_price=rng.uniform(0.5, 30.0, skus),
+        stock=rng.integers(0, 250, skus),
+        days_to_expiry=rng.integers(0, 30, skus),
+        daily_demand=rng.uniform(0.5, 10.0, skus),
+        elasticity=rng.uniform(-1.2, -0.4, skus)
+    )
+
+    results = {'skus': skus, 'days': days}
+    for name, policy in default_policies().items():
+        report = run_backtest(snapshot, policy, days=days)
+        results[f'{name}_sku_days_per_sec'] = report['sku_days_per_sec']
+    return results
+
+@benchmark('price_hub_fanout')
+def bench_price_hub_fanout(subscribers: int = 5000) -> Dict[str, Any]:
+    """Coalesced diff fan-out to thousands of SSE subscribers"""
+    import asyncio
+    from price_hub import simulate_fanout
+
+    return asyncio.run(simulate_fanout(subscribers=subscribers))
+
+@benchmark('report_export')
+def bench_report_export(rows: int = 100_000, chunk_size: int = 5000) -> Dict[str, Any]:
+    """Streaming export throughput and peak memory per format"""
+    import os
+    import tempfile
+    import tracemalloc
+    from report_export import FORMAT_EXTENSIONS, export_chunks
+
+    def synthetic_chunks():
+        rng = np.random.default_rng(42)
+        for start in range(0, rows, chunk_size):
+            prices = rng.uniform(0.5, 30.0, chunk_size)
+            discounts = rng.choice([0.0, 10.0, 15.0, 25.0, 40.0], chunk_size)
+            yield [
+                {
+                    'product_id': f"{start + i:08d}", 'name': 'Product', 'category': 'Dairy',
+                    'location': 'Main Warehouse', 'current_price': round(prices[i], 2),
+                    'recommended_price': round(prices[i] * (1 - discounts[i] / 100), 2),
+                    'discount_percent': discounts[i], 'stock_left': 50, 'expiry_date': '2025-01-01',
+                    'expected_revenue': 100.0, 'fallback_mode': True
+                }
+                for i in range(chunk_size)
+            ]
+
+    results = {'rows': rows, 'chunk_size': chunk_size}
+    with tempfile.TemporaryDirectory() as directory:
+        for fmt, extension in FORMAT_EXTENSIONS.items():
+            path = os.path.join(directory, f"report.{extension}")
+            try:
+                stats = export_chunks(synthetic_chunks(), path, fmt)
+            except ImportError:
+                results[f'{fmt}_rows_per_sec'] = 'skipped (missing dependency)'
+                continue
+
+            # Separate traced run: tracemalloc slows allocation-heavy code
+            tracemalloc.start()
+            export_chunks(synthetic_chunks(), path, fmt)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[f'{fmt}_rows_per_sec'] = stats['rows_per_sec']
+            results[f'{fmt}_peak_mb'] = round(peak / 1e6, 1)
+            results[f'{fmt}_mb_written'] = round(stats['bytes'] / 1e6, 1)
+    return results
+
+@benchmark('csv_ingest')
+def bench_csv_ingest(rows: int = 100_000, changed_fraction: float = 0.01) -> Dict[str, Any]:
+    """Initial upload vs re-upload with a few changed rows (hashing encoder)"""
+    import os
+    import tempfile
+    import pandas as pd
+    from csv_ingest import CsvIngestWorker
+    from vector_store import ProductVectorStore
+
+    base = pd.read_csv('public/data/grocery-inventory.csv', dtype={'Product_ID': str})
+    frame = base.iloc[np.arange(rows) % len(base)].reset_index(drop=True)
+    frame['Product_ID'] = [f"{i:08d}" for i in range(rows)]
+
+    rng = np.random.default_rng(42)
+    changed = rng.choice(rows, int(rows * changed_fraction), replace=False)
+    updated = frame.copy()
+    updated.loc[changed, 'Stock_Quantity'] = updated.loc[changed, 'Stock_Quantity'] + 1
+
+    results = {'rows': rows}
+    with tempfile.TemporaryDirectory() as directory:
+        initial_path = os.path.join(directory, 'initial.csv')
+        updated_path = os.path.join(directory, 'updated.csv')
+        frame.to_csv(initial_path, index=False)
+        updated.to_csv(updated_path, index=False)
+
+        worker = CsvIngestWorker(ProductVectorStore(os.path.join(directory, 'store.pkl'), encoder='hashing'))
+        initial = worker.ingest(initial_path)
+        reupload = worker.ingest(updated_path)
+
+    results.update({
+        'initial_rows_per_sec': initial['rows_per_sec'],
+        'reupload_rows_per_sec': reupload['rows_per_sec'],
+        'reupload_upserted': reupload['upserted'],
+        'reupload_unchanged': reupload['unchanged']
+    })
+    return results
+
+@benchmark('search_service')
+def bench_search_service(products: int = 10_000, requests: int = 2000) -> Dict[str, Any]:
+    """End-to-end /search latency through the pricing service"""
+    import asyncio
+    from search_service import measure_end_to_end
+
+    results = asyncio.run(measure_end_to_end(products, requests))
+    cache = results.pop('cache')
+    results['cache_hit_rate'] = cache['hit_rate']
+    return results
+
+@benchmark('shelf_detection')
+def bench_shelf_detection(cameras: int = 8, frames_per_camera: int = 100, batch_size: int = 16,
+                          change_probability: float = 0.02) -> Dict[str, Any]:
+    """Frames/sec and inference volume on mostly static shelf footage, with and without frame-diff gating"""
+    import base64
+    from shelf_detection import (BUILTIN_PROTOTYPES, DetectionWorker, ShelfProductMapper, encode_ppm, grid_rois,
+                                 synthetic_footage)
+
+    footage = [(camera_id, base64.b64encode(encode_ppm(frame)).decode('ascii'))
+               for camera_id, frame in synthetic_footage(np.random.default_rng(42), cameras, frames_per_camera,
+                                                         change_probability)]
+    results = {'frames': len(footage), 'batch_size': batch_size}
+    for label, frame_diff in (('ungated', False), ('gated', True)):
+        mapper = ShelfProductMapper(planogram={'*': {name: name.upper() for name in BUILTIN_PROTOTYPES}})
+        worker = DetectionWorker(mapper=mapper, batch_size=batch_size, max_queue=len(footage), frame_diff=frame_diff)
+        if frame_diff:
+            for camera in range(cameras):
+                worker.set_rois(f"camera-{camera}", grid_rois((240, 320), 6, 2))
+        for camera_id, frame in footage:
+            worker.submit(camera_id, frame)
+        worker.process_pending()
+
+        stats = worker.get_stats()
+        rois_per_frame = 12 if frame_diff else 1
+        results[f'{label}_frames_per_sec'] = stats['frames_per_sec']
+        # Inference volume in full-frame equivalents (a grid ROI is 1/12 of a frame)
+        results[f'{label}_inferred_frame_equivalents'] = round(stats['rois_inferred'] / rois_per_frame, 1)
+        results[f'{label}_infer_p50_ms'] = stats['stage_latency_per_frame']['infer']['p50_ms']
+        results[f'{label}_stock_events'] = stats['events_emitted']
+    results['gated_skip_rate'] = worker.get_stats()['inference_skip_rate']
+    return results
+
+@benchmark('expiry_scheduler')
+def bench_expiry_scheduler(products: int = 100_000, days: int = 7, poll_minutes: float = 5) -> Dict[str, Any]:
+    """Repricing volume over a simulated week: 5-minute polling vs threshold-crossing wakes"""
+    from expiry_scheduler import simulate
+
+    return simulate(products, days, poll_minutes)
+
+@benchmark('recommendation_fields')
+def bench_recommendation_fields(repeat: int = 20) -> Dict[str, Any]:
+    """recommend_prices + JSON encoding: full lazy results vs a price-only projection"""
+    import json
+    import os
+    import tempfile
+    from inventory_schema import load_inventory_records
+    from realtime_pricing_model import RealtimePricingModel
+
+    products = load_inventory_records('public/data/grocery-inventory.csv') * repeat
+    with tempfile.TemporaryDirectory() as directory:
+        model = RealtimePricingModel(model_path=os.path.join(directory, 'model.pkl'))
+        rng = np.random.default_rng(42)
+        model.train_model([dict(p, optimal_price=float(p['current_price']) * rng.uniform(0.7, 1.1))
+                           for p in products[:2000]])
+
+    results = {'products': len(products)}
+    for label, fields in (('full', None), ('price_only', ['product_id', 'final_recommended_price'])):
+        context = model.begin_pricing_pass()
+        start = time.perf_counter()
+        recommendations = model.recommend_prices(products, context, fields)
+        payload = json.dumps([r if fields else r.to_dict() for r in recommendations], default=str)
+        results[f'{label}_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        results[f'{label}_payload_bytes'] = len(payload)
+    return results
+
+@benchmark('product_table')
+def bench_product_table(products: int = 100_000) -> Dict[str, Any]:
+    """Per-SKU memory and batch column reads: dict records vs a ProductTable"""
+    from product_table import ProductTable, compare_memory, numeric_column
+
+    results = compare_memory(products)
+    table = ProductTable.from_records({'product_id': f"{i:08d}", 'current_price': f"{1 + i % 50}.99",
+                                       'stock_left': str(i % 300), 'category': 'Dairy'} for i in range(products))
+    records = table.records()
+    for label, source in (('records', records), ('table', table)):
+        start = time.perf_counter()
+        numeric_column(source, 'current_price', 0)
+        numeric_column(source, 'stock_left', 50, np.int64)
+        results[f'{label}_column_read_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return results
+
+def run_benchmarks(names=None) -> Dict[str, Dict[str, Any]]:
+    """Run the selected (or all) benchmarks and collect their reports"""
+    selected = names or list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)} (available: {', '.join(BENCHMARKS)})")
+    return {name: BENCHMARKS[name]() for name in selected}
+
+if __name__ == "__main__":
+    reports = run_benchmarks(sys.argv[1:])
+    for name, report in reports.items():
+        print(f"\n{name}:")
+        for key, value in report.items():
+            formatted = f"{value:,}" if isinstance(value, int) else value
+            print(f"  {key}: {formatted}")
@@ -0,0 +1,85 @@
+"""
+Import Time Budget Check
+
+Measures the cold import cost of the pricing scripts with `python -X importtime`
+and compares it against a per-module budget. Heavy dependencies (pandas,
+sklearn, pathway) are loaded lazily on first use, so importing a module for
+rule-based pricing or a short-lived CLI tool should only pay for numpy.
+
+Usage:
+    python scripts/check_import_budget.py            # check all modules
+    python scripts/check_import_budget.py vector_store
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time budget per module, in milliseconds
+IMPORT_BUDGET_MS = {
+    'realtime_pricing_model': 400,
+    'vector_store': 400,
+    'pricing_engine': 400,
+    'streaming_pipeline': 100,
+    'simulate_updates': 400,
+    'pricing_service': 400,
+}
+
+# Modules that must never be imported as a side effect of the imports above
+FORBIDDEN_AT_IMPORT = ['pandas', 'sklearn', 'pathway', 'scipy']
+
+def measure_import(module: str) -> Tuple[float, List[str]]:
+    """Return (cumulative import ms, imported top-level packages) for a module"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SCRIPTS_DIR,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}: {result.stderr.strip().splitlines()[-1]}")
+
+    cumulative_us = 0
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if not parts[1].isdigit():
+            continue  # Header line
+        name = parts[2]
+        packages.add(name.split('.')[0])
+        if name == module:
+            cumulative_us = int(parts[1])
+
+    return cumulative_us / 1000, sorted(packages)
+
+def check_budgets(modules: List[str]) -> Dict[str, Dict]:
+    """Measure every module and report whether it fits its budget"""
+    report = {}
+    for module in modules:
+        elapsed_ms, packages = measure_import(module)
+        forbidden = [pkg for pkg in FORBIDDEN_AT_IMPORT if pkg in packages]
+        budget_ms = IMPORT_BUDGET_MS.get(module, 500)
+        report[module] = {
+            'import_ms': round(elapsed_ms, 1),
+            'budget_ms': budget_ms,
+            'heavy_imports': forbidden,
+            'ok': elapsed_ms <= budget_ms and not forbidden
+        }
+    return report
+
+if __name__ == "__main__":
+    modules = sys.argv[1:] or list(IMPORT_BUDGET_MS)
+    report = check_budgets(modules)
+
+    print("Import time budget:")
+    for module, entry in report.items():
+        status = "OK  " if entry['ok'] else "FAIL"
+        heavy = f" (eager: {', '.join(entry['heavy_imports'])})" if entry['heavy_imports'] else ""
+        print(f"  {status} {module}: {entry['import_ms']:.1f} ms / {entry['budget_ms']} ms{heavy}")
+
+    sys.exit(0 if all(entry['ok'] for entry in report.values()) else 1)
@@ -0,0 +1,243 @@
+"""
+CSV Upload Ingestion
+
+Streams an uploaded inventory CSV in chunks, validates and coerces each
+chunk with vectorized pandas operations, and diffs it against the current
+state by Product_ID. Only new or changed rows are upserted into the vector
+store and fed to the pricing model, so re-uploading a mostly unchanged file
+costs one hash per row instead of a full re-index.
+
+Usage:
+    python scripts/csv_ingest.py --csv uploads/inventory.csv --rejected data/rejected-rows.csv
+"""
+
+import argparse
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+# Same required columns as app/api/upload-csv/route.ts
+REQUIRED_COLUMNS = ['Product_Name', 'Catagory', 'Unit_Price', 'Stock_Quantity', 'Sales_Volume',
+                    'Expiration_Date', 'Supplier_Name', 'Inventory_Turnover_Rate']
+
+# Normalized fields whose change makes a row worth re-indexing and re-pricing
+TRACKED_FIELDS = ['name', 'category', 'supplier_name', 'location', 'current_price', 'stock_left',
+                  'expiry_date', 'sales_volume', 'inventory_turnover_rate']
+
+TRACKED_NUMERIC = ['current_price', 'stock_left', 'sales_volume', 'inventory_turnover_rate']
+
+# Numeric fields the upload route defaults to 0 instead of rejecting the row
+ZERO_DEFAULT_FIELDS = ['sales_volume', 'inventory_turnover_rate', 'reorder_level', 'reorder_quantity']
+
+def check_columns(columns: Iterable[str]):
+    """Raise ValueError if the CSV header lacks a required column"""
+    missing = [column for column in REQUIRED_COLUMNS if column not in set(columns)]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+def validate_chunk(frame, first_row: int):
+    """Split a raw CSV chunk into (valid, rejected) normalized frames
+
+    `first_row` is the 1-based data line number of the chunk's first row and
+    is used for generated Product_IDs and rejected-row reports.
+    """
+    import numpy as np
+    import pandas as pd
+    from inventory_schema import normalize_inventory_frame
+
+    frame = normalize_inventory_frame(frame.reset_index(drop=True))
+    frame['row_number'] = np.arange(first_row, first_row + len(frame))
+
+    name = frame['name'].astype('string').str.strip()
+    reasons = pd.Series(pd.NA, index=frame.index, dtype='string')
+    checks = [
+        ('invalid_stock', frame['stock_left'].isna() | (frame['stock_left'] < 0) | (frame['stock_left'] % 1 != 0)),
+        ('invalid_price', frame['current_price'].isna() | (frame['current_price'] < 0)),
+        ('missing_name', name.isna() | (name == ''))
+    ]
+    # Later checks take precedence, so each row reports its most basic problem
+    for reason, mask in checks:
+        reasons = reasons.mask(mask, reason)
+    rejected_mask = reasons.notna().to_numpy()
+
+    rejected = frame[rejected_mask].assign(reason=reasons[rejected_mask])
+    valid = frame[~rejected_mask].copy()
+    valid['name'] = name[~rejected_mask]
+    valid['stock_left'] = valid['stock_left'].astype('int64')
+    for field in ZERO_DEFAULT_FIELDS:
+        if field in valid:
+            valid[field] = valid[field].fillna(0)
+
+    generated_ids = 'PROD-' + valid['row_number'].astype(str).str.zfill(3)
+    if 'product_id' in valid:
+        product_id = valid['product_id'].astype('string').str.strip()
+        valid['product_id'] = product_id.mask(product_id.isna() | (product_id == ''), generated_ids)
+    else:
+        valid['product_id'] = generated_ids
+    valid['product_id'] = valid['product_id'].astype(str)
+
+    return valid, rejected
+
+def row_fingerprints(frame):
+    """64-bit hash of the tracked fields per row, independent of source dtypes"""
+    import pandas as pd
+
+    tracked = pd.DataFrame(index=frame.index)
+    for field in TRACKED_FIELDS:
+        column = frame[field] if field in frame else pd.Series(None, index=frame.index, dtype=object)
+        if field in TRACKED_NUMERIC:
+            tracked[field] = pd.to_numeric(column, errors='coerce').astype('float64')
+        else:
+            tracked[field] = column.astype(object).where(column.notna(), '').astype(str)
+    return pd.util.hash_pandas_object(tracked, index=False).to_numpy()
+
+def frame_records(frame) -> List[Dict[str, Any]]:
+    frame = frame.drop(columns=['row_number'])
+    return frame.astype(object).where(frame.notna(), None).to_dict('records')
+
+class CsvIngestWorker:
+    """Diff-and-upsert ingestion of inventory CSV uploads"""
+
+    def __init__(self, vector_store=None, model=None, chunk_size: int = 10000, expiry_scheduler=None):
+        from vector_store import get_vector_store
+
+        self.vector_store = vector_store if vector_store is not None else get_vector_store()
+        self.model = model
+        # Optional ExpiryRepricingScheduler; upserted rows with a new expiry_date are rescheduled
+        self.expiry_scheduler = expiry_scheduler
+        self.chunk_size = chunk_size
+        self.fingerprints: Dict[str, int] = {}
+        self._seed_fingerprints()
+
+    def _seed_fingerprints(self):
+        """Fingerprint what the store already holds so unchanged uploads are skipped"""
+        import pandas as pd
+
+        products = self.vector_store.products_data
+        if not products:
+            return
+        frame = products.to_frame()
+        if 'product_id' not in frame:
+            return
+        ids = frame['product_id'].astype(str).tolist()
+        self.fingerprints = dict(zip(ids, row_fingerprints(frame).tolist()))
+
+    def _diff(self, valid, staged: Dict[str, int]) -> Dict[str, Any]:
+        """Keep the last row per Product_ID and split it into new/changed/unchanged
+
+        Fingerprints of the upserts go into `staged`; they are only committed
+        to `self.fingerprints` once the upsert has been applied, so a failed
+        apply is retried by the next upload.
+        """
+        valid = valid.drop_duplicates('product_id', keep='last')
+        hashes = row_fingerprints(valid).tolist()
+        ids = valid['product_id'].tolist()
+
+        new, changed = [], []
+        for position, (product_id, fingerprint) in enumerate(zip(ids, hashes)):
+            previous = staged.get(product_id, self.fingerprints.get(product_id))
+            if previous == fingerprint:
+                continue
+            (new if previous is None else changed).append(position)
+            staged[product_id] = fingerprint
+
+        return {
+            'upserts': valid.iloc[sorted(new + changed)],
+            'new': len(new),
+            'changed': len(changed),
+            'unchanged': len(ids) - len(new) - len(changed)
+        }
+
+    def _apply(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        self.vector_store.upsert_products(records)
+        if self.model is not None:
+            self.model.seed_demand(records)
+            self.model.observe_inventory(records)
+        if self.expiry_scheduler is not None:
+            self.expiry_scheduler.schedule_products(records)
+
+    def ingest(self, source, rejected_path: Optional[str] = None) -> Dict[str, Any]:
+        """Stream a CSV path or file object through validation, diff and upsert"""
+        import pandas as pd
+
+        stats = {'rows_read': 0, 'valid': 0, 'rejected': 0, 'rejected_by_reason': {},
+                 'new': 0, 'changed': 0, 'unchanged': 0}
+        start_time = time.perf_counter()
+
+        # TF-IDF refits over the whole corpus, so upserts are applied once at the end
+        buffer_upserts = not self.vector_store.encoder.stateless
+        pending: Dict[str, Dict[str, Any]] = {}
+        staged: Dict[str, int] = {}
+        rejected_frames = []
+
+        reader = pd.read_csv(source, chunksize=self.chunk_size, dtype={'Product_ID': str})
+        for chunk in reader:
+            if stats['rows_read'] == 0:
+                check_columns(chunk.columns)
+            valid, rejected = validate_chunk(chunk, stats['rows_read'] + 1)
+            stats['rows_read'] += len(chunk)
+            stats['valid'] += len(valid)
+            stats['rejected'] += len(rejected)
+            for reason, count in rejected['reason'].value_counts().items():
+                stats['rejected_by_reason'][reason] = stats['rejected_by_reason'].get(reason, 0) + int(count)
+            if rejected_path and len(rejected):
+                rejected_frames.append(rejected[['row_number', 'reason', 'name', 'product_id']
+                                                if 'product_id' in rejected else ['row_number', 'reason', 'name']])
+
+            diff = self._diff(valid, staged)
+            for key in ('new', 'changed', 'unchanged'):
+                stats[key] += diff[key]
+            records = frame_records(diff['upserts'])
+            if buffer_upserts:
+                pending.update((record['product_id'], record) for record in records)
+            else:
+                self._apply(records)
+                self.fingerprints.update(staged)
+                staged.clear()
+
+        if buffer_upserts:
+            self._apply(list(pending.values()))
+            self.fingerprints.update(staged)
+
+        elapsed = time.perf_counter() - start_time
+        if rejected_path and rejected_frames:
+            pd.concat(rejected_frames).to_csv(rejected_path, index=False)
+
+        stats.update({
+            'upserted': stats['new'] + stats['changed'],
+            'seconds': round(elapsed, 3),
+            'rows_per_sec': round(stats['rows_read'] / elapsed) if elapsed > 0 else 0
+        })
+        return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest an inventory CSV upload into the vector store')
+    parser.add_argument('--csv', default='public/data/grocery-inventory.csv', help='Uploaded inventory CSV')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--rejected', default=None, help='Write rejected rows and reasons to this CSV')
+    parser.add_argument('--no-model', action='store_true', help='Only update the vector store')
+    args = parser.parse_args()
+
+    from vector_store import get_vector_store
+
+    vector_store = get_vector_store()
+    model = None
+    if not args.no_model:
+        from realtime_pricing_model import initialize_pricing_model
+        model = initialize_pricing_model()
+
+    worker = CsvIngestWorker(vector_store, model, args.chunk_size)
+    try:
+        stats = worker.ingest(args.csv, args.rejected)
+    except Exception as e:
+        print(f"Error ingesting {args.csv}: {e}")
+        return
+
+    if stats['new'] or stats['changed']:
+        vector_store.save_store()
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+SECONDS_PER_DAY = 86400.0
+
+# Sales_Volume in the inventory CSV is treated as units sold over this many days, and
+# Inventory_Turnover_Rate (0-100) as the percentage of stock sold over the same period
+SALES_VOLUME_PERIOD_DAYS = 30
+
+# Observations closer together than this keep the earlier reference, so a burst of
+# re-sends (e.g. an upload right after seeding) is not read as a zero-sales day
+MIN_OBSERVATION_SECONDS = 60.0
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+class DemandForecaster:
+    """Per-SKU demand forecasts from rolling sales aggregates
+
+    State lives in compact arrays indexed by SKU row: an EWMA of daily sales
+    and day-of-week sales/exposure totals. Observations are stock levels;
+    sales are inferred from stock decreases (restocks are ignored). Forecasts
+    for every SKU are computed in one vectorized pass per tick by `refresh`
+    and then read in O(1) by the pricing model. A SKU has no velocity (None)
+    until it is seeded from the CSV or a stock delta has been observed.
+    """
+
+    def __init__(self, alpha: float = 0.3, initial_capacity: int = 1024):
+        self.alpha = alpha
+        self.sku_index: Dict[str, int] = {}
+        self.size = 0
+
+        self.ewma_daily_sales = np.zeros(initial_capacity, dtype=np.float32)
+        self.dow_sales = np.zeros((initial_capacity, 7), dtype=np.float32)
+        self.dow_exposure_days = np.zeros((initial_capacity, 7), dtype=np.float32)
+        self.last_stock = np.full(initial_capacity, -1, dtype=np.int32)
+        self.last_observed = np.zeros(initial_capacity, dtype=np.float64)
+        self.observations = np.zeros(initial_capacity, dtype=np.int32)
+        self.seeded = np.zeros(initial_capacity, dtype=bool)
+
+        self.daily_forecast = np.zeros(0, dtype=np.float32)
+        self.forecast_time: Optional[datetime] = None
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+        if 'seeded' not in state:
+            # Pickled before seeding was tracked
+            self.seeded = np.zeros(len(self.ewma_daily_sales), dtype=bool)
+
+    def _grow(self, capacity: int):
+        for name in ['ewma_daily_sales', 'dow_sales', 'dow_exposure_days', 'last_observed', 'observations',
+                     'seeded']:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+        last_stock = np.full(capacity, -1, dtype=np.int32)
+        last_stock[:len(self.last_stock)] = self.last_stock
+        self.last_stock = last_stock
+
+    def _rows(self, product_ids: Iterable[str]) -> np.ndarray:
+        """Row index for each SKU, registering unseen SKUs"""
+        rows = []
+        for product_id in product_ids:
+            row = self.sku_index.get(product_id)
+            if row is None:
+                row = self.size
+                self.sku_index[product_id] = row
+                self.size += 1
+            rows.append(row)
+
+        if self.size > len(self.ewma_daily_sales):
+            self._grow(max(self.size, 2 * len(self.ewma_daily_sales)))
+        return np.array(rows, dtype=np.int64)
+
+    def seed_from_records(self, records: Iterable[Dict[str, Any]], timestamp: Optional[datetime] = None):
+        """Initialize EWMA sales of not-yet-observed SKUs from Sales_Volume (else Inventory_Turnover_Rate)
+
+        SKUs without a stock reference also take the record's stock level as one.
+        """
+        records = [record for record in records if record.get('product_id')]
+        if not records:
+            return
+        rows = self._rows(record['product_id'] for record in records)
+        sales_volume = np.array([_number(record.get('sales_volume')) for record in records], dtype=np.float32)
+        turnover = np.array([_number(record.get('inventory_turnover_rate')) for record in records], dtype=np.float32)
+        stock = np.array([_number(record.get('stock_left')) for record in records], dtype=np.float32)
+
+        # Ingest fills a missing Sales_Volume with 0, so fall back to turnover unless it is positive
+        period_sales = np.where(sales_volume > 0, sales_volume, stock * turnover / 100)
+        period_sales = np.where(np.isnan(period_sales), sales_volume, period_sales)
+        seedable = (self.observations[rows] == 0) & ~np.isnan(period_sales)
+        self.ewma_daily_sales[rows[seedable]] = period_sales[seedable] / SALES_VOLUME_PERIOD_DAYS
+        self.seeded[rows[seedable]] = True
+
+        unreferenced = (self.last_stock[rows] < 0) & ~np.isnan(stock)
+        self.last_stock[rows[unreferenced]] = stock[unreferenced].astype(np.int32)
+        self.last_observed[rows[unreferenced]] = (timestamp or datetime.now()).timestamp()
+
+    def observe_stock(self, product_ids: List[str], stock_levels, timestamp: Optional[datetime] = None):
+        """Update rolling aggregates from a batch of stock level observations"""
+        timestamp = timestamp or datetime.now()
+        now_seconds = timestamp.timestamp()
+        rows = self._rows(product_ids)
+        stock = np.asarray(stock_levels, dtype=np.int32)
+
+        previous = self.last_stock[rows]
+        elapsed_days = (now_seconds - self.last_observed[rows]) / SECONDS_PER_DAY
+        valid = (previous >= 0) & (elapsed_days > 0)
+        too_soon = (previous >= 0) & (elapsed_days < MIN_OBSERVATION_SECONDS / SECONDS_PER_DAY)
+        valid &= ~too_soon
+
+        sold = np.maximum(previous - stock, 0).astype(np.float32)
+        valid_rows = rows[valid]
+        daily_rate = sold[valid] / elapsed_days[valid]
+
+        self.ewma_daily_sales[valid_rows] = (
+            self.alpha * daily_rate + (1 - self.alpha) * self.ewma_daily_sales[valid_rows]
+        )
+
+        weekday = timestamp.weekday()
+        np.add.at(self.dow_sales, (valid_rows, weekday), sold[valid])
+        np.add.at(self.dow_exposure_days, (valid_rows, weekday), elapsed_days[valid])
+        self.observations[valid_rows] += 1
+
+        referenced = rows[~too_soon]
+        self.last_stock[referenced] = stock[~too_soon]
+        self.last_observed[referenced] = now_seconds
+
+    def observe_records(self, records: List[Dict[str, Any]], timestamp: Optional[datetime] = None):
+        """Observe stock levels from product records (e.g. simulator or stream rows)"""
+        product_ids = [record['product_id'] for record in records]
+        self.observe_stock(product_ids, [int(record['stock_left']) for record in records], timestamp)
+
+    def day_of_week_factors(self, weekday: int) -> np.ndarray:
+        """Relative demand for the given weekday per SKU (1.0 when there is too little data)"""
+        n = self.size
+        total_sales = self.dow_sales[:n].sum(axis=1)
+        total_exposure = self.dow_exposure_days[:n].sum(axis=1)
+        day_exposure = self.dow_exposure_days[:n, weekday]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_rate = total_sales / total_exposure
+            day_rate = self.dow_sales[:n, weekday] / day_exposure
+            factors = day_rate / mean_rate
+
+        enough_data = (day_exposure >= 1.0) & (total_exposure >= 7.0) & (mean_rate > 0)
+        return np.clip(np.where(enough_data, factors, 1.0), 0.25, 4.0).astype(np.float32)
+
+    def refresh(self, now: Optional[datetime] = None) -> np.ndarray:
+        """Compute today's daily demand forecast for every SKU in one pass"""
+        now = now or datetime.now()
+        self.daily_forecast = self.ewma_daily_sales[:self.size] * self.day_of_week_factors(now.weekday())
+        self.forecast_time = now
+        return self.daily_forecast
+
+    def velocity(self, product_id: str) -> Optional[float]:
+        """Forecast units/day for a SKU from the last refresh, or None without a seed or a stock delta"""
+        row = self.sku_index.get(product_id)
+        if row is None or not (self.observations[row] or self.seeded[row]):
+            return None
+        if row >= len(self.daily_forecast):
+            # SKU registered after the last tick
+            self.refresh(self.forecast_time)
+        return float(self.daily_forecast[row])
+
+    def velocities(self) -> Dict[str, float]:
+        """velocity() of every SKU that has one, from the last refresh"""
+        forecast = self.daily_forecast.tolist()
+        return {product_id: forecast[row] for product_id, row in self.sku_index.items()
+                if row < len(forecast) and (self.observations[row] or self.seeded[row])}
+
+    def forecast(self, product_ids: List[str], horizon_days: int = 1) -> np.ndarray:
+        """Expected units sold over the horizon for each SKU (0 for unknown SKUs)"""
+        if self.forecast_time is None:
+            self.refresh()
+        rows = np.array([self.sku_index.get(product_id, -1) for product_id in product_ids], dtype=np.int64)
+        known = (rows >= 0) & (rows < len(self.daily_forecast))
+        result = np.zeros(len(rows), dtype=np.float32)
+        result[known] = self.daily_forecast[rows[known]] * horizon_days
+        return result
@@ -20,11 +20,14 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any
 import pandas as pd
 
+from alert_engine import AlertEngine
+
 class SmartPricingDemo:
     def __init__(self):
         self.products = []
         self.pricing_history = []
         self.alerts = []
+        self.alert_engine = AlertEngine()
         self.performance_metrics = {
             "pricing_accuracy": 87.5,
             "revenue_optimization": 12.3,
@@ -134,37 +137,15 @@ class SmartPricingDemo:
         }
     
     def generate_alerts(self, products: List[Dict]) -> List[Dict]:
-        """Generate realistic alerts based on product data"""
-        alerts = []
-        
-        for product in products:
-            # Expiring product alerts
-            if product["Days_to_Expiry"] <= 3:
-                severity = "high" if product["Days_to_Expiry"] <= 1 else "medium"
-                alerts.append({
-                    "id": f"expiring_{product['Product_Name']}",
-                    "type": "expiring",
-                    "severity": severity,
-                    "product_name": product["Product_Name"],
-                    "message": f"Expires in {product['Days_to_Expiry']} day(s)",
-                    "timestamp": datetime.now().isoformat(),
-                    "action_required": product["Days_to_Expiry"] <= 2
-                })
-            
-            # Low stock alerts
-            if product["Stock_Quantity"] < 20:
-                severity = "high" if product["Stock_Quantity"] < 10 else "medium"
-                alerts.append({
-                    "id": f"low_stock_{product['Product_Name']}",
-                    "type": "low_stock",
-                    "severity": severity,
-                    "product_name": product["Product_Name"],
-                    "message": f"Only {product['Stock_Quantity']} units remaining",
-                    "timestamp": datetime.now().isoformat(),
-                    "action_required": product["Stock_Quantity"] < 15
-                })
-        
-        return alerts[:10]  # Limit to 10 alerts for demo
+        """Generate realistic alerts based on product data
+        
+        Only rows whose stock or expiry changed are re-evaluated, and products
+        no longer in the list have their alerts retired; alerts come back
+        deduplicated and in priority order.
+        """
+        self.alert_engine.advance()
+        self.alert_engine.sync(products)
+        return self.alert_engine.get_alerts(limit=10)  # Limit to 10 alerts for demo
     
     def simulate_real_time_updates(self) -> List[Dict]:
         """Generate real-time update events"""
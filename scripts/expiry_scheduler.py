@@ -0,0 +1,229 @@
+"""
+Expiry Repricing Scheduler
+
+Expiry discounts only change when a product's days_to_expiry crosses one of
+the rule thresholds (EXPIRY_THRESHOLDS, i.e. <= 1/2/3/5/7 days). Instead of
+repricing the whole catalog on a fixed interval, each product is scheduled
+in a min-heap at the instant its next threshold crossing happens, and only
+the products that are due are handed to the reprice callback. Repricing
+volume then follows the calendar of bucket changes (at most one wake per
+threshold per product) rather than catalog size x polling frequency.
+
+Times are whole epoch seconds on the same naive clock as the rest of the
+code (expiry dates and `datetime.now()` are compared without time zones).
+
+Usage:
+    python scripts/expiry_scheduler.py --products 100000 --days 7 --poll-minutes 5
+"""
+
+import argparse
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pricing_rules import EXPIRY_THRESHOLDS, parse_expiry_dates
+
+SECONDS_PER_DAY = 86400
+NO_CROSSING = -1
+
+def epoch_seconds(moment: datetime) -> int:
+    return int(np.datetime64(moment, 's').astype(np.int64))
+
+def expiry_buckets(days_to_expiry, thresholds: List[int] = EXPIRY_THRESHOLDS) -> np.ndarray:
+    """Bucket b holds days_to_expiry in (thresholds[b-1], thresholds[b]]; the last bucket is beyond all of them"""
+    return np.searchsorted(thresholds, days_to_expiry, side='left')
+
+def next_crossings(expiry_seconds: np.ndarray, now_seconds: int,
+                   thresholds: List[int] = EXPIRY_THRESHOLDS) -> np.ndarray:
+    """Epoch second at which each product next enters a lower bucket (NO_CROSSING if never)
+
+    days_to_expiry <= k first holds once fewer than k + 1 whole days remain,
+    i.e. one second after `expiry - (k + 1) days`.
+    """
+    thresholds = np.asarray(thresholds, dtype=np.int64)
+    expiry_seconds = np.asarray(expiry_seconds, dtype=np.int64)
+    days = np.floor_divide(expiry_seconds - now_seconds, SECONDS_PER_DAY)
+    buckets = expiry_buckets(days, thresholds)
+    next_threshold = thresholds[np.maximum(buckets - 1, 0)]
+    return np.where(buckets > 0, expiry_seconds - (next_threshold + 1) * SECONDS_PER_DAY + 1, NO_CROSSING)
+
+class ExpiryRepricingScheduler:
+    """Wakes products exactly when their expiry bucket changes
+
+    Heap entries carry a per-product generation so rescheduling or removing
+    a product just invalidates its old entry (same scheme as UrgencyTracker).
+    """
+
+    def __init__(self, reprice_fn: Optional[Callable[[List[str]], Any]] = None,
+                 thresholds: List[int] = EXPIRY_THRESHOLDS):
+        self.reprice_fn = reprice_fn
+        self.thresholds = sorted(thresholds)
+        self.expiry_seconds: Dict[str, int] = {}
+        self.generation: Dict[str, int] = {}
+        self.heap: List[Tuple[int, str, int]] = []
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+
+        self.woken = 0
+        self.stale_entries = 0
+
+    def _push(self, product_ids: List[str], wake_seconds: np.ndarray):
+        entries = [(int(wake), product_id, self.generation[product_id])
+                   for product_id, wake in zip(product_ids, wake_seconds.tolist()) if wake != NO_CROSSING]
+        if len(entries) > len(self.heap):
+            self.heap.extend(entries)
+            heapq.heapify(self.heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+
+    def schedule_products(self, products: List[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """(Re)schedule products by expiry_date; unchanged expiries keep their entry. Returns how many changed"""
+        now_seconds = epoch_seconds(now or datetime.now())
+        dated = [product for product in products if product.get('expiry_date') and product.get('product_id')]
+        expiry_dates = parse_expiry_dates([product['expiry_date'] for product in dated])
+        valid = ~np.isnat(expiry_dates)
+        expiry_seconds = expiry_dates.astype(np.int64)
+
+        changed_ids, changed_expiry = [], []
+        with self.lock:
+            for product, is_valid, expiry in zip(dated, valid.tolist(), expiry_seconds.tolist()):
+                product_id = str(product['product_id'])
+                if not is_valid:
+                    self._forget(product_id)
+                    continue
+                if self.expiry_seconds.get(product_id) == expiry:
+                    continue
+                self.expiry_seconds[product_id] = expiry
+                self.generation[product_id] = self.generation.get(product_id, 0) + 1
+                changed_ids.append(product_id)
+                changed_expiry.append(expiry)
+            self._push(changed_ids, next_crossings(np.array(changed_expiry, dtype=np.int64), now_seconds,
+                                                   self.thresholds))
+        self._wakeup.set()
+        return len(changed_ids)
+
+    def _forget(self, product_id: str):
+        if self.expiry_seconds.pop(product_id, None) is not None:
+            self.generation[product_id] = self.generation.get(product_id, 0) + 1
+
+    def remove(self, product_id: str):
+        with self.lock:
+            self._forget(product_id)
+
+    def due(self, now: Optional[datetime] = None) -> List[str]:
+        """Pop products whose bucket changed by `now` and schedule their next crossing"""
+        now_seconds = epoch_seconds(now or datetime.now())
+        due_ids = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now_seconds:
+                _, product_id, generation = heapq.heappop(self.heap)
+                if generation != self.generation.get(product_id) or product_id not in self.expiry_seconds:
+                    self.stale_entries += 1
+                    continue
+                due_ids.append(product_id)
+            if due_ids:
+                # Several thresholds may have passed (e.g. after a pause); only the next one is scheduled
+                expiry = np.array([self.expiry_seconds[product_id] for product_id in due_ids], dtype=np.int64)
+                self._push(due_ids, next_crossings(expiry, now_seconds, self.thresholds))
+        self.woken += len(due_ids)
+        return due_ids
+
+    def run_due(self, now: Optional[datetime] = None) -> int:
+        """Reprice due products through the callback; returns how many"""
+        due_ids = self.due(now)
+        if due_ids and self.reprice_fn is not None:
+            try:
+                self.reprice_fn(due_ids)
+            except Exception as e:
+                print(f"Error repricing {len(due_ids)} products at expiry threshold: {e}")
+        return len(due_ids)
+
+    def seconds_until_next(self, now: Optional[datetime] = None) -> Optional[float]:
+        """Seconds until the earliest scheduled crossing (None when nothing is scheduled)"""
+        with self.lock:
+            while self.heap and self.heap[0][2] != self.generation.get(self.heap[0][1]):
+                heapq.heappop(self.heap)
+                self.stale_entries += 1
+            if not self.heap:
+                return None
+            wake = self.heap[0][0]
+        return max(0.0, wake - epoch_seconds(now or datetime.now()))
+
+    def start(self, max_sleep_seconds: float = 3600) -> threading.Event:
+        """Run `run_due` on a daemon thread that sleeps until the next crossing
+
+        Returns an event that is set once `stop()` is called.
+        """
+        self._stop_event = threading.Event()
+
+        def loop():
+            while not self._stop_event.is_set():
+                self.run_due()
+                delay = self.seconds_until_next()
+                self._wakeup.clear()
+                # New schedules set _wakeup so an earlier crossing is not slept through
+                self._wakeup.wait(max_sleep_seconds if delay is None else min(delay, max_sleep_seconds))
+
+        threading.Thread(target=loop, name='expiry-scheduler', daemon=True).start()
+        return self._stop_event
+
+    def stop(self):
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'scheduled_products': len(self.expiry_seconds),
+            'heap_entries': len(self.heap),
+            'woken': self.woken,
+            'stale_entries': self.stale_entries,
+            'thresholds': self.thresholds
+        }
+
+def simulate(products: int = 100_000, days: int = 7, poll_minutes: float = 5, seed: int = 42) -> Dict[str, Any]:
+    """Repricing volume of fixed-interval polling vs the scheduler over a simulated period"""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 6, 1, 0, 0, 0)
+    offsets = rng.integers(0, 30 * SECONDS_PER_DAY, products)
+    records = [{'product_id': f"{i:08d}", 'expiry_date': (start + timedelta(seconds=int(offset))).isoformat()}
+               for i, offset in enumerate(offsets.tolist())]
+
+    scheduler = ExpiryRepricingScheduler()
+    schedule_start = time.perf_counter()
+    scheduler.schedule_products(records, start)
+    schedule_ms = (time.perf_counter() - schedule_start) * 1000
+
+    steps = int(days * 24 * 60 / poll_minutes)
+    advance_start = time.perf_counter()
+    woken = sum(len(scheduler.due(start + timedelta(minutes=poll_minutes * step))) for step in range(1, steps + 1))
+    advance_ms = (time.perf_counter() - advance_start) * 1000
+
+    polled = products * steps
+    return {
+        'products': products,
+        'simulated_days': days,
+        'polling_repricings': polled,
+        'scheduled_repricings': woken,
+        'reduction_factor': round(polled / woken, 1) if woken else None,
+        'schedule_ms': round(schedule_ms, 1),
+        'advance_ms': round(advance_ms, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare expiry-threshold scheduling with interval repricing')
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--poll-minutes', type=float, default=5)
+    args = parser.parse_args()
+
+    for key, value in simulate(args.products, args.days, args.poll_minutes).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
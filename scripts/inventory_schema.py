@@ -0,0 +1,71 @@
+from typing import Any, Dict, Iterator, List
+
+# Inventory CSV columns (see public/data/grocery-inventory.csv) mapped to the
+# product keys used by the pricing model and vector store
+CSV_COLUMN_MAP = {
+    'Product_ID': 'product_id',
+    'Product_Name': 'name',
+    'Catagory': 'category',
+    'Supplier_Name': 'supplier_name',
+    'Warehouse_Location': 'location',
+    'Status': 'status',
+    'Expiration_Date': 'expiry_date',
+    'Stock_Quantity': 'stock_left',
+    'Reorder_Level': 'reorder_level',
+    'Reorder_Quantity': 'reorder_quantity',
+    'Unit_Price': 'current_price',
+    'Sales_Volume': 'sales_volume',
+    'Inventory_Turnover_Rate': 'inventory_turnover_rate',
+    'State': 'state',
+    'Region': 'region',
+    'Seasonal_Factor': 'season'
+}
+
+NUMERIC_FIELDS = ['current_price', 'stock_left', 'reorder_level', 'reorder_quantity',
+                  'sales_volume', 'inventory_turnover_rate', 'recommended_price', 'price_change']
+
+# Same default the upload route applies when a row has no warehouse
+DEFAULT_LOCATION = 'Main Warehouse'
+
+def record_location(record: Dict[str, Any]) -> str:
+    """Partition key of a product record in either CSV or normalized form"""
+    location = record.get('location') or record.get('Warehouse_Location') or record.get('Store_Location')
+    return str(location) if location else DEFAULT_LOCATION
+
+def normalize_inventory_frame(df):
+    """Rename CSV columns and coerce types for a whole DataFrame at once"""
+    import pandas as pd
+
+    df = df.rename(columns=CSV_COLUMN_MAP)
+
+    if 'current_price' in df and not pd.api.types.is_numeric_dtype(df['current_price']):
+        df['current_price'] = df['current_price'].astype(str).str.replace(r'[$,]', '', regex=True)
+    for field in NUMERIC_FIELDS:
+        if field in df:
+            df[field] = pd.to_numeric(df[field], errors='coerce')
+
+    if 'expiry_date' in df:
+        expiry = pd.to_datetime(df['expiry_date'], errors='coerce', format='mixed')
+        df['expiry_date'] = expiry.dt.strftime('%Y-%m-%d')
+
+    if 'location' in df:
+        df['location'] = df['location'].fillna(DEFAULT_LOCATION)
+    else:
+        df['location'] = DEFAULT_LOCATION
+
+    return df
+
+def load_inventory_records(csv_path: str) -> List[Dict[str, Any]]:
+    """Load an inventory CSV as normalized product records"""
+    import pandas as pd
+
+    df = normalize_inventory_frame(pd.read_csv(csv_path))
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+def iter_inventory_records(csv_path: str, chunk_size: int = 10000) -> Iterator[Dict[str, Any]]:
+    """Stream an inventory CSV as normalized records, one chunk in memory at a time"""
+    import pandas as pd
+    
+    for frame in pd.read_csv(csv_path, chunksize=chunk_size):
+        frame = normalize_inventory_frame(frame)
+        yield from frame.astype(object).where(frame.notna(), None).to_dict('records')
@@ -0,0 +1,457 @@
+"""
+Model Registry
+
+Versioned pricing model artifacts, an ACTIVE pointer for the version being
+served and an optional CANDIDATE pointer for the version scored in shadow.
+
+Layout under the registry root:
+    versions/<version>/model.pkl    RealtimePricingModel.save_model artifact
+    versions/<version>/meta.json    registration time, training time, performance, note
+    ACTIVE                          version served to callers
+    CANDIDATE                       version scored in shadow mode (optional)
+    activations.jsonl               promote/rollback log that rollback walks back through
+
+Pointers are written to a temp file and swapped in with os.replace (like
+shared_state.py's CURRENT), so readers see the old or the new version and
+never a partial write. Loaded artifacts stay in memory. Promoting the
+candidate that is already being shadowed, or rolling back to the version
+that was active before, therefore only calls `attach()` on the serving
+model: a few attribute assignments between two batches, with no reload.
+
+ShadowScorer re-prices batches the service has already served, using the
+candidate's estimators on its own thread. The hot path only enqueues (a
+full queue drops the batch). Divergence from the served prices and the
+candidate's latency are aggregated and logged every `log_every` batches.
+The candidate reads a private snapshot of the serving model's feature
+state (price history, demand velocities, caches), refreshed from the
+pricing thread every `state_refresh_s`, never the live objects.
+
+Usage:
+    python scripts/model_registry.py register data/pricing_model.pkl --note "nightly retrain"
+    python scripts/model_registry.py shadow <version>
+    python scripts/model_registry.py promote [<version>]     (defaults to the shadow candidate)
+    python scripts/model_registry.py rollback
+    python scripts/model_registry.py status
+"""
+
+import argparse
+import copy
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from pricing_context import PricingContext, parse_datetime
+
+REGISTRY_ROOT = 'data/model_registry'
+VERSIONS_DIR = 'versions'
+ARTIFACT_FILE = 'model.pkl'
+ACTIVE_POINTER = 'ACTIVE'
+CANDIDATE_POINTER = 'CANDIDATE'
+ACTIVATION_LOG = 'activations.jsonl'
+
+# Swapped by attach(); runtime state (price history, Q-table, forecasts, urgency) stays with the serving model
+ESTIMATOR_ATTRIBUTES = ('rf_model', 'gb_model', 'scaler', 'feature_names', 'model_performance',
+                        'last_training_time', 'is_trained')
+
+class FrozenVelocities:
+    """Read-only stand-in for DemandForecaster.velocity from one refresh"""
+
+    def __init__(self, forecaster):
+        self.velocities = forecaster.velocities()
+
+    def velocity(self, product_id: str) -> Optional[float]:
+        return self.velocities.get(product_id)
+
+def feature_state_snapshot(model) -> Dict[str, Any]:
+    """Copies of the mutable state extract_features reads, taken on the serving model's thread"""
+    from urgency_queue import UrgencyTracker
+
+    return {
+        'price_history': {product_id: list(history) for product_id, history in model.price_history.items()},
+        'demand_forecaster': FrozenVelocities(model.demand_forecaster),
+        'q_table': copy.deepcopy(model.q_table),
+        'urgency_tracker': UrgencyTracker(model.calculate_urgency_score),
+        '_category_elasticity': dict(model._category_elasticity),
+        '_competitor_ratios': dict(model._competitor_ratios)
+    }
+
+class ModelRegistry:
+    """Versioned model artifacts plus ACTIVE/CANDIDATE pointers under one root"""
+
+    def __init__(self, root: str = REGISTRY_ROOT):
+        self.root = root
+        self.loaded: Dict[str, Any] = {}
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(root, VERSIONS_DIR), exist_ok=True)
+
+    def _version_dir(self, version: str) -> str:
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def versions(self) -> List[str]:
+        return sorted(name for name in os.listdir(os.path.join(self.root, VERSIONS_DIR)) if not name.startswith('.'))
+
+    def metadata(self, version: str) -> Dict[str, Any]:
+        self._require(version)
+        with open(os.path.join(self._version_dir(version), 'meta.json')) as f:
+            return json.load(f)
+
+    def _require(self, version: str):
+        if not version or os.path.basename(version) != version or version.startswith('.') \
+                or not os.path.isdir(self._version_dir(version)):
+            raise ValueError(f"Unknown model version: {version}")
+
+    def register(self, model, note: str = '') -> str:
+        """Save a trained model as a new version; returns its name (pointers are left alone)"""
+        if not model.is_trained:
+            raise ValueError("Cannot register an untrained model")
+
+        base = model.get_model_version()
+        version, suffix = base, 1
+        while os.path.exists(self._version_dir(version)):
+            suffix += 1
+            version = f"{base}-{suffix}"
+
+        staging = os.path.join(self.root, VERSIONS_DIR, f".staging-{version}")
+        os.makedirs(staging)
+        if not model.save_model(os.path.join(staging, ARTIFACT_FILE)):
+            shutil.rmtree(staging, ignore_errors=True)
+            raise RuntimeError(f"Could not save the artifact for {version}")
+        meta = {
+            'version': version,
+            'registered_at': datetime.now().isoformat(),
+            'last_training_time': model.last_training_time,
+            'model_performance': model.model_performance,
+            'note': note
+        }
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, default=str)
+        os.rename(staging, self._version_dir(version))
+
+        print(f"Registered model {version}")
+        return version
+
+    def register_file(self, model_path: str, note: str = '') -> str:
+        """Register an existing save_model pickle (e.g. data/pricing_model.pkl)"""
+        from realtime_pricing_model import RealtimePricingModel
+
+        model = RealtimePricingModel(model_path=model_path)
+        if not model.load_model():
+            raise ValueError(f"Could not load a model from {model_path}")
+        return self.register(model, note)
+
+    # -- pointers ------------------------------------------------------------
+
+    def _read_pointer(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, name)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_pointer(self, name: str, version: Optional[str]):
+        path = os.path.join(self.root, name)
+        if version is None:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        pointer_tmp = os.path.join(self.root, f".{name}.tmp")
+        with open(pointer_tmp, 'w') as f:
+            f.write(version)
+        os.replace(pointer_tmp, path)
+
+    def active_version(self) -> Optional[str]:
+        return self._read_pointer(ACTIVE_POINTER)
+
+    def candidate_version(self) -> Optional[str]:
+        return self._read_pointer(CANDIDATE_POINTER)
+
+    def set_candidate(self, version: Optional[str]):
+        """Start (or with None, stop) shadow scoring of a version"""
+        if version is not None:
+            self._require(version)
+        self._write_pointer(CANDIDATE_POINTER, version)
+
+    def history(self) -> List[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.root, ACTIVATION_LOG)) as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _log_activation(self, action: str, version: str, previous: Optional[str]):
+        entry = {'action': action, 'version': version, 'previous': previous, 'at': datetime.now().isoformat()}
+        with open(os.path.join(self.root, ACTIVATION_LOG), 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+
+    def _active_stack(self) -> List[str]:
+        """Versions promoted and not yet rolled back, oldest first"""
+        stack = []
+        for entry in self.history():
+            if entry['action'] == 'promote':
+                stack.append(entry['version'])
+            elif entry['action'] == 'rollback' and stack:
+                stack.pop()
+        return stack
+
+    def promote(self, version: Optional[str] = None) -> str:
+        """Make a version (default: the shadow candidate) ACTIVE; returns it"""
+        version = version or self.candidate_version()
+        if version is None:
+            raise ValueError("No version given and no shadow candidate set")
+        self._require(version)
+        previous = self.active_version()
+        if version == previous:
+            return version
+
+        self._write_pointer(ACTIVE_POINTER, version)
+        self._log_activation('promote', version, previous)
+        if self.candidate_version() == version:
+            self._write_pointer(CANDIDATE_POINTER, None)
+        print(f"Promoted model {version} (was {previous})")
+        return version
+
+    def rollback(self) -> str:
+        """Re-activate the version that was active before the current one; returns it"""
+        stack = self._active_stack()
+        if len(stack) < 2:
+            raise ValueError("No earlier active version to roll back to")
+        version, previous = stack[-2], self.active_version()
+        self._require(version)
+
+        self._write_pointer(ACTIVE_POINTER, version)
+        self._log_activation('rollback', version, previous)
+        print(f"Rolled back to model {version} (was {previous})")
+        return version
+
+    # -- loading and swapping ------------------------------------------------
+
+    def load(self, version: str):
+        """The loaded artifact of a version, read from disk only the first time"""
+        with self.lock:
+            model = self.loaded.get(version)
+        if model is not None:
+            return model
+
+        from realtime_pricing_model import RealtimePricingModel
+
+        self._require(version)
+        model = RealtimePricingModel(model_path=os.path.join(self._version_dir(version), ARTIFACT_FILE))
+        if not model.load_model():
+            raise ValueError(f"Could not load model version {version}")
+        with self.lock:
+            model = self.loaded.setdefault(version, model)
+            self._trim_loaded()
+        return model
+
+    def _trim_loaded(self):
+        """Keep the active, candidate and rollback-target artifacts in memory"""
+        stack = self._active_stack()
+        keep = {self.active_version(), self.candidate_version(), *stack[-2:]}
+        for version in [version for version in self.loaded if version not in keep]:
+            del self.loaded[version]
+
+    def attach(self, model, version: str):
+        """Point a RealtimePricingModel at a version's estimators (no reload once cached)"""
+        artifact = self.load(version)
+        for name in ESTIMATOR_ATTRIBUTES:
+            setattr(model, name, getattr(artifact, name))
+        model.model_version = version
+        model.registry_version = version
+        return model
+
+    def shadow_model(self, serving_model, version: str):
+        """Candidate view of the serving model: a snapshot of its runtime state, the candidate's estimators"""
+        shadow = copy.copy(serving_model)
+        for name, value in feature_state_snapshot(serving_model).items():
+            setattr(shadow, name, value)
+        return self.attach(shadow, version)
+
+    def status(self) -> Dict[str, Any]:
+        stack = self._active_stack()
+        return {
+            'root': self.root,
+            'active': self.active_version(),
+            'candidate': self.candidate_version(),
+            'rollback_to': stack[-2] if len(stack) >= 2 else None,
+            'versions': self.versions(),
+            'loaded': sorted(self.loaded)
+        }
+
+class ShadowScorer:
+    """Scores served batches with a candidate model on a background thread
+
+    Compares the candidate's ensemble price with the price that was served
+    (`predicted_optimal_price` when the response has it, else
+    `final_recommended_price`) on the served pass's clock. Rows the service
+    answered from the rule kernel (`fallback_mode`) are left out, so
+    divergence is model against model.
+    """
+
+    def __init__(self, model, version: str, max_pending_batches: int = 64, log_every: int = 100,
+                 window: int = 10_000, divergence_threshold_pct: float = 5.0, state_refresh_s: float = 60.0):
+        self.model = model
+        self.version = version
+        self.queue: 'queue.Queue' = queue.Queue(maxsize=max_pending_batches)
+        self.log_every = log_every
+        self.divergence_threshold_pct = divergence_threshold_pct
+        self.state_refresh_s = state_refresh_s
+        self.state_time = time.monotonic()
+        # Newer feature state snapshot, swapped in by the scoring thread between batches
+        self._pending_state: Optional[Dict[str, Any]] = None
+
+        self.divergence_pct = deque(maxlen=window)
+        self.latencies_ms = deque(maxlen=1000)
+        self.batches = 0
+        self.products = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.fallback_rows = 0
+        self.errors = 0
+        self._stopping = False
+
+        self.thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+        self.thread.start()
+
+    def submit(self, products: List[Dict[str, Any]], recommendations: List[Any]) -> bool:
+        """Queue a served batch; never blocks (the batch is dropped when the queue is full)"""
+        if self._stopping:
+            return False
+        try:
+            self.queue.put_nowait((products, recommendations))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def refresh_state(self, serving_model, force: bool = False) -> bool:
+        """Snapshot the serving model's feature state when due; call from the thread that serves it"""
+        if not force and time.monotonic() - self.state_time < self.state_refresh_s:
+            return False
+        self._pending_state = feature_state_snapshot(serving_model)
+        self.state_time = time.monotonic()
+        return True
+
+    def stop(self):
+        self._stopping = True
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while not self._stopping:
+            item = self.queue.get()
+            if item is None:
+                return
+            state, self._pending_state = self._pending_state, None
+            if state is not None:
+                for name, value in state.items():
+                    setattr(self.model, name, value)
+            try:
+                self._score(*item)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error shadow scoring with model {self.version}: {e}")
+
+    def _score(self, products: List[Dict[str, Any]], recommendations: List[Any]):
+        if not products or len(recommendations) != len(products):
+            self.skipped += 1
+            return
+        modelled = [i for i, recommendation in enumerate(recommendations) if not recommendation.get('fallback_mode')]
+        if len(modelled) < len(products):
+            self.fallback_rows += len(products) - len(modelled)
+            products = [products[i] for i in modelled]
+            recommendations = [recommendations[i] for i in modelled]
+        served = [recommendation.get('predicted_optimal_price', recommendation.get('final_recommended_price'))
+                  for recommendation in recommendations]
+        if not products or any(price is None for price in served):
+            # e.g. an all-fallback batch, or a /recommendations projection without prices
+            self.skipped += 1
+            return
+        served = np.asarray(served, dtype=np.float64)
+        timestamp = recommendations[0].get('timestamp')
+        context = PricingContext(parse_datetime(timestamp) if timestamp else None)
+
+        start_time = time.perf_counter()
+        prices = self.model.predict_price_array(products, context)
+        self.latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+        priced = served > 0
+        self.divergence_pct.extend((np.abs(prices[priced] - served[priced]) / served[priced] * 100).tolist())
+        self.batches += 1
+        self.products += len(products)
+        if self.log_every and self.batches % self.log_every == 0:
+            stats = self.get_stats()
+            print(f"Shadow {self.version}: {stats['products']} products, divergence mean "
+                  f"{stats['divergence_mean_pct']}% p99 {stats['divergence_p99_pct']}%, "
+                  f"{stats['diverged_share']:.1%} over {self.divergence_threshold_pct}%, "
+                  f"latency p50 {stats['latency_p50_ms']}ms p99 {stats['latency_p99_ms']}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        divergence = np.fromiter(self.divergence_pct, dtype=np.float64)
+        latencies = np.fromiter(self.latencies_ms, dtype=np.float64)
+        d_mean = float(divergence.mean()) if len(divergence) else 0.0
+        d_p50, d_p99 = np.percentile(divergence, [50, 99]) if len(divergence) else (0.0, 0.0)
+        l_p50, l_p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            'candidate_version': self.version,
+            'batches': self.batches,
+            'products': self.products,
+            'pending': self.queue.qsize(),
+            'dropped_batches': self.dropped,
+            'skipped_batches': self.skipped,
+            'fallback_rows': self.fallback_rows,
+            'errors': self.errors,
+            'divergence_mean_pct': round(d_mean, 3),
+            'divergence_p50_pct': round(float(d_p50), 3),
+            'divergence_p99_pct': round(float(d_p99), 3),
+            'diverged_share': float(np.mean(divergence > self.divergence_threshold_pct)) if len(divergence) else 0.0,
+            'latency_p50_ms': round(float(l_p50), 3),
+            'latency_p99_ms': round(float(l_p99), 3)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage versioned pricing models')
+    parser.add_argument('--root', default=REGISTRY_ROOT)
+    commands = parser.add_subparsers(dest='command', required=True)
+    register = commands.add_parser('register', help='Add a save_model pickle as a new version')
+    register.add_argument('model_path', nargs='?', default='data/pricing_model.pkl')
+    register.add_argument('--note', default='')
+    register.add_argument('--activate', action='store_true', help='Also make it ACTIVE')
+    shadow = commands.add_parser('shadow', help='Score a version in shadow next to the active one')
+    shadow.add_argument('version', nargs='?')
+    shadow.add_argument('--stop', action='store_true')
+    promote = commands.add_parser('promote', help='Make a version (default: the candidate) ACTIVE')
+    promote.add_argument('version', nargs='?')
+    commands.add_parser('rollback', help='Re-activate the previously active version')
+    commands.add_parser('status')
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root)
+    try:
+        if args.command == 'register':
+            version = registry.register_file(args.model_path, args.note)
+            if args.activate:
+                registry.promote(version)
+        elif args.command == 'shadow':
+            if not args.stop and not args.version:
+                parser.error('shadow needs a version or --stop')
+            registry.set_candidate(None if args.stop else args.version)
+        elif args.command == 'promote':
+            registry.promote(args.version)
+        elif args.command == 'rollback':
+            registry.rollback()
+    except (ValueError, RuntimeError) as e:
+        parser.exit(1, f"Error: {e}\n")
+    print(json.dumps(registry.status(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Partitioned Inventory
+
+Inventory state split by store/warehouse location. Each partition owns its
+own product records, ProductVectorStore and RealtimePricingModel (and so its
+own price history), all keyed by (location, product_id). Partitions are
+materialized lazily on first access, persisted under one directory per
+location, and can be evicted so that memory follows the set of active
+stores rather than the whole chain.
+"""
+
+import hashlib
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from inventory_schema import load_inventory_records, record_location
+
+ProductKey = Tuple[str, str]
+
+def partition_dirname(location: str) -> str:
+    """Filesystem-safe, collision-free directory name for a location"""
+    slug = re.sub(r'[^a-z0-9]+', '-', location.lower()).strip('-')[:40]
+    digest = hashlib.sha1(location.encode('utf-8')).hexdigest()[:8]
+    return f"{slug}-{digest}" if slug else digest
+
+class InventoryPartition:
+    def __init__(self, location: str, products: List[Dict[str, Any]], base_dir: str, encoder: str = 'hashing'):
+        self.location = location
+        self.products = products
+        self.path = os.path.join(base_dir, partition_dirname(location))
+        self.encoder = encoder
+        self._vector_store = None
+        self._pricing_model = None
+        self.lock = threading.Lock()
+
+    @property
+    def vector_store(self):
+        """Per-location vector store, loaded from disk or indexed on first use"""
+        with self.lock:
+            if self._vector_store is None:
+                from vector_store import ProductVectorStore
+
+                store = ProductVectorStore(os.path.join(self.path, 'vector_store.pkl'), encoder=self.encoder)
+                if not store.load_store():
+                    store.index_products(self.products)
+                elif self.products is not store.products_data:
+                    # The saved store may predate the current CSV: bring new or changed rows in
+                    changed = self._changed_products(store)
+                    if changed:
+                        counts = store.upsert_products(changed)
+                        print(f"Partition {self.location}: {counts['updated']} products updated, "
+                              f"{counts['added']} added since the store was saved")
+                # Share the store's table so upserts are seen by price_products
+                self.products = store.products_data
+                self._vector_store = store
+            return self._vector_store
+
+    def _changed_products(self, store) -> List[Dict[str, Any]]:
+        """This partition's records that are missing from, or differ from, a loaded store"""
+        from product_table import ProductTable
+
+        # Parse the records the same way the store does so values compare like for like
+        records = self.products if isinstance(self.products, ProductTable) else ProductTable.from_records(self.products)
+        changed = []
+        for i in range(len(records)):
+            record = records.record(i)
+            idx = store.product_index.get(record.get('product_id'))
+            if idx is None or store.products_data.record(idx) != record:
+                changed.append(record)
+        return changed
+
+    @property
+    def pricing_model(self):
+        """Per-location pricing model; falls back to rules until one is trained"""
+        with self.lock:
+            if self._pricing_model is None:
+                from realtime_pricing_model import RealtimePricingModel
+
+                model = RealtimePricingModel(model_path=os.path.join(self.path, 'pricing_model.pkl'))
+                model.load_model()
+                self._pricing_model = model
+            return self._pricing_model
+
+    def merge_products(self, products: List[Dict[str, Any]]):
+        """Replace rows with a known product_id and append the rest, without materializing"""
+        from product_table import ProductTable
+
+        rows = {product.get('product_id'): i for i, product in enumerate(self.products)}
+        for product in products:
+            i = rows.get(product.get('product_id'))
+            if i is None:
+                rows[product.get('product_id')] = len(self.products)
+                self.products.append(product)
+            elif isinstance(self.products, ProductTable):
+                self.products.update_row(i, product)
+            else:
+                self.products[i] = product
+
+    def is_materialized(self) -> bool:
+        return self._vector_store is not None or self._pricing_model is not None
+
+    def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        if self._vector_store is not None:
+            return self._vector_store.get_product_by_id(product_id)
+        for product in self.products:
+            if product.get('product_id') == product_id:
+                return product
+        return None
+
+    def price_products(self) -> List[Dict[str, Any]]:
+        """Price every product in this partition"""
+        model = self.pricing_model
+        context = model.begin_pricing_pass()
+        if not model.is_trained:
+            return model.fallback_pricing_batch(self.products, context)
+        return [model.predict_optimal_price(product, context=context) for product in self.products]
+
+    def release(self):
+        """Persist and drop the materialized store and model"""
+        with self.lock:
+            if self._vector_store is not None:
+                self._vector_store.save_store()
+            if self._pricing_model is not None and self._pricing_model.is_trained:
+                self._pricing_model.save_model()
+            self._vector_store = None
+            self._pricing_model = None
+
+class PartitionedInventory:
+    def __init__(self, base_dir: str = "data/partitions", encoder: str = 'hashing', expiry_scheduler=None):
+        self.base_dir = base_dir
+        self.encoder = encoder
+        self.partitions: Dict[str, InventoryPartition] = {}
+        self.lock = threading.Lock()
+        # Optional ExpiryRepricingScheduler kept in step with every added or updated record
+        self.expiry_scheduler = expiry_scheduler
+
+    def add_records(self, records: Iterable[Dict[str, Any]]):
+        """Group product records into partitions without materializing them"""
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records:
+            grouped.setdefault(record_location(record), []).append(record)
+
+        with self.lock:
+            for location, products in grouped.items():
+                partition = self.partitions.get(location)
+                if partition is not None and partition._vector_store is not None:
+                    # Materialized: products is the store's table, so go through the store's index
+                    partition._vector_store.upsert_products(products)
+                else:
+                    if partition is None:
+                        partition = self.partitions[location] = InventoryPartition(location, [], self.base_dir,
+                                                                                   self.encoder)
+                    partition.merge_products(products)
+        if self.expiry_scheduler is not None:
+            self.expiry_scheduler.schedule_products([record for products in grouped.values() for record in products])
+
+    def load_csv(self, csv_path: str = "public/data/grocery-inventory.csv"):
+        """Partition an inventory CSV by warehouse location"""
+        self.add_records(load_inventory_records(csv_path))
+        print(f"Loaded {len(self.partitions)} inventory partitions from {csv_path}")
+
+    def locations(self) -> List[str]:
+        return list(self.partitions)
+
+    def active_locations(self) -> List[str]:
+        """Locations whose store or model is currently held in memory"""
+        return [location for location, partition in self.partitions.items() if partition.is_materialized()]
+
+    def get_partition(self, location: str) -> InventoryPartition:
+        if location not in self.partitions:
+            raise KeyError(f"Unknown location: {location}")
+        return self.partitions[location]
+
+    def get_product(self, key: ProductKey) -> Optional[Dict[str, Any]]:
+        """Look up a product by (location, product_id)"""
+        location, product_id = key
+        if location not in self.partitions:
+            return None
+        return self.partitions[location].get_product(product_id)
+
+    def evict(self, locations: Optional[Iterable[str]] = None):
+        """Persist and unload partitions (all active ones by default)"""
+        for location in list(locations or self.active_locations()):
+            self.partitions[location].release()
+
+    def process_partitions(self, func: Callable[[InventoryPartition], Any],
+                           locations: Optional[Iterable[str]] = None,
+                           max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Run func on each partition concurrently in a thread pool"""
+        selected = list(locations or self.partitions)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {location: executor.submit(func, self.partitions[location]) for location in selected}
+            return {location: future.result() for location, future in futures.items()}
+
+    def map_records(self, func: Callable[[str, List[Dict[str, Any]]], Any],
+                    locations: Optional[Iterable[str]] = None,
+                    max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Run a picklable func(location, records) on each partition in a process pool
+
+        Use this for CPU-bound work that does not need the partition's
+        in-memory store or model.
+        """
+        selected = list(locations or self.partitions)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                location: executor.submit(func, location, self.partitions[location].products)
+                for location in selected
+            }
+            return {location: future.result() for location, future in futures.items()}
+
+    def price_all(self, locations: Optional[Iterable[str]] = None,
+                  max_workers: Optional[int] = None) -> Dict[ProductKey, Dict[str, Any]]:
+        """Price every product in the selected partitions, keyed by (location, product_id)"""
+        results = self.process_partitions(InventoryPartition.price_products, locations, max_workers)
+        return {
+            (location, recommendation['product_id']): recommendation
+            for location, recommendations in results.items()
+            for recommendation in recommendations
+        }
+
+if __name__ == "__main__":
+    inventory = PartitionedInventory()
+    inventory.load_csv()
+
+    sample_locations = inventory.locations()[:3]
+    prices = inventory.price_all(sample_locations)
+    print(f"Priced {len(prices)} products across {len(sample_locations)} locations")
+    print(f"Active partitions: {len(inventory.active_locations())}")
@@ -0,0 +1,248 @@
+"""
+Price Update Hub
+
+Pub/sub fan-out of live repricing results to dashboard subscribers (SSE or
+WebSocket). Publishers push per-SKU field changes; changes to the same SKU
+within one coalescing window are merged, diffed against what subscribers
+last saw, and sent as one compact message. Each message is encoded once and
+shared by every subscriber. Subscribers have bounded buffers, and a
+subscriber whose buffer fills up is dropped rather than slowing the hub.
+"""
+
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+# Fields of a pricing recommendation forwarded to subscribers
+RECOMMENDATION_FIELDS = ['final_recommended_price', 'discount_percent', 'current_price',
+                         'stock_left', 'fallback_mode']
+
+class Subscriber:
+    """Bounded outbound buffer of pre-encoded messages for one client"""
+
+    def __init__(self, subscriber_id: int, max_queue: int):
+        self.id = subscriber_id
+        self.max_queue = max_queue
+        self.queue: deque = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.delivered = 0
+
+    def offer(self, message: bytes) -> bool:
+        """Queue a message; False means the subscriber is too slow and must be dropped"""
+        if len(self.queue) >= self.max_queue:
+            return False
+        self.queue.append(message)
+        self.ready.set()
+        return True
+
+    def close(self):
+        self.closed = True
+        self.queue.clear()
+        self.ready.set()
+
+    async def next_batch(self) -> List[bytes]:
+        """Wait for and take every queued message (empty list once closed)"""
+        while not self.queue and not self.closed:
+            self.ready.clear()
+            await self.ready.wait()
+        if self.closed:
+            return []
+        batch = list(self.queue)
+        self.queue.clear()
+        self.delivered += len(batch)
+        return batch
+
+class PriceUpdateHub:
+    def __init__(self, coalesce_ms: float = 250.0, max_queue: int = 64):
+        self.coalesce_ms = coalesce_ms
+        self.max_queue = max_queue
+
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.last_sent: Dict[str, Dict[str, Any]] = {}
+        self.subscribers: Dict[int, Subscriber] = {}
+        self.sequence = 0
+        self._next_subscriber_id = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.coalesced = 0
+        self.messages_sent = 0
+        self.dropped_subscribers = 0
+
+    def publish(self, product_id: str, fields: Dict[str, Any]):
+        """Record new field values for a SKU; merged until the next flush"""
+        self.published += 1
+        current = self.pending.get(product_id)
+        if current is None:
+            self.pending[product_id] = dict(fields)
+        else:
+            self.coalesced += 1
+            current.update(fields)
+
+    def publish_threadsafe(self, product_id: str, fields: Dict[str, Any]):
+        """Publish from a non-event-loop thread (e.g. the streaming pipeline)"""
+        if self._loop is None:
+            raise RuntimeError("Hub is not running; call start() first")
+        self._loop.call_soon_threadsafe(self.publish, product_id, dict(fields))
+
+    def publish_recommendations(self, recommendations: Iterable[Dict[str, Any]]):
+        """Publish pricing results from RealtimePricingModel / the pricing service"""
+        for recommendation in recommendations:
+            fields = {key: recommendation[key] for key in RECOMMENDATION_FIELDS if key in recommendation}
+            self.publish(recommendation.get('product_id', ''), fields)
+
+    def _diff_pending(self) -> Dict[str, Dict[str, Any]]:
+        """Changed fields per SKU relative to what subscribers last received"""
+        changes = {}
+        for product_id, fields in self.pending.items():
+            previous = self.last_sent.setdefault(product_id, {})
+            delta = {key: value for key, value in fields.items() if previous.get(key) != value}
+            if delta:
+                previous.update(delta)
+                changes[product_id] = delta
+        self.pending = {}
+        return changes
+
+    @staticmethod
+    def encode_event(event: str, payload: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+        """Server-sent event frame"""
+        data = json.dumps(payload, separators=(',', ':'), default=str)
+        prefix = f"id: {event_id}\n" if event_id is not None else ""
+        return f"{prefix}event: {event}\ndata: {data}\n\n".encode('utf-8')
+
+    def flush(self) -> int:
+        """Send one diff message for the current window; returns SKUs changed"""
+        if not self.pending:
+            return 0
+        changes = self._diff_pending()
+        if not changes:
+            return 0
+
+        self.sequence += 1
+        message = self.encode_event('price_delta', {'seq': self.sequence, 'updates': changes}, self.sequence)
+
+        slow = [subscriber for subscriber in self.subscribers.values() if not subscriber.offer(message)]
+        for subscriber in slow:
+            self.unsubscribe(subscriber)
+            self.dropped_subscribers += 1
+        self.messages_sent += len(self.subscribers)
+        return len(changes)
+
+    def subscribe(self) -> Subscriber:
+        """Register a subscriber; its first message is a snapshot of current state"""
+        self._next_subscriber_id += 1
+        subscriber = Subscriber(self._next_subscriber_id, self.max_queue)
+        snapshot = {'seq': self.sequence, 'products': self.last_sent}
+        subscriber.offer(self.encode_event('snapshot', snapshot, self.sequence))
+        self.subscribers[subscriber.id] = subscriber
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.pop(subscriber.id, None)
+        subscriber.close()
+
+    async def run(self):
+        """Flush once per coalescing window until cancelled"""
+        interval = self.coalesce_ms / 1000
+        while True:
+            await asyncio.sleep(interval)
+            self.flush()
+
+    def start(self) -> asyncio.Task:
+        """Start the flush loop on the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._task = loop.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscriber in list(self.subscribers.values()):
+            self.unsubscribe(subscriber)
+
+    async def stream_sse(self, writer: asyncio.StreamWriter, keepalive_s: float = 15.0):
+        """Serve one SSE client on an already-open HTTP connection"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n"
+        )
+        subscriber = self.subscribe()
+        try:
+            while True:
+                try:
+                    batch = await asyncio.wait_for(subscriber.next_batch(), keepalive_s)
+                except asyncio.TimeoutError:
+                    batch = [b": keepalive\n\n"]
+                if not batch:
+                    break
+                writer.write(b"".join(batch))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.unsubscribe(subscriber)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self.subscribers),
+            'published': self.published,
+            'coalesced': self.coalesced,
+            'sequence': self.sequence,
+            'messages_sent': self.messages_sent,
+            'dropped_subscribers': self.dropped_subscribers,
+            'tracked_products': len(self.last_sent)
+        }
+
+async def simulate_fanout(subscribers: int = 5000, products: int = 1000, windows: int = 20,
+                          updates_per_window: int = 3000, slow_fraction: float = 0.01,
+                          max_queue: int = 8) -> Dict[str, Any]:
+    """Drive the hub with synthetic updates and a mix of fast and stalled subscribers"""
+    import random
+
+    hub = PriceUpdateHub(max_queue=max_queue)
+    rng = random.Random(42)
+    clients = [hub.subscribe() for _ in range(subscribers)]
+    slow_ids = {client.id for client in clients[:int(subscribers * slow_fraction)]}
+
+    async def consume(client: Subscriber):
+        while await client.next_batch():
+            pass
+
+    consumers = [asyncio.create_task(consume(client)) for client in clients if client.id not in slow_ids]
+    await asyncio.sleep(0)
+
+    flush_seconds = 0.0
+    start_time = time.perf_counter()
+    for _ in range(windows):
+        for _ in range(updates_per_window):
+            product_id = str(rng.randrange(products))
+            hub.publish(product_id, {'final_recommended_price': round(rng.uniform(1, 20), 2)})
+        flush_start = time.perf_counter()
+        hub.flush()
+        flush_seconds += time.perf_counter() - flush_start
+        # Give consumers one turn to drain, as a real event loop would between windows
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start_time
+
+    stats = hub.get_stats()
+    hub.stop()
+    await asyncio.gather(*consumers)
+
+    stats.update({
+        'deliveries_per_sec': round(stats['messages_sent'] / flush_seconds) if flush_seconds else 0,
+        'avg_flush_ms': round(flush_seconds / windows * 1000, 3),
+        'total_seconds': round(elapsed, 3)
+    })
+    return stats
+
+if __name__ == "__main__":
+    results = asyncio.run(simulate_fanout())
+    for key, value in results.items():
+        print(f"{key}: {value}")
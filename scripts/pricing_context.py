@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_DAYS_TO_EXPIRY = 7
+DEFAULT_HOURS_TO_EXPIRY = 168
+
+def parse_datetime(value: Any) -> datetime:
+    """Parse a date/datetime value, only falling back to pandas for unusual formats"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        import pandas as pd
+        return pd.to_datetime(value).to_pydatetime()
+
+class PricingContext:
+    """Frozen clock and memoized per-pass lookups for one pricing pass
+
+    Everything that depends only on the current time (hour/weekday demand,
+    the region x season x category factor table, days to a given expiry
+    date) is computed once per pass, so a full-catalog pass does constant
+    work per product and every product in the pass sees the same "now".
+    """
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or datetime.now()
+        self.hour = self.now.hour
+        self.weekday = self.now.weekday()
+        self.month = self.now.month
+
+        self._category_demand: Optional[float] = None
+        self._seasonal_table: Optional[Any] = None
+        self._expiry_offsets: Dict[Any, Tuple[int, float]] = {}
+
+    def category_demand(self, compute: Callable[['PricingContext'], float]) -> float:
+        """Time-of-day/weekday demand multiplier, computed once per pass"""
+        if self._category_demand is None:
+            self._category_demand = compute(self)
+        return self._category_demand
+
+    def seasonal_table(self, compute: Callable[['PricingContext'], Any]) -> Any:
+        """Seasonal factor lookup table for this pass's month, built once per pass"""
+        if self._seasonal_table is None:
+            self._seasonal_table = compute(self)
+        return self._seasonal_table
+
+    def expiry_offsets(self, expiry_value: Any) -> Tuple[int, float]:
+        """(days_to_expiry, hours_to_expiry) relative to the pass clock"""
+        key = expiry_value if isinstance(expiry_value, (str, int, float)) else str(expiry_value)
+        offsets = self._expiry_offsets.get(key)
+        if offsets is None:
+            try:
+                seconds = (parse_datetime(expiry_value) - self.now).total_seconds()
+                offsets = (int(seconds // 86400), seconds / 3600)
+            except Exception:
+                offsets = (DEFAULT_DAYS_TO_EXPIRY, DEFAULT_HOURS_TO_EXPIRY)
+            self._expiry_offsets[key] = offsets
+        return offsets
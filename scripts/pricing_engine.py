@@ -1,13 +1,23 @@
-import pathway as pw
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from datetime import datetime, timedelta
 import json
 
+from pricing_rules import apply_rule_pricing
+
+def _parse_expiry_date(value):
+    """Parse an expiry date, only falling back to pandas for unusual formats"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        import pandas as pd
+        return pd.to_datetime(value).to_pydatetime()
+
 class LivePricingEngine:
     def __init__(self):
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        # Built on first training so rule-based pricing never imports sklearn
+        self.model = None
         self.is_trained = False
         self.price_history = {}
         
@@ -17,12 +27,16 @@ class LivePricingEngine:
         features = self._extract_features(historical_data)
         targets = historical_data['optimal_price'].values
         
+        from sklearn.ensemble import RandomForestRegressor
+        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
         self.model.fit(features, targets)
         self.is_trained = True
         print("Pricing model trained successfully")
     
     def _extract_features(self, data):
         """Extract features for pricing model"""
+        import pandas as pd
+        
         features = []
         for _, row in data.iterrows():
             # Days until expiry
@@ -54,6 +68,7 @@ class LivePricingEngine:
             # Simple rule-based pricing if model not trained
             return self._rule_based_pricing(product_data)
         
+        import pandas as pd
         features = self._extract_features(pd.DataFrame([product_data]))
         predicted_price = self.model.predict(features)[0]
         
@@ -67,30 +82,17 @@ class LivePricingEngine:
     
     def _rule_based_pricing(self, product_data):
         """Fallback rule-based pricing"""
-        base_price = product_data['current_price']
-        
         # Days until expiry factor
-        expiry_date = pd.to_datetime(product_data['expiry_date'])
+        expiry_date = _parse_expiry_date(product_data['expiry_date'])
         days_to_expiry = (expiry_date - datetime.now()).days
         
-        if days_to_expiry <= 1:
-            discount = 0.4  # 40% off
-        elif days_to_expiry <= 3:
-            discount = 0.25  # 25% off
-        elif days_to_expiry <= 7:
-            discount = 0.15  # 15% off
-        else:
-            discount = 0
-        
-        # Stock level factor
-        stock_left = product_data['stock_left']
-        if stock_left > 50:
-            discount += 0.1  # Additional 10% off for overstocked items
-        elif stock_left < 10:
-            discount -= 0.1  # 10% markup for low stock
-        
-        final_price = base_price * (1 - discount)
-        return round(max(final_price, base_price * 0.5), 2)  # Minimum 50% of original price
+        # Expiry tiers, stock adjustment and the 50% price floor come from the
+        # shared 'live_engine' rule profile
+        prices, _ = apply_rule_pricing(
+            [product_data['current_price']], [days_to_expiry], [product_data['stock_left']],
+            profile='live_engine'
+        )
+        return float(prices[0])
 
 # Initialize the pricing engine
 pricing_engine = LivePricingEngine()
@@ -0,0 +1,125 @@
+"""
+Pricing Results
+
+Compact, lazily explained recommendation records returned by
+RealtimePricingModel.predict_optimal_price / recommend_prices.
+
+Prices and confidence are stored in `__slots__` attributes. The expensive
+explanation fields are only built on first access and then memoised:
+`reasoning` per result, `business_metrics` once for the whole batch (one
+vectorized pass on the first row that asks). `model_performance` is read
+from the model rather than copied into each result.
+
+Results still behave like the old dicts for reads (`result['reasoning']`,
+`.get`, `in`), and `to_dict(fields)` projects to just the fields a caller
+needs, so bulk consumers that only want prices never pay for explanations.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Full response schema, in the order predict_optimal_price has always returned it
+RESULT_FIELDS = ('product_id', 'current_price', 'predicted_optimal_price', 'q_learning_adjustment',
+                 'final_recommended_price', 'discount_percent', 'confidence_score', 'model_performance',
+                 'business_metrics', 'reasoning', 'timestamp', 'model_version')
+
+def validate_fields(fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """Projection list with unknown names rejected (None means every field, [] is an error)"""
+    if fields is None:
+        return None
+    if isinstance(fields, str) or not all(isinstance(field, str) for field in fields):
+        raise ValueError('fields must be a list of field names')
+    fields = list(fields)
+    if not fields:
+        raise ValueError('fields must name at least one field (omit it for every field)')
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown result fields: {', '.join(unknown)} (available: {', '.join(RESULT_FIELDS)})")
+    return fields
+
+def project(result: Any, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Plain dict of a PricingResult or a fallback dict, limited to `fields`"""
+    if isinstance(result, PricingResult):
+        return result.to_dict(fields)
+    if fields is None:
+        return result
+    return {field: result[field] for field in fields if field in result}
+
+class RecommendationBatch:
+    """Inputs shared by the results of one pricing call, kept for lazy explanations"""
+
+    __slots__ = ('model', 'products', 'final_prices', 'context', '_metrics')
+
+    def __init__(self, model, products: List[Dict[str, Any]], final_prices: np.ndarray, context=None):
+        self.model = model
+        self.products = products
+        self.final_prices = final_prices
+        self.context = context
+        self._metrics: Optional[List[Dict[str, Any]]] = None
+
+    def business_metrics(self, index: int) -> Dict[str, Any]:
+        if self._metrics is None:
+            self._metrics = self.model.business_metrics_batch(self.products, self.final_prices)
+        return self._metrics[index]
+
+class PricingResult:
+    """One recommendation; explanation fields are computed on first access"""
+
+    __slots__ = ('product_id', 'current_price', 'predicted_optimal_price', 'q_learning_adjustment',
+                 'final_recommended_price', 'discount_percent', 'confidence_score', 'timestamp',
+                 'model_version', '_batch', '_index', '_reasoning')
+
+    def __init__(self, batch: RecommendationBatch, index: int, product_id: str, current_price: float,
+                 predicted_optimal_price: float, q_learning_adjustment: float, final_recommended_price: float,
+                 discount_percent: float, confidence_score: float, timestamp: str, model_version: str):
+        self._batch = batch
+        self._index = index
+        self._reasoning: Optional[str] = None
+        self.product_id = product_id
+        self.current_price = current_price
+        self.predicted_optimal_price = predicted_optimal_price
+        self.q_learning_adjustment = q_learning_adjustment
+        self.final_recommended_price = final_recommended_price
+        self.discount_percent = discount_percent
+        self.confidence_score = confidence_score
+        self.timestamp = timestamp
+        self.model_version = model_version
+
+    @property
+    def reasoning(self) -> str:
+        if self._reasoning is None:
+            batch = self._batch
+            self._reasoning = batch.model.generate_reasoning(batch.products[self._index],
+                                                             self.final_recommended_price, batch.context)
+        return self._reasoning
+
+    @property
+    def business_metrics(self) -> Dict[str, Any]:
+        return self._batch.business_metrics(self._index)
+
+    @property
+    def model_performance(self) -> Dict[str, Any]:
+        return self._batch.model.model_performance
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in RESULT_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in RESULT_FIELDS
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in RESULT_FIELDS else default
+
+    def keys(self):
+        return iter(RESULT_FIELDS)
+
+    def to_dict(self, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Plain dict of the requested fields (all by default), e.g. for JSON"""
+        return {field: getattr(self, field) for field in (RESULT_FIELDS if fields is None else fields)}
+
+    def __repr__(self) -> str:
+        return (f"PricingResult(product_id={self.product_id!r}, "
+                f"final_recommended_price={self.final_recommended_price:.2f}, model_version={self.model_version!r})")
@@ -0,0 +1,127 @@
+import numpy as np
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Declarative rule table shared by every rule-based pricing path.
+#
+# Each profile lists expiry tiers as (max_days_to_expiry, discount) and stock
+# tiers as (operator, threshold, discount), evaluated in order so the first
+# matching tier wins within a group. Discounts are fractions of the current
+# price; negative values are markups. `combine` controls how the two groups
+# interact:
+#   'first'    - expiry and stock tiers form one ordered list, first match wins
+#   'add'      - expiry and stock discounts are summed
+#   'multiply' - expiry and stock price multipliers are compounded
+RULE_PROFILES = {
+    # RealtimePricingModel.fallback_pricing
+    'realtime_fallback': {
+        'expiry_rules': [(1, 0.40), (2, 0.25), (5, 0.15)],
+        'stock_rules': [('>', 100, 0.10)],
+        'combine': 'first',
+        'min_price_ratio': None,
+        'round_to': None
+    },
+    # LivePricingEngine._rule_based_pricing
+    'live_engine': {
+        'expiry_rules': [(1, 0.40), (3, 0.25), (7, 0.15)],
+        'stock_rules': [('>', 50, 0.10), ('<', 10, -0.10)],
+        'combine': 'add',
+        'min_price_ratio': 0.5,
+        'round_to': 2
+    },
+    # InventorySimulator.simulate_price_changes (market noise is applied by the simulator)
+    'simulator': {
+        'expiry_rules': [(1, 0.40), (3, 0.25), (7, 0.15)],
+        'stock_rules': [('>', 100, 0.10), ('<', 10, -0.10)],
+        'combine': 'multiply',
+        'min_price_ratio': None,
+        'round_to': None
+    }
+}
+
+DEFAULT_PROFILE = 'realtime_fallback'
+
+# Every days_to_expiry bound used by an expiry tier; discounts can only change when one is crossed
+EXPIRY_THRESHOLDS = sorted({max_days for rules in RULE_PROFILES.values() for max_days, _ in rules['expiry_rules']})
+
+_COMPARATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal
+}
+
+def get_rule_profile(profile: str) -> Dict[str, Any]:
+    """Look up a named rule profile"""
+    if profile not in RULE_PROFILES:
+        raise ValueError(f"Unknown pricing rule profile: {profile!r} (available: {', '.join(RULE_PROFILES)})")
+    return RULE_PROFILES[profile]
+
+def _expiry_tiers(profile: Dict[str, Any], days: np.ndarray):
+    conditions = [days <= max_days for max_days, _ in profile['expiry_rules']]
+    choices = [discount for _, discount in profile['expiry_rules']]
+    return conditions, choices
+
+def _stock_tiers(profile: Dict[str, Any], stock: np.ndarray):
+    conditions = [_COMPARATORS[op](stock, threshold) for op, threshold, _ in profile['stock_rules']]
+    choices = [discount for _, _, discount in profile['stock_rules']]
+    return conditions, choices
+
+def compute_rule_discounts(days_to_expiry, stock_left, profile: str = DEFAULT_PROFILE) -> np.ndarray:
+    """Evaluate a rule profile over whole arrays and return discount fractions"""
+    rules = get_rule_profile(profile)
+    days = np.asarray(days_to_expiry, dtype=np.float64)
+    stock = np.asarray(stock_left, dtype=np.float64)
+
+    expiry_conditions, expiry_choices = _expiry_tiers(rules, days)
+    stock_conditions, stock_choices = _stock_tiers(rules, stock)
+
+    if rules['combine'] == 'first':
+        return np.select(expiry_conditions + stock_conditions, expiry_choices + stock_choices, default=0.0)
+
+    expiry_discount = np.select(expiry_conditions, expiry_choices, default=0.0)
+    stock_discount = np.select(stock_conditions, stock_choices, default=0.0)
+
+    if rules['combine'] == 'add':
+        return expiry_discount + stock_discount
+    if rules['combine'] == 'multiply':
+        return 1.0 - (1.0 - expiry_discount) * (1.0 - stock_discount)
+
+    raise ValueError(f"Unknown combine mode: {rules['combine']!r}")
+
+def apply_rule_pricing(current_price, days_to_expiry, stock_left,
+                       profile: str = DEFAULT_PROFILE) -> Tuple[np.ndarray, np.ndarray]:
+    """Price whole arrays of products with a rule profile
+
+    Returns (recommended_prices, discount_fractions). Discounts reflect the
+    applied price after any price floor.
+    """
+    rules = get_rule_profile(profile)
+    prices = np.asarray(current_price, dtype=np.float64)
+    discounts = compute_rule_discounts(days_to_expiry, stock_left, profile)
+
+    if rules['min_price_ratio'] is not None:
+        discounts = np.minimum(discounts, 1.0 - rules['min_price_ratio'])
+
+    recommended = prices * (1.0 - discounts)
+    if rules['round_to'] is not None:
+        recommended = np.round(recommended, rules['round_to'])
+
+    return recommended, discounts
+
+def parse_expiry_dates(values: Sequence[Any]) -> np.ndarray:
+    """Parse expiry dates into a datetime64[s] array (NaT where unparseable)"""
+    try:
+        return np.array(values, dtype='datetime64[s]')
+    except (ValueError, TypeError):
+        # Non-ISO formats (e.g. the 1/31/2025 dates in the inventory CSV)
+        import pandas as pd
+        parsed = pd.to_datetime(pd.Series(list(values), dtype=object), errors='coerce')
+        return parsed.to_numpy(dtype='datetime64[ns]').astype('datetime64[s]')
+
+def days_until(expiry_dates: np.ndarray, now: Optional[datetime] = None, default: int = 7) -> np.ndarray:
+    """Whole days from `now` until each expiry date, matching timedelta.days flooring"""
+    now64 = np.datetime64(now or datetime.now(), 's')
+    seconds = (expiry_dates - now64).astype('timedelta64[s]').astype(np.int64)
+    days = np.floor_divide(seconds, 86400)
+    return np.where(np.isnat(expiry_dates), default, days)
@@ -0,0 +1,899 @@
+"""
+Pricing Service
+
+Small asyncio HTTP/1.1 front end (TCP or Unix socket) that keeps a
+RealtimePricingModel and ProductVectorStore warm in one process so the
+Next.js routes can call them without paying model load cost per request.
+
+Concurrent single-product pricing requests are collapsed into micro-batches
+and priced with one vectorized `predict_price_array` call on a worker
+thread, so the event loop never runs model code.
+
+Indexed products are also repriced, and the deltas pushed to /stream, at
+the moment their expiry discount bucket changes (see expiry_scheduler.py)
+instead of on a fixed polling interval.
+
+Endpoints:
+    GET  /health           liveness and model/store status
+    GET  /metrics          request, batching and admission counters
+    POST /price            {"product": {...}}
+    POST /price/batch      {"products": [...]}
+    POST /recommendations  {"products": [...], "fields": [...]}  predict_optimal_price schema (model_performance
+                           once per response), or only the requested fields
+    GET  /price/history?product_id=..
+    GET  /model            model_version, performance, last training time and, with a registry,
+                           its ACTIVE/CANDIDATE versions and shadow divergence (see model_registry.py)
+    POST /model/promote    {"version": ".."} (default: the shadow candidate) made ACTIVE in place
+    POST /model/rollback   re-activate the previously active version
+    POST /model/shadow     {"version": ".."} to shadow-score a candidate, {"version": null} to stop
+    GET  /search?q=..&page=1&page_size=20&category=..&max_price=..&min_stock=..
+    POST /search           {"query": "...", "page": 1, "page_size": 20, "filters": {...}}
+    GET  /search/similar?product_id=..&page=1&page_size=5
+    GET  /search/expiring?days=7   /search/low-stock?threshold=20
+    GET  /search/category?category=..   /search/analytics
+    GET  /stream           server-sent price deltas (see price_hub.py)
+    GET  /urgent?n=10&by=urgency|discount   top-N most urgent SKUs
+    POST /detect           {"camera_id": "..", "frames": [base64, ...], "rois": [[x, y, w, h], ...]}
+                           or {"imageData": base64}; frames of all requests share one detection
+                           queue; returns detections and changed shelf counts (see shelf_detection.py)
+    GET  /export?format=csv|jsonl           chunked pricing report (see report_export.py)
+
+Only the standard library is used for the server itself.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import time
+from collections import deque
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from batch_pricing import price_products, recommend_products
+from pricing_result import validate_fields
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+# Bursts of concurrent route handlers overflow asyncio's default backlog of 100
+LISTEN_BACKLOG = 1024
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable'
+}
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _positive_price(value: Any) -> bool:
+    """True for a finite price above zero (discounts divide by it)"""
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return False
+    return math.isfinite(price) and price > 0
+
+def _count(value: Any) -> bool:
+    """True for a non-negative whole number the model's int() conversion accepts"""
+    if isinstance(value, bool):
+        return False
+    try:
+        count = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return False
+    return count >= 0 and float(value) == count
+
+def product_error(product: Any) -> Optional[str]:
+    """Why a request product cannot be priced, or None"""
+    if not isinstance(product, dict):
+        return 'must be an object'
+    if not _positive_price(product.get('current_price')):
+        return 'current_price must be a positive number'
+    for field in ('stock_left', 'days_to_expiry'):
+        if field in product and not _count(product[field]):
+            return f'{field} must be a non-negative integer'
+    return None
+
+def validate_products(products: Any):
+    """400 naming the first product that cannot be priced"""
+    if not isinstance(products, list):
+        raise HTTPError(400, 'Expected {"products": [...]}')
+    for index, product in enumerate(products):
+        error = product_error(product)
+        if error is not None:
+            raise HTTPError(400, f'products[{index}]: {error}')
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> Any:
+        if not self.body:
+            return {}
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, 'Request body is not valid JSON')
+
+    def json_object(self) -> Dict[str, Any]:
+        """JSON body that must be an object (400 otherwise)"""
+        payload = self.json()
+        if not isinstance(payload, dict):
+            raise HTTPError(400, 'Request body must be a JSON object')
+        return payload
+
+    @property
+    def keep_alive(self) -> bool:
+        return self.headers.get('connection', '').lower() != 'close'
+
+class PricingBatcher:
+    """Collapses concurrent pricing requests into vectorized batches
+
+    Requests are queued until either `max_batch_size` are waiting or the
+    oldest has waited `max_wait_ms`; the whole batch is then priced in one
+    executor call. With the default single worker thread the model is never
+    touched concurrently.
+    """
+
+    def __init__(self, model, executor: ThreadPoolExecutor,
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.model = model
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self.pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+        self.batches = 0
+        self.batched_items = 0
+        self.max_observed_batch = 0
+
+        # Optional ShadowScorer fed each served batch after it resolves
+        self.shadow = None
+
+    async def price(self, product: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((product, future))
+
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if not self.pending:
+            return
+
+        batch, self.pending = self.pending, []
+        self.batches += 1
+        self.batched_items += len(batch)
+        self.max_observed_batch = max(self.max_observed_batch, len(batch))
+
+        products = [product for product, _ in batch]
+        task = asyncio.get_running_loop().run_in_executor(self.executor, price_products, self.model, products)
+        task.add_done_callback(lambda done: self._resolve(batch, done))
+        if self.shadow is not None:
+            task.add_done_callback(lambda done: self._submit_shadow(products, done))
+
+    def _submit_shadow(self, products: List[Dict[str, Any]], done: asyncio.Future):
+        if self.shadow is not None and not done.cancelled() and done.exception() is None:
+            self.shadow.submit(products, done.result())
+
+    @staticmethod
+    def _resolve(batch, done: asyncio.Future):
+        error = done.exception()
+        results = None if error else done.result()
+        for i, (_, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'batched_items': self.batched_items,
+            'avg_batch_size': self.batched_items / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_observed_batch,
+            'pending': len(self.pending)
+        }
+
+class PricingService:
+    def __init__(self, model=None, vector_store=None, max_batch_size: int = 64,
+                 max_wait_ms: float = 2.0, max_workers: int = 1, hub=None,
+                 shared_state_root: Optional[str] = None, registry_root: Optional[str] = None):
+        self.model = model
+        self.vector_store = vector_store
+        self.hub = hub
+        # When set, estimators come from memory-mapped shared state (see shared_state.py)
+        self.shared_state = None
+        self.shared_state_root = shared_state_root
+        # When set, the registry's ACTIVE version is served and its CANDIDATE shadowed (see model_registry.py)
+        self.registry = None
+        self.registry_root = registry_root
+        self.shadow = None
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pricing')
+        self.batcher = PricingBatcher(self.model, self.executor, max_batch_size, max_wait_ms)
+        self.max_batch_size = max_batch_size
+        self.search = None
+        self.detection = None
+        # Frames of every /detect request are drained from the worker's queue by one task
+        self.detection_task: Optional[asyncio.Task] = None
+        self.detection_wakeup: Optional[asyncio.Event] = None
+        self.detection_waiters: Dict[int, asyncio.Future] = {}
+        self.detection_ids = itertools.count()
+        self.expiry_scheduler = None
+
+        self.routes: Dict[Tuple[str, str], Callable[[Request], Awaitable[Any]]] = {
+            ('GET', '/health'): self.handle_health,
+            ('GET', '/metrics'): self.handle_metrics,
+            ('POST', '/price'): self.handle_price,
+            ('POST', '/price/batch'): self.handle_price_batch,
+            ('POST', '/recommendations'): self.handle_recommendations,
+            ('GET', '/price/history'): self.handle_price_history,
+            ('GET', '/model'): self.handle_model,
+            ('POST', '/model/promote'): self.handle_promote,
+            ('POST', '/model/rollback'): self.handle_rollback,
+            ('POST', '/model/shadow'): self.handle_shadow,
+            ('GET', '/search'): self.handle_search,
+            ('POST', '/search'): self.handle_search,
+            ('GET', '/search/similar'): self.handle_similar,
+            ('GET', '/search/expiring'): self.handle_search_list,
+            ('GET', '/search/low-stock'): self.handle_search_list,
+            ('GET', '/search/category'): self.handle_search_list,
+            ('GET', '/search/analytics'): self.handle_search_analytics,
+            ('GET', '/urgent'): self.handle_urgent,
+            ('POST', '/detect'): self.handle_detect
+        }
+
+        self.started_at = time.time()
+        self.request_counts: Dict[str, int] = {}
+        self.error_count = 0
+        self.latencies_ms = deque(maxlen=1000)
+
+    def warm_up(self):
+        """Load the model and vector store once at startup"""
+        if self.model is None:
+            from realtime_pricing_model import RealtimePricingModel, initialize_pricing_model
+            if self.shared_state_root:
+                self.model = RealtimePricingModel()
+            else:
+                self.model = initialize_pricing_model()
+            self.batcher.model = self.model
+        if self.registry_root:
+            from model_registry import ModelRegistry
+            self.registry = ModelRegistry(self.registry_root)
+            self.apply_registry()
+        if self.shared_state_root:
+            from shared_state import SharedStateReader
+            self.shared_state = SharedStateReader(self.shared_state_root)
+            self.shared_state.attach_model(self.model)
+        if self.hub is None:
+            from price_hub import PriceUpdateHub
+            self.hub = PriceUpdateHub()
+        if self.vector_store is None:
+            from vector_store import get_vector_store
+            self.vector_store = get_vector_store()
+            if self.vector_store.product_vectors is None:
+                self.vector_store.load_store()
+        if self.search is None:
+            from search_service import ProductSearchService
+            self.search = ProductSearchService(self.vector_store)
+        if self.vector_store.products_data:
+            self.model.seed_demand(self.vector_store.products_data)
+            self.model.track_urgency(self.vector_store.products_data)
+        if self.expiry_scheduler is None:
+            from expiry_scheduler import ExpiryRepricingScheduler
+            self.expiry_scheduler = ExpiryRepricingScheduler()
+            self.expiry_scheduler.schedule_products(self.vector_store.products_data)
+
+    async def watch_shared_state(self, interval_s: float = 5.0):
+        """Swap to a newly published shared state version between batches"""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                if await self.run_cpu(self.shared_state.refresh):
+                    await self.run_cpu(self.shared_state.state.attach_model, self.model)
+                    print(f"Switched to shared state {self.shared_state.state.version}")
+            except Exception as e:
+                print(f"Error refreshing shared state: {e}")
+
+    def apply_registry(self):
+        """Serve the ACTIVE version and shadow the CANDIDATE; run between batches on the pricing thread"""
+        from model_registry import ShadowScorer
+
+        active = self.registry.active_version()
+        if active and active != getattr(self.model, 'registry_version', None):
+            self.registry.attach(self.model, active)
+            print(f"Serving model {active}")
+
+        candidate = self.registry.candidate_version()
+        if candidate == active:
+            candidate = None
+        if candidate != (self.shadow.version if self.shadow else None):
+            if self.shadow:
+                self.shadow.stop()
+            self.shadow = None
+            if candidate:
+                self.shadow = ShadowScorer(self.registry.shadow_model(self.model, candidate), candidate)
+                print(f"Shadow scoring model {candidate}")
+            self.batcher.shadow = self.shadow
+        elif self.shadow:
+            # Keep the candidate's copy of price history and forecasts close to the serving model's
+            self.shadow.refresh_state(self.model)
+
+    async def sync_registry(self):
+        """Load any newly pointed-to artifacts off the pricing thread, then swap between batches"""
+        for version in (self.registry.active_version(), self.registry.candidate_version()):
+            if version:
+                await asyncio.to_thread(self.registry.load, version)
+        await self.run_cpu(self.apply_registry)
+
+    async def watch_registry(self, interval_s: float = 2.0):
+        """Follow pointer changes made outside this process (e.g. model_registry.py promote)"""
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.sync_registry()
+            except Exception as e:
+                print(f"Error following model registry: {e}")
+
+    def submit_shadow(self, products: List[Dict[str, Any]], recommendations: List[Any]):
+        if self.shadow is not None:
+            self.shadow.submit(products, recommendations)
+
+    async def watch_expiry(self, max_sleep_s: float = 60.0):
+        """Reprice products exactly when their expiry discount bucket changes"""
+        while True:
+            delay = self.expiry_scheduler.seconds_until_next()
+            await asyncio.sleep(max_sleep_s if delay is None else min(delay, max_sleep_s))
+            due_ids = self.expiry_scheduler.due()
+            if not due_ids:
+                continue
+            try:
+                products = [product for product in map(self.vector_store.get_product_by_id, due_ids) if product]
+                for start in range(0, len(products), self.max_batch_size * 16):
+                    chunk = products[start:start + self.max_batch_size * 16]
+                    recommendations = await self.run_cpu(price_products, self.model, chunk)
+                    self.submit_shadow(chunk, recommendations)
+                    if self.hub:
+                        self.hub.publish_recommendations(recommendations)
+                print(f"Repriced {len(products)} products at an expiry threshold")
+            except Exception as e:
+                print(f"Error repricing at expiry threshold: {e}")
+
+    async def run_cpu(self, func, *args):
+        """Run model/store work on the worker thread"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def handle_health(self, request: Request) -> Dict[str, Any]:
+        return {
+            'status': 'ok',
+            'model_trained': bool(self.model and self.model.is_trained),
+            'model_version': self.model.get_model_version() if self.model else None,
+            'shared_state_version': self.shared_state.state.version if self.shared_state else None,
+            'indexed_products': len(self.vector_store.products_data) if self.vector_store else 0,
+            'uptime_seconds': round(time.time() - self.started_at, 1)
+        }
+
+    async def handle_metrics(self, request: Request) -> Dict[str, Any]:
+        latencies = np.fromiter(self.latencies_ms, dtype=np.float64)
+        p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        return {
+            'requests': dict(self.request_counts),
+            'errors': self.error_count,
+            'latency_ms': {'p50': round(float(p50), 3), 'p99': round(float(p99), 3)},
+            'batching': self.batcher.get_stats(),
+            'hub': self.hub.get_stats() if self.hub else {},
+            'search': self.search.get_stats() if self.search else {},
+            'detection': self.detection.get_stats() if self.detection else {},
+            'expiry_scheduler': self.expiry_scheduler.get_stats() if self.expiry_scheduler else {},
+            'admission': self.model.get_admission_stats() if self.model else {},
+            'shadow': self.shadow.get_stats() if self.shadow else {}
+        }
+
+    async def handle_price(self, request: Request) -> Dict[str, Any]:
+        payload = request.json_object()
+        product = payload.get('product', payload)
+        error = product_error(product)
+        if error is not None:
+            raise HTTPError(400, f'product: {error}')
+        recommendation = await self.batcher.price(product)
+        if self.hub:
+            self.hub.publish_recommendations([recommendation])
+        return recommendation
+
+    async def handle_price_batch(self, request: Request) -> Dict[str, Any]:
+        products = request.json_object().get('products')
+        validate_products(products)
+
+        recommendations = []
+        for start in range(0, len(products), self.max_batch_size * 16):
+            chunk = products[start:start + self.max_batch_size * 16]
+            chunk_recommendations = await self.run_cpu(price_products, self.model, chunk)
+            self.submit_shadow(chunk, chunk_recommendations)
+            recommendations.extend(chunk_recommendations)
+        if self.hub:
+            self.hub.publish_recommendations(recommendations)
+        return {'recommendations': recommendations, 'count': len(recommendations)}
+
+    async def handle_recommendations(self, request: Request) -> Dict[str, Any]:
+        payload = request.json_object()
+        products = payload.get('products')
+        validate_products(products)
+        try:
+            fields = validate_fields(payload.get('fields'))
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, str(e))
+
+        recommendations = []
+        for start in range(0, len(products), self.max_batch_size * 16):
+            chunk = products[start:start + self.max_batch_size * 16]
+            chunk_recommendations = await self.run_cpu(recommend_products, self.model, chunk, fields)
+            self.submit_shadow(chunk, chunk_recommendations)
+            recommendations.extend(chunk_recommendations)
+        if self.hub:
+            self.hub.publish_recommendations(recommendations)
+        return {
+            'recommendations': recommendations,
+            'count': len(recommendations),
+            'model_version': self.model.get_model_version(),
+            # Sent once per response instead of inside every recommendation
+            'model_performance': self.model.model_performance
+        }
+
+    async def handle_price_history(self, request: Request) -> Dict[str, Any]:
+        product_id = request.query.get('product_id')
+        if not product_id:
+            raise HTTPError(400, 'Missing product_id')
+        return {'product_id': product_id, 'history': list(self.model.price_history.get(product_id, []))}
+
+    async def handle_model(self, request: Request) -> Dict[str, Any]:
+        response = {
+            'model_version': self.model.get_model_version(),
+            'is_trained': self.model.is_trained,
+            'last_training': self.model.last_training_time,
+            'performance': self.model.model_performance
+        }
+        if self.registry:
+            response['registry'] = await asyncio.to_thread(self.registry.status)
+            response['shadow'] = self.shadow.get_stats() if self.shadow else None
+        return response
+
+    async def _change_registry(self, change: Callable[..., Any], *args) -> Dict[str, Any]:
+        if self.registry is None:
+            raise HTTPError(404, 'No model registry configured (start with --registry)')
+        try:
+            await asyncio.to_thread(change, *args)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        await self.sync_registry()
+        return await self.handle_model(None)
+
+    async def handle_promote(self, request: Request) -> Dict[str, Any]:
+        return await self._change_registry(self.registry and self.registry.promote,
+                                          request.json_object().get('version'))
+
+    async def handle_rollback(self, request: Request) -> Dict[str, Any]:
+        return await self._change_registry(self.registry and self.registry.rollback)
+
+    async def handle_shadow(self, request: Request) -> Dict[str, Any]:
+        payload = request.json_object()
+        if 'version' not in payload:
+            raise HTTPError(400, 'Expected {"version": "..."} or {"version": null}')
+        return await self._change_registry(self.registry and self.registry.set_candidate, payload['version'])
+
+    async def handle_search(self, request: Request) -> Dict[str, Any]:
+        params = request.json_object() if request.method == 'POST' else request.query
+        query = params.get('query') or params.get('q')
+        if not query:
+            raise HTTPError(400, 'Missing search query')
+        filters = params.get('filters') if request.method == 'POST' else params
+        if not isinstance(filters, dict):
+            raise HTTPError(400, 'filters must be an object')
+        # top_k is the pre-pagination name for the page size
+        page_size = params.get('page_size', params.get('top_k', 20))
+
+        try:
+            response = await self.run_cpu(self.search.search, str(query), params.get('page', 1), page_size, filters)
+        except (TypeError, ValueError) as e:
+            raise HTTPError(400, f'Invalid search parameters: {e}')
+        response['count'] = len(response['results'])
+        return response
+
+    async def handle_similar(self, request: Request) -> Dict[str, Any]:
+        product_id = request.query.get('product_id')
+        if not product_id:
+            raise HTTPError(400, 'Missing product_id')
+        try:
+            response = await self.run_cpu(self.search.similar, product_id, request.query.get('page', 1),
+                                          request.query.get('page_size', 5))
+        except ValueError as e:
+            raise HTTPError(400, f'Invalid search parameters: {e}')
+        if response is None:
+            raise HTTPError(404, f'Product {product_id} not found')
+        return response
+
+    async def handle_search_list(self, request: Request) -> Dict[str, Any]:
+        """Filter queries: /search/expiring, /search/low-stock, /search/category"""
+        params = request.query
+        page, page_size = params.get('page', 1), params.get('page_size', 20)
+        try:
+            if request.path == '/search/expiring':
+                return await self.run_cpu(self.search.expiring, params.get('days', 7), page, page_size)
+            if request.path == '/search/low-stock':
+                return await self.run_cpu(self.search.low_stock, params.get('threshold', 20), page, page_size)
+            if not params.get('category'):
+                raise HTTPError(400, 'Missing category')
+            return await self.run_cpu(self.search.by_category, params['category'], page, page_size)
+        except ValueError as e:
+            raise HTTPError(400, f'Invalid search parameters: {e}')
+
+    async def handle_search_analytics(self, request: Request) -> Dict[str, Any]:
+        return await self.run_cpu(self.vector_store.get_analytics)
+
+    async def handle_urgent(self, request: Request) -> Dict[str, Any]:
+        try:
+            n = int(request.query.get('n', 10))
+        except ValueError:
+            raise HTTPError(400, 'n must be an integer')
+        by = request.query.get('by', 'urgency')
+        if by not in ('urgency', 'discount'):
+            raise HTTPError(400, "by must be 'urgency' or 'discount'")
+        products = await self.run_cpu(self.model.most_urgent_products, n, by)
+        return {'by': by, 'products': products}
+
+    def detection_worker(self):
+        """Shelf detection worker, created on the first /detect request"""
+        if self.detection is None:
+            from shelf_detection import (DEFAULT_UPDATES_PATH, DetectionWorker, ShelfProductMapper, create_detector,
+                                         inventory_sink, jsonl_sink)
+            detector = create_detector(os.environ.get('SHELF_DETECTION_MODEL'),
+                                       [name for name in os.environ.get('SHELF_DETECTION_CLASSES', '').split(',') if name])
+            mapper = ShelfProductMapper(self.vector_store.products_data)
+            sinks = [inventory_sink(self.model, self.vector_store, self.expiry_scheduler),
+                     jsonl_sink(os.environ.get('SHELF_DETECTION_UPDATES', DEFAULT_UPDATES_PATH))]
+            self.detection = DetectionWorker(detector, mapper, sinks)
+        return self.detection
+
+    async def drain_detections(self):
+        """Run queued frames through the worker in batches that mix requests and cameras"""
+        worker = self.detection
+        while True:
+            await self.detection_wakeup.wait()
+            self.detection_wakeup.clear()
+            while True:
+                batch = worker.next_batch()
+                if not batch:
+                    break
+                try:
+                    results = await self.run_cpu(worker.process_batch, batch)
+                except Exception as e:
+                    print(f"Error processing frames: {e}")
+                    for _, _, _, frame_id in batch:
+                        self._resolve_detection(frame_id, error=e)
+                    continue
+                for result in results:
+                    if self.hub:
+                        for update in result['stock_updates']:
+                            self.hub.publish(update['product_id'], {'shelf_count': update['shelf_count'],
+                                                                    'stock_left': update['shelf_count']})
+                    self._resolve_detection(result.pop('frame_id'), result)
+
+    def _resolve_detection(self, frame_id: int, result: Optional[Dict[str, Any]] = None,
+                           error: Optional[Exception] = None):
+        future = self.detection_waiters.pop(frame_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    async def handle_detect(self, request: Request) -> Dict[str, Any]:
+        payload = request.json_object()
+        frames = payload.get('frames') or ([payload['imageData']] if payload.get('imageData') else None)
+        if not isinstance(frames, list) or not all(isinstance(frame, str) for frame in frames):
+            raise HTTPError(400, 'Expected {"frames": [base64, ...]} or {"imageData": base64}')
+        camera_id = str(payload.get('camera_id', 'default'))
+
+        worker = await self.run_cpu(self.detection_worker)
+        if payload.get('location'):
+            worker.mapper.camera_locations.setdefault(camera_id, payload['location'])
+        rois = payload.get('rois')
+        if rois and worker.gate is not None:
+            try:
+                rois = [tuple(int(v) for v in roi) for roi in rois]
+            except (TypeError, ValueError):
+                raise HTTPError(400, 'rois must be [[x, y, w, h], ...]')
+            if worker.gate.rois.get(camera_id) != rois:
+                await self.run_cpu(worker.set_rois, camera_id, rois)
+        if self.detection_task is None:
+            self.detection_wakeup = asyncio.Event()
+            self.detection_task = asyncio.get_running_loop().create_task(self.drain_detections())
+
+        loop = asyncio.get_running_loop()
+        timestamp = datetime.now().isoformat()
+        futures = []
+        for frame in frames:
+            frame_id = next(self.detection_ids)
+            future = loop.create_future()
+            self.detection_waiters[frame_id] = future
+            futures.append(future)
+            dropped = worker.submit(camera_id, frame, timestamp, frame_id)
+            if dropped is not None:
+                self._resolve_detection(dropped[3], error=HTTPError(503, 'Detection queue is full'))
+        self.detection_wakeup.set()
+
+        results = await asyncio.gather(*futures)
+        errors = [result['error'] for result in results if 'error' in result]
+        if errors:
+            raise HTTPError(400, f'Could not process frames: {errors[0]}')
+        return {'camera_id': camera_id, 'results': results, 'detector': worker.detector.name}
+
+    async def stream_export(self, request: Request, writer: asyncio.StreamWriter, chunk_size: int = 2000):
+        """Price the catalog chunk by chunk and send it with chunked transfer encoding"""
+        from report_export import CONTENT_TYPES, STREAMING_ENCODERS, iter_report_chunks
+
+        fmt = request.query.get('format', 'csv')
+        if fmt not in STREAMING_ENCODERS:
+            write_response(writer, 400, {'error': f"format must be one of {sorted(STREAMING_ENCODERS)}"}, False)
+            return
+
+        writer.write(
+            f"HTTP/1.1 200 OK\r\nContent-Type: {CONTENT_TYPES[fmt]}\r\n"
+            f"Content-Disposition: attachment; filename=\"pricing-report.{fmt}\"\r\n"
+            f"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n".encode('latin-1')
+        )
+        blocks = STREAMING_ENCODERS[fmt](iter_report_chunks(self.model, self.vector_store.products_data, chunk_size))
+        while True:
+            # Pricing and encoding happen on the worker thread, one chunk at a time
+            try:
+                block = await self.run_cpu(next, blocks, None)
+            except Exception as e:
+                # Headers are already sent; closing without the final chunk marks the body incomplete
+                print(f"Error streaming export: {e}")
+                self.error_count += 1
+                return
+            if block is None:
+                break
+            writer.write(f"{len(block):x}\r\n".encode('latin-1') + block + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def dispatch(self, request: Request) -> Tuple[int, Any]:
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                raise HTTPError(405, f'{request.method} not allowed on {request.path}')
+            raise HTTPError(404, f'No route for {request.path}')
+        return 200, await handler(request)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+
+                start_time = time.perf_counter()
+                key = f"{request.method} {request.path}"
+                self.request_counts[key] = self.request_counts.get(key, 0) + 1
+                if key == 'GET /stream' and self.hub:
+                    # The connection becomes a long-lived event stream
+                    await self.hub.stream_sse(writer)
+                    break
+                if key == 'GET /export':
+                    await self.stream_export(request, writer)
+                    break
+                try:
+                    status, payload = await self.dispatch(request)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': e.message}
+                except Exception as e:
+                    print(f"Error handling {key}: {e}")
+                    status, payload = 500, {'error': str(e)}
+                if status >= 400:
+                    self.error_count += 1
+                self.latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+                write_response(writer, status, payload, request.keep_alive)
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except HTTPError as e:
+            write_response(writer, e.status, {'error': e.message}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765,
+                    unix_path: Optional[str] = None) -> asyncio.AbstractServer:
+        if self.hub:
+            self.hub.start()
+        if self.shared_state:
+            asyncio.get_running_loop().create_task(self.watch_shared_state())
+        if self.expiry_scheduler:
+            asyncio.get_running_loop().create_task(self.watch_expiry())
+        if self.registry:
+            asyncio.get_running_loop().create_task(self.watch_registry())
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.unlink(unix_path)
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_path,
+                                                     backlog=LISTEN_BACKLOG)
+            print(f"Pricing service listening on unix:{unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port, backlog=LISTEN_BACKLOG)
+            bound_port = server.sockets[0].getsockname()[1]
+            print(f"Pricing service listening on http://{host}:{bound_port}")
+        return server
+
+    def close(self):
+        if self.hub:
+            self.hub.stop()
+        if self.shadow:
+            self.shadow.stop()
+        self.executor.shutdown(wait=False)
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """Parse one HTTP/1.1 request, or return None on a clean EOF"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, 'Malformed request line')
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length') or 0)
+    except ValueError:
+        raise HTTPError(400, 'Invalid Content-Length')
+    if length < 0:
+        raise HTTPError(400, 'Invalid Content-Length')
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, 'Request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return Request(method.upper(), target, headers, body)
+
+def write_response(writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool = True):
+    body = json.dumps(payload, default=str).encode('utf-8')
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode('latin-1') + body)
+
+async def request_json(host: str, port: int, method: str, path: str, payload: Any = None) -> Tuple[int, Any]:
+    """Minimal client used by the self-test"""
+    reader, writer = await asyncio.open_connection(host, port)
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+    status_line = await reader.readline()
+    while (await reader.readline()) not in (b'\r\n', b''):
+        pass
+    response = await reader.read()
+    writer.close()
+    return int(status_line.split()[1]), json.loads(response)
+
+async def self_test(service: PricingService, concurrency: int = 200):
+    """Start on an ephemeral port and exercise every endpoint"""
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    stream_reader, stream_writer = await asyncio.open_connection('127.0.0.1', port)
+    stream_writer.write(b"GET /stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    await stream_writer.drain()
+
+    indexed = service.vector_store.products_data
+    products = indexed.records(range(min(concurrency, len(indexed)))) or [
+        {'product_id': str(i), 'current_price': 4.0, 'days_to_expiry': i % 10, 'stock_left': 80}
+        for i in range(concurrency)
+    ]
+
+    start_time = time.perf_counter()
+    responses = await asyncio.gather(*[
+        request_json('127.0.0.1', port, 'POST', '/price', {'product': product}) for product in products
+    ])
+    elapsed = time.perf_counter() - start_time
+    ok = sum(1 for status, _ in responses if status == 200)
+    print(f"Priced {ok}/{len(products)} concurrent requests in {elapsed * 1000:.1f}ms")
+
+    status, batch = await request_json('127.0.0.1', port, 'POST', '/price/batch', {'products': products})
+    print(f"Batch pricing: {status}, {batch.get('count')} recommendations")
+
+    status, full = await request_json('127.0.0.1', port, 'POST', '/recommendations', {'products': products})
+    print(f"Recommendations: {status}, {full.get('count')} from model {full.get('model_version')}")
+
+    await asyncio.sleep(service.hub.coalesce_ms / 1000 * 2)
+    received = await asyncio.wait_for(stream_reader.read(1 << 20), 1.0)
+    print(f"Stream: {received.count(b'event: ')} events, {len(received)} bytes")
+    stream_writer.close()
+
+    status, search = await request_json('127.0.0.1', port, 'GET', '/search?q=fresh%20dairy&top_k=3')
+    print(f"Search: {status}, {search.get('count', 0)} results")
+
+    _, metrics = await request_json('127.0.0.1', port, 'GET', '/metrics')
+    print(f"Metrics: {json.dumps(metrics['batching'])}")
+
+    server.close()
+    await server.wait_closed()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the pricing model and vector store over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PRICING_SERVICE_PORT', 8765)))
+    parser.add_argument('--unix', help='Listen on a Unix socket path instead of TCP')
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--shared-state', help='Attach estimators from a shared state root instead of loading a pickle')
+    parser.add_argument('--registry', help='Serve the ACTIVE version of a model registry root and shadow its CANDIDATE')
+    parser.add_argument('--self-test', action='store_true', help='Run a local smoke test and exit')
+    args = parser.parse_args()
+
+    service = PricingService(max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms,
+                             shared_state_root=args.shared_state, registry_root=args.registry)
+    service.warm_up()
+
+    async def serve():
+        if args.self_test:
+            await self_test(service)
+            return
+        server = await service.start(args.host, args.port, args.unix)
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == "__main__":
+    main()
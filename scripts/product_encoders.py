@@ -0,0 +1,197 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+
+class ProductEncoder(ABC):
+    """Turns product feature text into L2-normalized vectors
+
+    Stateless encoders need no fitting, so vectors for new or updated
+    products can be computed on their own without re-encoding the corpus.
+    Because every encoder normalizes its output, cosine similarity is a
+    plain dot product.
+    """
+
+    name = 'base'
+    stateless = True
+    dense = False
+
+    def fit(self, texts: List[str]):
+        """Learn encoder state from the corpus (no-op for stateless encoders)"""
+        return self
+
+    @abstractmethod
+    def transform(self, texts: List[str]):
+        """Encode texts into a (len(texts), dimensions) matrix"""
+
+    def fit_transform(self, texts: List[str]):
+        return self.fit(texts).transform(texts)
+
+    def get_config(self) -> Dict[str, Any]:
+        """Parameters needed to rebuild an equivalent stateless encoder"""
+        return {'name': self.name}
+
+    def similarity(self, query_vectors, matrix) -> np.ndarray:
+        """Cosine similarity of each query row against every matrix row"""
+        scores = matrix @ query_vectors.T
+        if hasattr(scores, 'toarray'):
+            scores = scores.toarray()
+        return np.asarray(scores).T
+
+class TfidfEncoder(ProductEncoder):
+    """Original TF-IDF encoding; vocabulary and IDF change on every refit"""
+
+    name = 'tfidf'
+    stateless = False
+
+    def __init__(self, max_features: int = 1000, ngram_range=(1, 2), vectorizer=None):
+        self.max_features = max_features
+        self.ngram_range = tuple(ngram_range)
+        self.vectorizer = vectorizer
+
+    def fit(self, texts: List[str]):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.vectorizer = TfidfVectorizer(
+            max_features=self.max_features,
+            stop_words='english',
+            ngram_range=self.ngram_range
+        )
+        self.vectorizer.fit(texts)
+        return self
+
+    def transform(self, texts: List[str]):
+        return self.vectorizer.transform(texts)
+
+    def fit_transform(self, texts: List[str]):
+        self.fit(texts)
+        return self.transform(texts)
+
+    def get_config(self) -> Dict[str, Any]:
+        return {'name': self.name, 'max_features': self.max_features, 'ngram_range': list(self.ngram_range)}
+
+class HashingEncoder(ProductEncoder):
+    """Hashing-trick encoder: fixed sparse dimension, no vocabulary, no fit"""
+
+    name = 'hashing'
+
+    def __init__(self, n_features: int = 2 ** 18, ngram_range=(1, 2)):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self._vectorizer = None
+
+    def _get_vectorizer(self):
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+
+            self._vectorizer = HashingVectorizer(
+                n_features=self.n_features,
+                stop_words='english',
+                ngram_range=self.ngram_range,
+                alternate_sign=False,
+                norm='l2',
+                dtype=np.float32
+            )
+        return self._vectorizer
+
+    def transform(self, texts: List[str]):
+        return self._get_vectorizer().transform(texts)
+
+    def get_config(self) -> Dict[str, Any]:
+        return {'name': self.name, 'n_features': self.n_features, 'ngram_range': list(self.ngram_range)}
+
+    def __getstate__(self):
+        # The vectorizer is rebuilt from config; never persist it
+        state = self.__dict__.copy()
+        state['_vectorizer'] = None
+        return state
+
+class EmbeddingEncoder(ProductEncoder):
+    """Dense float32 embeddings stored as one compact (n_products, dim) matrix
+
+    By default tokens are projected with a signed hashing sketch into `dim`
+    dimensions, which needs no model files. Pass `embed_fn` (texts -> array)
+    to use a real sentence-embedding model instead; it must be deterministic
+    so that vectors stay comparable across calls. embed_fn is not saved, so a
+    store encoded with one only loads when the same function is supplied again.
+    """
+
+    name = 'embedding'
+    dense = True
+
+    def __init__(self, dim: int = 256, embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None):
+        self.dim = dim
+        self.embed_fn = embed_fn
+        self._vectorizer = None
+        # Set when unpickled from an encoder that had an embed_fn
+        self.custom_embed_fn = False
+
+    def _hash_embed(self, texts: List[str]) -> np.ndarray:
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+
+            self._vectorizer = HashingVectorizer(
+                n_features=self.dim,
+                stop_words='english',
+                ngram_range=(1, 2),
+                alternate_sign=True,
+                norm=None,
+                dtype=np.float32
+            )
+        return self._vectorizer.transform(texts).toarray()
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        if self.embed_fn is not None:
+            vectors = np.asarray(self.embed_fn(texts), dtype=np.float32)
+        elif self.custom_embed_fn:
+            raise ValueError("Encoder was saved with a custom embed_fn; set embed_fn again before encoding")
+        else:
+            vectors = self._hash_embed(texts)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
+
+    def get_config(self) -> Dict[str, Any]:
+        config = {'name': self.name, 'dim': self.dim}
+        if self.embed_fn is not None or self.custom_embed_fn:
+            config['custom_embed_fn'] = True
+        return config
+
+    def __getstate__(self):
+        # embed_fn is usually a model handle; callers re-supply it after loading
+        state = self.__dict__.copy()
+        state['_vectorizer'] = None
+        state['embed_fn'] = None
+        state['custom_embed_fn'] = self.embed_fn is not None or self.custom_embed_fn
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('custom_embed_fn', False)
+        self.__dict__.update(state)
+
+ENCODERS = {
+    'tfidf': TfidfEncoder,
+    'hashing': HashingEncoder,
+    'embedding': EmbeddingEncoder
+}
+
+def create_encoder(name: str = 'tfidf', **params) -> ProductEncoder:
+    """Build an encoder by name ('tfidf', 'hashing' or 'embedding')"""
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown encoder: {name!r} (available: {', '.join(ENCODERS)})")
+    return ENCODERS[name](**params)
+
+def encoder_from_config(config: Dict[str, Any],
+                        embed_fn: Optional[Callable[[List[str]], np.ndarray]] = None) -> ProductEncoder:
+    """Rebuild a stateless encoder from the config saved alongside a store
+
+    Configs saved with a custom embed_fn need that function passed back in;
+    the hash embedding would produce vectors that no longer match.
+    """
+    params = dict(config)
+    if params.pop('custom_embed_fn', False):
+        if embed_fn is None:
+            raise ValueError("Store was encoded with a custom embed_fn; supply it again "
+                             "(e.g. encoder=EmbeddingEncoder(dim, embed_fn=...)) to load it")
+        params['embed_fn'] = embed_fn
+    return create_encoder(params.pop('name'), **params)
@@ -0,0 +1,417 @@
+"""
+Product Table
+
+Column store for product records, shared by the vector store, search
+service, pricing model and inventory simulator in place of lists of dicts.
+
+Each field is one typed column: numbers are parsed once on the way in
+(CSV strings such as '156' or '$4.60' included) into float64 arrays with
+NaN for missing values, repeated strings (category, location, supplier,
+expiry date, ...) are dictionary-encoded into int32 codes, and product IDs
+sit in a single object array. Values that fit none of these (rare, e.g. a
+nested dict) are kept per row on the side, so no record loses data.
+
+`table[i]` returns a ProductRow: a two-slot view that reads and writes the
+columns and otherwise behaves like the old dict (`get`, `in`, `update`,
+`dict(row)`). Batch code reads whole columns instead (`numeric`,
+`text_values`, `numeric_column`), and `record(i, **extra)` builds a plain
+dict for JSON responses without copying a stored row first.
+
+Usage:
+    python scripts/product_table.py --products 100000
+"""
+
+import argparse
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from inventory_schema import CSV_COLUMN_MAP, NUMERIC_FIELDS
+
+# Field kinds
+NUMBER = 'number'
+TEXT = 'text'
+OBJECT = 'object'
+EXTRA = 'extra'
+
+# Unique per row, so dictionary encoding would only add a lookup entry per product
+IDENTITY_FIELDS = ('product_id',)
+
+MISSING_CODE = -1
+_MISSING = object()
+
+def parse_number(value: Any) -> Optional[Tuple[float, bool]]:
+    """(value, is_integer) for numbers and numeric strings like '156' or '$4.60'; None otherwise"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, np.integer)):
+        return float(value), True
+    if isinstance(value, (float, np.floating)):
+        return float(value), False
+    if isinstance(value, str):
+        text = value.strip().replace('$', '').replace(',', '')
+        try:
+            return float(int(text)), True
+        except ValueError:
+            pass
+        try:
+            return float(text), False
+        except ValueError:
+            return None
+    return None
+
+class ProductRow(MutableMapping):
+    """Dict-like view of one table row; reads and writes go to the columns"""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table: 'ProductTable', index: int):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.table.value(self.index, key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.table.value(self.index, key)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: Any) -> bool:
+        return self.table.value(self.index, key) is not _MISSING
+
+    def __setitem__(self, key: str, value: Any):
+        self.table.set_value(self.index, key, value)
+
+    def __delitem__(self, key: str):
+        if key not in self:
+            raise KeyError(key)
+        self.table.set_value(self.index, key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.table.row_keys(self.index))
+
+    def __len__(self) -> int:
+        return len(self.table.row_keys(self.index))
+
+    def update(self, data: Dict[str, Any] = (), **kwargs):
+        self.table.update_row(self.index, dict(data, **kwargs))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self.table.record(self.index)
+
+    copy = to_dict
+
+    def __repr__(self) -> str:
+        return f"ProductRow({self.to_dict()!r})"
+
+class ProductTable:
+    """Structure-of-arrays product records that still index and iterate like a list"""
+
+    def __init__(self):
+        self.size = 0
+        self.capacity = 0
+        self.fields: Dict[str, str] = {}  # name -> kind, in first-seen order
+        self.numbers: Dict[str, np.ndarray] = {}
+        self.integer: set = set()  # numeric fields read back as int
+        self.codes: Dict[str, np.ndarray] = {}
+        self.values: Dict[str, List[str]] = {}
+        self.lookup: Dict[str, Dict[str, int]] = {}
+        self.objects: Dict[str, np.ndarray] = {}
+        self.extras: Dict[int, Dict[str, Any]] = {}
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]],
+                     rename: Optional[Dict[str, str]] = None) -> 'ProductTable':
+        """Table of `records`, optionally renaming keys (e.g. CSV_COLUMN_MAP for raw CSV rows)"""
+        table = cls()
+        table.extend(records, rename)
+        return table
+
+    # -- storage -------------------------------------------------------------
+
+    def _reserve(self, size: int):
+        if size <= self.capacity:
+            return
+        capacity = max(size, self.capacity * 2, 16)
+        for columns, fill in ((self.numbers, np.nan), (self.codes, MISSING_CODE), (self.objects, None)):
+            for name, column in columns.items():
+                grown = np.full(capacity, fill, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                columns[name] = grown
+        self.capacity = capacity
+
+    def _add_field(self, name: str, value: Any) -> str:
+        if name in IDENTITY_FIELDS:
+            kind = OBJECT
+            self.objects[name] = np.full(self.capacity, None, dtype=object)
+        elif name in NUMERIC_FIELDS or parse_number(value) is not None and not isinstance(value, str):
+            kind = NUMBER
+            self.numbers[name] = np.full(self.capacity, np.nan, dtype=np.float64)
+            self.integer.add(name)
+        elif isinstance(value, str):
+            kind = TEXT
+            self.codes[name] = np.full(self.capacity, MISSING_CODE, dtype=np.int32)
+            self.values[name] = []
+            self.lookup[name] = {}
+        else:
+            kind = EXTRA
+        self.fields[name] = kind
+        return kind
+
+    def _code(self, name: str, value: str) -> int:
+        lookup = self.lookup[name]
+        code = lookup.get(value)
+        if code is None:
+            code = len(self.values[name])
+            lookup[value] = code
+            self.values[name].append(value)
+        return code
+
+    def _store(self, index: int, name: str, value: Any):
+        """Write one value into its column, or the row's extras when it doesn't fit"""
+        kind = self.fields.get(name)
+        if kind is None:
+            if value is None:
+                return
+            kind = self._add_field(name, value)
+
+        stored = value is None
+        if kind == NUMBER:
+            parsed = None if value is None else parse_number(value)
+            self.numbers[name][index] = np.nan if parsed is None else parsed[0]
+            if parsed is not None:
+                stored = True
+                if not parsed[1] and parsed[0] == parsed[0]:
+                    self.integer.discard(name)
+        elif kind == TEXT:
+            if value is None or isinstance(value, str):
+                self.codes[name][index] = MISSING_CODE if value is None else self._code(name, value)
+                stored = True
+            else:
+                self.codes[name][index] = MISSING_CODE
+        elif kind == OBJECT:
+            self.objects[name][index] = value
+            stored = True
+
+        extras = self.extras.get(index)
+        if not stored:
+            self.extras.setdefault(index, {})[name] = value
+        elif extras is not None and name in extras:
+            del extras[name]
+            if not extras:
+                del self.extras[index]
+
+    def append(self, record: Dict[str, Any], rename: Optional[Dict[str, str]] = None) -> int:
+        index = self.size
+        self._reserve(index + 1)
+        self.size += 1
+        for name, value in record.items():
+            self._store(index, rename.get(name, name) if rename else name, value)
+        return index
+
+    def extend(self, records: Iterable[Dict[str, Any]], rename: Optional[Dict[str, str]] = None):
+        if isinstance(records, Sequence):
+            self._reserve(self.size + len(records))
+        for record in records:
+            self.append(record, rename)
+
+    # -- row access ----------------------------------------------------------
+
+    def value(self, index: int, name: str) -> Any:
+        """Stored value of one field, or the _MISSING sentinel"""
+        kind = self.fields.get(name)
+        if kind == NUMBER:
+            number = self.numbers[name][index]
+            if number == number:
+                return int(number) if name in self.integer else float(number)
+        elif kind == TEXT:
+            code = self.codes[name][index]
+            if code != MISSING_CODE:
+                return self.values[name][code]
+        elif kind == OBJECT:
+            value = self.objects[name][index]
+            if value is not None:
+                return value
+        elif kind is None:
+            return _MISSING
+        extras = self.extras.get(index)
+        return _MISSING if extras is None else extras.get(name, _MISSING)
+
+    def set_value(self, index: int, name: str, value: Any):
+        self._store(index, name, value)
+
+    def update_row(self, index: int, data: Dict[str, Any]):
+        for name, value in data.items():
+            self._store(index, name, value)
+
+    def row_keys(self, index: int) -> List[str]:
+        return [name for name in self.fields if self.value(index, name) is not _MISSING]
+
+    def record(self, index: int, **extra: Any) -> Dict[str, Any]:
+        """Plain dict of one row (plus `extra` keys), e.g. for a JSON response"""
+        record = {}
+        for name in self.fields:
+            value = self.value(index, name)
+            if value is not _MISSING:
+                record[name] = value
+        record.update(extra)
+        return record
+
+    def records(self, indices: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        return [self.record(int(index)) for index in (range(self.size) if indices is None else indices)]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ProductRow(self, i) for i in range(*index.indices(self.size))]
+        index = int(index)
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError('product index out of range')
+        return ProductRow(self, index)
+
+    def __iter__(self) -> Iterator[ProductRow]:
+        for index in range(self.size):
+            yield ProductRow(self, index)
+
+    # -- columns -------------------------------------------------------------
+
+    def numeric(self, name: str, default: float = np.nan, indices=None) -> np.ndarray:
+        """float64 column with missing values replaced by `default` (a copy)"""
+        column = self.numbers.get(name)
+        if column is None:
+            size = self.size if indices is None else len(indices)
+            return np.full(size, default, dtype=np.float64)
+        values = column[:self.size] if indices is None else column[np.asarray(indices, dtype=np.intp)]
+        return np.where(np.isnan(values), default, values)
+
+    def text_values(self, name: str, transform: Optional[Callable[[List[Any]], Any]] = None,
+                    missing: Any = None, indices=None) -> np.ndarray:
+        """Column of a text field; `transform` maps the distinct values to an array once, not once per row"""
+        if self.fields.get(name) == OBJECT:
+            column = self.objects[name][:self.size] if indices is None else self.objects[name][np.asarray(indices, dtype=np.intp)]
+            values = np.where(np.equal(column, None), missing, column)
+            return values if transform is None else np.asarray(transform(list(values)))
+        distinct = list(self.values.get(name, [])) + [missing]
+        lookup = np.array(distinct, dtype=object) if transform is None else np.asarray(transform(distinct))
+        codes = self.codes.get(name)
+        if codes is None:
+            size = self.size if indices is None else len(indices)
+            return lookup[np.full(size, MISSING_CODE, dtype=np.intp)]
+        codes = codes[:self.size] if indices is None else codes[np.asarray(indices, dtype=np.intp)]
+        # MISSING_CODE (-1) picks the trailing `missing` entry
+        return lookup[codes]
+
+    def set_numeric(self, name: str, values: np.ndarray, integer: bool = False):
+        """Overwrite (or add) a numeric column for every row at once"""
+        if self.fields.get(name, NUMBER) != NUMBER:
+            raise ValueError(f"{name} is not a numeric column")
+        if name not in self.numbers:
+            self.fields[name] = NUMBER
+            self.numbers[name] = np.full(self.capacity, np.nan, dtype=np.float64)
+        self.numbers[name][:self.size] = values
+        if integer:
+            self.integer.add(name)
+        else:
+            self.integer.discard(name)
+
+    def set_text(self, name: str, value: str):
+        """Set a text field to the same value on every row (one dictionary entry)"""
+        if self.fields.get(name, TEXT) != TEXT:
+            raise ValueError(f"{name} is not a text column")
+        if name not in self.codes:
+            self._add_field(name, value)
+        self.codes[name][:self.size] = self._code(name, value)
+
+    def to_frame(self):
+        """pandas DataFrame of the table (NaN/None where a row has no value)"""
+        import pandas as pd
+
+        data = {}
+        for name, kind in self.fields.items():
+            if kind == NUMBER:
+                column = self.numbers[name][:self.size]
+                has_nan = np.isnan(column).any()
+                data[name] = column.astype(np.int64) if name in self.integer and not has_nan else column.copy()
+            elif kind in (TEXT, OBJECT):
+                data[name] = self.text_values(name)
+            else:
+                data[name] = [self.extras.get(i, {}).get(name) for i in range(self.size)]
+        return pd.DataFrame(data)
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by the columns, dictionaries and extras"""
+        total = sum(column.nbytes for columns in (self.numbers, self.codes, self.objects)
+                    for column in columns.values())
+        for name, values in self.values.items():
+            total += sys.getsizeof(values) + sys.getsizeof(self.lookup[name])
+            total += sum(sys.getsizeof(value) for value in values)
+        for column in self.objects.values():
+            total += sum(sys.getsizeof(value) for value in column[:self.size] if value is not None)
+        total += sum(sys.getsizeof(extras) for extras in self.extras.values())
+        return int(total)
+
+def numeric_column(products: Iterable[Dict[str, Any]], name: str, default: float = 0,
+                   dtype=np.float64) -> np.ndarray:
+    """One numeric field for a batch: read from the columns for a ProductTable or rows of one, parsed per record otherwise"""
+    if isinstance(products, ProductTable):
+        return products.numeric(name, default).astype(dtype)
+    if isinstance(products, list) and products and isinstance(products[0], ProductRow):
+        table = products[0].table
+        if all(isinstance(product, ProductRow) and product.table is table for product in products):
+            return table.numeric(name, default, [product.index for product in products]).astype(dtype)
+    values = (product.get(name) for product in products)
+    return np.array([default if value is None else float(value) for value in values], dtype=np.float64).astype(dtype)
+
+def records_memory_bytes(records: List[Dict[str, Any]]) -> int:
+    """Approximate bytes held by a list of flat dict records (list, dicts and distinct values)"""
+    total = sys.getsizeof(records)
+    seen = set()
+    for record in records:
+        total += sys.getsizeof(record)
+        for value in record.values():
+            if id(value) not in seen:
+                seen.add(id(value))
+                total += sys.getsizeof(value)
+    return total
+
+def compare_memory(products: int = 100_000, csv_path: str = 'public/data/grocery-inventory.csv') -> Dict[str, Any]:
+    """Per-SKU memory of dict records vs a ProductTable for a catalog cycled from the demo CSV"""
+    import csv
+
+    with open(csv_path, newline='') as f:
+        base = list(csv.DictReader(f))
+    records = []
+    for i in range(products):
+        record = {CSV_COLUMN_MAP.get(key, key): value for key, value in base[i % len(base)].items()}
+        record['product_id'] = f"{i:08d}"
+        records.append(record)
+
+    table = ProductTable.from_records(records)
+    dict_bytes = records_memory_bytes(records)
+    table_bytes = table.memory_bytes()
+    return {
+        'products': products,
+        'dict_bytes_per_sku': round(dict_bytes / products),
+        'table_bytes_per_sku': round(table_bytes / products),
+        'reduction_factor': round(dict_bytes / table_bytes, 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare memory of dict product records with a ProductTable')
+    parser.add_argument('--products', type=int, default=100_000)
+    args = parser.parse_args()
+
+    for key, value in compare_memory(args.products).items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
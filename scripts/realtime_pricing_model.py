@@ -1,26 +1,49 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import StandardScaler
 from datetime import datetime, timedelta
 import json
 import pickle
 import os
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Union
 import threading
 import time
 
+from admission_control import AdmissionController
+from demand_forecast import DemandForecaster
+from pricing_context import PricingContext
+from pricing_result import PricingResult, RecommendationBatch, project, validate_fields
+from pricing_rules import apply_rule_pricing
+from product_table import numeric_column
+from regional_pricing import SeasonalFactorTable
+from urgency_queue import UrgencyTracker
+
+# Category-based elasticity estimates
+CATEGORY_ELASTICITY = {
+    'fruits & vegetables': -1.2,  # Elastic
+    'dairy': -0.8,
+    'meat': -0.6,
+    'seafood': -0.7,
+    'bakery': -1.0,
+    'beverages': -0.9,
+    'pantry': -0.4  # Inelastic
+}
+
+# Reported as model_version when no trained estimators are loaded
+FALLBACK_MODEL_VERSION = 'rules-fallback'
+
 class RealtimePricingModel:
     def __init__(self, model_path="data/pricing_model.pkl"):
         self.model_path = model_path
-        self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.gb_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
-        self.scaler = StandardScaler()
+        # Estimators are created on first training or loaded from disk, so that
+        # importing this module does not pull in sklearn.
+        self.rf_model = None
+        self.gb_model = None
+        self.scaler = None
         self.is_trained = False
         self.feature_names = []
         self.price_history = {}
         self.model_performance = {}
         self.last_training_time = None
+        self.model_version = None  # Set on training/load; see get_model_version
         
         # Q-learning parameters for dynamic pricing
         self.q_table = {}
@@ -33,8 +56,56 @@ class RealtimePricingModel:
         self.queue_lock = threading.Lock()
         self.is_processing = False
         
-    def extract_features(self, product_data: Dict[str, Any]) -> np.ndarray:
-        """Extract features for pricing model"""
+        # Degraded-mode admission control for the ML path
+        self.admission = AdmissionController()
+        
+        # Per-SKU demand forecasts, refreshed once per pricing tick
+        self.demand_forecaster = DemandForecaster()
+        
+        # Most urgent / most discounted SKUs, kept current as inventory changes
+        self.urgency_tracker = UrgencyTracker(self.calculate_urgency_score)
+        
+        # Time-independent lookups memoized the first time a value is seen
+        self._category_elasticity = {}
+        self._competitor_ratios = {}
+        
+    def _build_estimators(self):
+        """Create fresh (untrained) estimators, importing sklearn on first use"""
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.preprocessing import StandardScaler
+        
+        self.rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.gb_model = GradientBoostingRegressor(n_estimators=100, random_state=42)
+        self.scaler = StandardScaler()
+        
+    def get_model_version(self) -> str:
+        """Identifier of the estimators that produced a recommendation"""
+        if not self.is_trained:
+            return FALLBACK_MODEL_VERSION
+        if self.model_version:
+            return self.model_version
+        if self.last_training_time:
+            return f"rf-gb-{self.last_training_time:%Y%m%d-%H%M%S}"
+        return 'rf-gb-unversioned'
+    
+    def begin_pricing_pass(self, now: Optional[datetime] = None) -> PricingContext:
+        """Start a pricing pass: freeze the clock and refresh per-tick forecasts
+        
+        Pass the returned context to extract_features / predict_optimal_price
+        for every product in the pass.
+        """
+        context = PricingContext(now)
+        self.refresh_demand_forecasts(context.now)
+        return context
+    
+    def extract_features(self, product_data: Dict[str, Any], context: Optional[PricingContext] = None,
+                         seasonal_factor: Optional[float] = None) -> np.ndarray:
+        """Extract features for pricing model
+        
+        Batch callers pass the product's `seasonal_factor` from
+        seasonal_factors() so the regional table is indexed once per batch.
+        """
+        context = context or PricingContext()
         features = []
         
         # Basic product features
@@ -43,13 +114,10 @@ class RealtimePricingModel:
         
         # Time-based features
         if 'expiry_date' in product_data:
-            try:
-                expiry_date = pd.to_datetime(product_data['expiry_date'])
-                days_to_expiry = (expiry_date - pd.Timestamp.now()).days
-                hours_to_expiry = (expiry_date - pd.Timestamp.now()).total_seconds() / 3600
-            except:
-                days_to_expiry = 7
-                hours_to_expiry = 168
+            days_to_expiry, hours_to_expiry = context.expiry_offsets(product_data['expiry_date'])
+        elif 'days_to_expiry' in product_data:
+            days_to_expiry = int(product_data['days_to_expiry'])
+            hours_to_expiry = days_to_expiry * 24
         else:
             days_to_expiry = 7
             hours_to_expiry = 168
@@ -63,8 +131,9 @@ class RealtimePricingModel:
         historical_discount = self.get_historical_discount(product_data.get('product_id', ''))
         
         # Market features
-        category_demand = self.get_category_demand(product_data.get('category', 'Unknown'))
-        seasonal_factor = self.get_seasonal_factor(product_data.get('category', 'Unknown'))
+        category_demand = self.get_category_demand(product_data.get('category') or 'Unknown', context)
+        if seasonal_factor is None:
+            seasonal_factor = context.seasonal_table(self._build_seasonal_table).factor(product_data)
         
         # Competition features
         competitor_price_ratio = self.get_competitor_price_ratio(product_data)
@@ -98,32 +167,73 @@ class RealtimePricingModel:
         return np.array(features).reshape(1, -1)
     
     def calculate_stock_velocity(self, product_id: str) -> float:
-        """Calculate how fast stock is moving"""
-        if product_id in self.price_history:
-            history = self.price_history[product_id]
-            if len(history) >= 2:
-                recent_stocks = [entry['stock_left'] for entry in history[-5:]]
-                if len(recent_stocks) >= 2:
-                    velocity = (recent_stocks[0] - recent_stocks[-1]) / len(recent_stocks)
-                    return max(0, velocity)  # Positive velocity means stock is decreasing
-        return 5.0  # Default velocity
+        """Calculate how fast stock is moving (forecast units sold per day)"""
+        velocity = self.demand_forecaster.velocity(product_id)
+        if velocity is None:
+            return 5.0  # Default velocity
+        return velocity
+    
+    def seed_demand(self, products: List[Dict[str, Any]]):
+        """Start demand forecasts of not-yet-observed SKUs from their CSV sales figures"""
+        self.demand_forecaster.seed_from_records(products)
+
+    def observe_inventory(self, products: List[Dict[str, Any]], context: Optional[PricingContext] = None):
+        """Feed current stock levels to the demand forecaster and urgency tracker"""
+        self.demand_forecaster.observe_records(products)
+        self.track_urgency(products, context)
+    
+    def track_urgency(self, products: List[Dict[str, Any]], context: Optional[PricingContext] = None):
+        """Re-score urgency for changed products (O(log N) each)
+        
+        Unchanged rows are skipped. A relative days_to_expiry is anchored to
+        the end of that day (counted from today's start) so resending the
+        same value does not look like a new expiry.
+        """
+        context = context or PricingContext()
+        tracker = self.urgency_tracker
+        day_start = context.now.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_start_seconds = int(day_start.timestamp())
+        for product in products:
+            # Same precedence as extract_features, so urgency and price see one expiry
+            if 'expiry_date' in product:
+                hours_to_expiry = context.expiry_offsets(product['expiry_date'])[1]
+                expiry_seconds = int(round(context.now.timestamp() + hours_to_expiry * 3600))
+            elif 'days_to_expiry' in product:
+                expiry_seconds = day_start_seconds + (int(product['days_to_expiry']) + 1) * 86400 - 1
+            else:
+                # Scored at the urgency horizon, like the previous 7-day default
+                expiry_seconds = None
+            product_id = product.get('product_id', '')
+            stock_left = int(product.get('stock_left', 0))
+            if (product_id in tracker.urgency and tracker.stock.get(product_id) == stock_left
+                    and tracker.expiry_seconds.get(product_id) == expiry_seconds):
+                continue
+            tracker.update(product_id, stock_left=stock_left, expiry_seconds=expiry_seconds, now=context.now)
+    
+    def record_discounts(self, recommendations: List[Dict[str, Any]]):
+        """Feed served discounts to the most-discounted queue (GET /urgent?by=discount)"""
+        for recommendation in recommendations:
+            self.urgency_tracker.update_discount(recommendation.get('product_id', ''),
+                                                 recommendation['discount_percent'])
+    
+    def most_urgent_products(self, n: int = 10, by: str = 'urgency') -> List[Dict[str, Any]]:
+        """Top-N SKUs by urgency score or by last recommended discount"""
+        if by == 'discount':
+            return [{'product_id': pid, 'discount_percent': score}
+                    for pid, score in self.urgency_tracker.most_discounted(n)]
+        return [{'product_id': pid, 'urgency_score': score} for pid, score in self.urgency_tracker.most_urgent(n)]
+    
+    def refresh_demand_forecasts(self, now: Optional[datetime] = None):
+        """Recompute demand forecasts for all SKUs; call once per pricing tick"""
+        return self.demand_forecaster.refresh(now)
     
     def estimate_price_elasticity(self, product_data: Dict[str, Any]) -> float:
         """Estimate price elasticity based on category and historical data"""
-        category = product_data.get('category', 'Unknown').lower()
-        
-        # Category-based elasticity estimates
-        elasticity_map = {
-            'fruits & vegetables': -1.2,  # Elastic
-            'dairy': -0.8,
-            'meat': -0.6,
-            'seafood': -0.7,
-            'bakery': -1.0,
-            'beverages': -0.9,
-            'pantry': -0.4  # Inelastic
-        }
-        
-        base_elasticity = elasticity_map.get(category, -0.8)
+        category = product_data.get('category') or 'Unknown'
+        base_elasticity = self._category_elasticity.get(category)
+        if base_elasticity is None:
+            base_elasticity = CATEGORY_ELASTICITY.get(category.lower(), -0.8)
+            self._category_elasticity[category] = base_elasticity
         
         # Adjust based on price level
         price = float(product_data.get('current_price', 5))
@@ -142,11 +252,15 @@ class RealtimePricingModel:
             return np.mean(discounts) if discounts else 0
         return 0
     
-    def get_category_demand(self, category: str) -> float:
+    def get_category_demand(self, category: str, context: Optional[PricingContext] = None) -> float:
         """Get category demand multiplier"""
+        context = context or PricingContext()
+        return context.category_demand(self._time_of_day_demand)
+    
+    def _time_of_day_demand(self, context: PricingContext) -> float:
         # Time-based demand patterns
-        current_hour = datetime.now().hour
-        day_of_week = datetime.now().weekday()
+        current_hour = context.hour
+        day_of_week = context.weekday
         
         demand_multiplier = 1.0
         
@@ -162,9 +276,31 @@ class RealtimePricingModel:
         
         return demand_multiplier
     
-    def get_seasonal_factor(self, category: str) -> float:
-        """Get seasonal demand factor"""
-        month = datetime.now().month
+    def get_seasonal_factor(self, category: str, context: Optional[PricingContext] = None,
+                            region: Optional[str] = None, season: Optional[str] = None) -> float:
+        """Get seasonal demand factor for a category in a region
+        
+        Without a region the regional multiplier is neutral (1.0); season
+        defaults to the season of the pass month.
+        """
+        context = context or PricingContext()
+        table = context.seasonal_table(self._build_seasonal_table)
+        return table.factor({'category': category, 'region': region, 'season': season})
+    
+    def seasonal_factors(self, products: List[Dict[str, Any]], context: PricingContext) -> np.ndarray:
+        """Seasonal factor column for a batch: one fancy-index into the pass's table"""
+        return context.seasonal_table(self._build_seasonal_table).product_factors(products)
+    
+    def _batch_features(self, products: List[Dict[str, Any]], context: PricingContext) -> np.ndarray:
+        """Feature matrix for a batch, with the seasonal column looked up once"""
+        factors = self.seasonal_factors(products, context).tolist()
+        return np.vstack([self.extract_features(product, context, factor)
+                          for product, factor in zip(products, factors)])
+    
+    def _build_seasonal_table(self, context: PricingContext) -> SeasonalFactorTable:
+        return SeasonalFactorTable(context.month, self._month_seasonal_factor)
+    
+    def _month_seasonal_factor(self, category: str, month: int) -> float:
         category_lower = category.lower()
         
         if 'fruits' in category_lower or 'vegetables' in category_lower:
@@ -186,16 +322,20 @@ class RealtimePricingModel:
     def get_competitor_price_ratio(self, product_data: Dict[str, Any]) -> float:
         """Estimate competitor price ratio (mock implementation)"""
         # In production, this would fetch real competitor data
-        base_price = float(product_data.get('current_price', 5))
-        category = product_data.get('category', 'Unknown').lower()
-        
-        # Simulate competitor pricing
-        if 'premium' in product_data.get('name', '').lower():
-            return 0.95  # Slightly below premium competitors
-        elif 'organic' in product_data.get('name', '').lower():
-            return 1.05  # Organic premium
-        else:
-            return 1.0  # Market average
+        name = product_data.get('name', '')
+        ratio = self._competitor_ratios.get(name)
+        if ratio is None:
+            name_lower = name.lower()
+            
+            # Simulate competitor pricing
+            if 'premium' in name_lower:
+                ratio = 0.95  # Slightly below premium competitors
+            elif 'organic' in name_lower:
+                ratio = 1.05  # Organic premium
+            else:
+                ratio = 1.0  # Market average
+            self._competitor_ratios[name] = ratio
+        return ratio
     
     def calculate_urgency_score(self, days_to_expiry: int, stock_left: int) -> float:
         """Calculate urgency score for pricing decisions"""
@@ -219,8 +359,10 @@ class RealtimePricingModel:
         X = []
         y = []
         
-        for sample in training_data:
-            features = self.extract_features(sample).flatten()
+        context = PricingContext()
+        seasonal_factors = self.seasonal_factors(training_data, context).tolist()
+        for sample, seasonal_factor in zip(training_data, seasonal_factors):
+            features = self.extract_features(sample, context, seasonal_factor).flatten()
             optimal_price = sample.get('optimal_price', sample.get('current_price', 0))
             
             X.append(features)
@@ -243,6 +385,7 @@ class RealtimePricingModel:
         ]
         
         # Scale features
+        self._build_estimators()
         X_scaled = self.scaler.fit_transform(X)
         
         # Train ensemble models
@@ -262,6 +405,7 @@ class RealtimePricingModel:
         
         self.is_trained = True
         self.last_training_time = datetime.now()
+        self.model_version = None
         
         print(f"Model training completed:")
         print(f"- Random Forest R²: {rf_score:.3f}")
@@ -272,14 +416,36 @@ class RealtimePricingModel:
         
         return True
     
-    def predict_optimal_price(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Predict optimal price for a product"""
+    def predict_optimal_price(self, product_data: Dict[str, Any], deadline_ms: Optional[float] = None,
+                              context: Optional[PricingContext] = None,
+                              fields: Optional[List[str]] = None) -> Union[PricingResult, Dict[str, Any]]:
+        """Predict optimal price for a product
+        
+        Requests that the admission controller sheds (overload, or a deadline
+        shorter than the typical ML latency) are served by the rule-based
+        kernel and tagged with `fallback_mode` and `fallback_reason`.
+        
+        ML results are lazy PricingResult records (reasoning and business
+        metrics are built on first access); pass `fields` to get a plain dict
+        of just those fields instead.
+        """
+        fields = validate_fields(fields)
         if not self.is_trained:
-            return self.fallback_pricing(product_data)
-        
+            return project(self.degraded_pricing(product_data, 'model_untrained', context), fields)
+        
+        shed_reason = self.admission.try_admit(deadline_ms)
+        if shed_reason is not None:
+            # Already counted as shed by the admission controller
+            result = self.fallback_pricing(product_data, context)
+            result['fallback_reason'] = shed_reason
+            return project(result, fields)
+        
+        start_time = time.perf_counter()
+        succeeded = False
+        context = context or PricingContext()
         try:
             # Extract features
-            features = self.extract_features(product_data)
+            features = self.extract_features(product_data, context)
             features_scaled = self.scaler.transform(features)
             
             # Ensemble prediction
@@ -300,40 +466,125 @@ class RealtimePricingModel:
             discount_percent = max(0, (current_price - optimal_price) / current_price * 100)
             
             # Q-learning adjustment
-            q_adjustment = self.get_q_learning_adjustment(product_data)
-            final_price = optimal_price * (1 + q_adjustment)
-            final_price = np.clip(final_price, min_price, max_price)
+            q_adjustment = self.get_q_learning_adjustment(product_data, context=context)
+            final_price = float(np.clip(optimal_price * (1 + q_adjustment), min_price, max_price))
             
-            # Calculate business metrics
-            metrics = self.calculate_business_metrics(product_data, final_price)
+            # Lower RF/GB disagreement = higher confidence (same as calculate_confidence)
+            variance = abs(rf_pred - gb_pred) / max(rf_pred, gb_pred, 1)
             
-            result = {
-                'product_id': product_data.get('product_id', ''),
-                'current_price': current_price,
-                'predicted_optimal_price': float(optimal_price),
-                'q_learning_adjustment': float(q_adjustment),
-                'final_recommended_price': float(final_price),
-                'discount_percent': float((current_price - final_price) / current_price * 100),
-                'confidence_score': self.calculate_confidence(features_scaled),
-                'model_performance': self.model_performance,
-                'business_metrics': metrics,
-                'reasoning': self.generate_reasoning(product_data, final_price),
-                'timestamp': datetime.now().isoformat()
-            }
+            batch = RecommendationBatch(self, [product_data], np.array([final_price], dtype=np.float64), context)
+            result = PricingResult(
+                batch, 0,
+                product_id=product_data.get('product_id', ''),
+                current_price=current_price,
+                predicted_optimal_price=float(optimal_price),
+                q_learning_adjustment=float(q_adjustment),
+                final_recommended_price=final_price,
+                discount_percent=float((current_price - final_price) / current_price * 100),
+                confidence_score=float(max(0.3, 1 - variance)),
+                timestamp=context.now.isoformat(),
+                model_version=self.get_model_version()
+            )
             
             # Update price history
-            self.update_price_history(product_data.get('product_id', ''), result)
+            self.update_price_history(result.product_id, result)
             
-            return result
+            succeeded = True
+            return result if fields is None else result.to_dict(fields)
             
         except Exception as e:
             print(f"Error in price prediction: {e}")
-            return self.fallback_pricing(product_data)
+            return project(self.degraded_pricing(product_data, 'error', context), fields)
+        finally:
+            self.admission.release(time.perf_counter() - start_time, succeeded)
+    
+    def degraded_pricing(self, product_data: Dict[str, Any], reason: str,
+                         context: Optional[PricingContext] = None) -> Dict[str, Any]:
+        """Serve a request from the rule-based kernel and count why"""
+        self.admission.record_fallback(reason)
+        result = self.fallback_pricing(product_data, context)
+        result['fallback_reason'] = reason
+        return result
+    
+    def get_admission_stats(self) -> Dict[str, Any]:
+        """Served/shed counters and rolling latency of the ML path"""
+        return self.admission.get_stats()
+    
+    def predict_price_array(self, products: List[Dict[str, Any]],
+                            context: Optional[PricingContext] = None) -> np.ndarray:
+        """Ensemble prices for a batch with a single scaler/RF/GB call
+        
+        Applies the same business clip as predict_optimal_price but no
+        Q-learning exploration, so results are deterministic. Falls back to
+        the rule kernel when the model is untrained.
+        """
+        context = context or PricingContext()
+        current_prices = numeric_column(products, 'current_price', 0)
+        if not self.is_trained:
+            days = np.array([self._days_to_expiry(p, context) for p in products], dtype=np.int64)
+            stock = numeric_column(products, 'stock_left', 50, np.int64)
+            prices, _ = apply_rule_pricing(current_prices, days, stock, profile='realtime_fallback')
+            return prices
+        
+        features_scaled = self.scaler.transform(self._batch_features(products, context))
+        ensemble = self.rf_model.predict(features_scaled) * 0.3 + self.gb_model.predict(features_scaled) * 0.7
+        return np.clip(ensemble, current_prices * 0.5, current_prices * 1.2)
     
-    def get_q_learning_adjustment(self, product_data: Dict[str, Any]) -> float:
+    def recommend_prices(self, products: List[Dict[str, Any]], context: Optional[PricingContext] = None,
+                         fields: Optional[List[str]] = None) -> List[Union[PricingResult, Dict[str, Any]]]:
+        """Full predict_optimal_price responses for a batch
+        
+        One scaler/RF/GB call for the whole batch, reused for confidence.
+        Business metrics are vectorized over the batch the first time any
+        result asks for them. Q-learning uses the greedy action (no
+        exploration) so a refresh of the same SKUs is deterministic. Pass
+        `fields` to get plain dicts of just those fields.
+        """
+        fields = validate_fields(fields)
+        context = context or PricingContext()
+        if not products:
+            return []
+        if not self.is_trained:
+            results = self.fallback_pricing_batch(products, context)
+            for result in results:
+                result['model_version'] = FALLBACK_MODEL_VERSION
+            return [project(result, fields) for result in results]
+        
+        current_prices = numeric_column(products, 'current_price', 0)
+        features_scaled = self.scaler.transform(self._batch_features(products, context))
+        rf_pred = self.rf_model.predict(features_scaled)
+        gb_pred = self.gb_model.predict(features_scaled)
+        
+        min_prices, max_prices = current_prices * 0.5, current_prices * 1.2
+        optimal = np.clip(rf_pred * 0.3 + gb_pred * 0.7, min_prices, max_prices)
+        q_adjustments = np.array([self.get_q_learning_adjustment(p, explore=False, context=context)
+                                  for p in products])
+        final = np.clip(optimal * (1 + q_adjustments), min_prices, max_prices)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            discounts = np.where(current_prices > 0, (current_prices - final) / current_prices * 100, 0.0)
+        variance = np.abs(rf_pred - gb_pred) / np.maximum(np.maximum(rf_pred, gb_pred), 1)
+        confidence = np.maximum(0.3, 1 - variance)
+        
+        batch = RecommendationBatch(self, products, final, context)
+        timestamp = context.now.isoformat()
+        model_version = self.get_model_version()
+        columns = zip(current_prices.tolist(), optimal.tolist(), q_adjustments.tolist(), final.tolist(),
+                      discounts.tolist(), confidence.tolist())
+        results = []
+        for i, (product, (current, predicted, q_adjustment, final_price, discount, confidence_score)) in \
+                enumerate(zip(products, columns)):
+            result = PricingResult(batch, i, product.get('product_id', ''), current, predicted, q_adjustment,
+                                   final_price, discount, confidence_score, timestamp, model_version)
+            self.update_price_history(result.product_id, result)
+            results.append(result if fields is None else result.to_dict(fields))
+        return results
+    
+    def get_q_learning_adjustment(self, product_data: Dict[str, Any], explore: bool = True,
+                                  context: Optional[PricingContext] = None) -> float:
         """Get Q-learning based price adjustment"""
         product_id = product_data.get('product_id', '')
-        days_to_expiry = int(product_data.get('days_to_expiry', 7))
+        days_to_expiry = self._days_to_expiry(product_data, context or PricingContext())
         stock_left = int(product_data.get('stock_left', 50))
         
         # State representation
@@ -351,7 +602,7 @@ class RealtimePricingModel:
             }
         
         # Epsilon-greedy action selection
-        if np.random.random() < self.epsilon:
+        if explore and np.random.random() < self.epsilon:
             action = np.random.choice(list(self.q_table[state].keys()))
         else:
             action = max(self.q_table[state], key=self.q_table[state].get)
@@ -368,36 +619,45 @@ class RealtimePricingModel:
     
     def calculate_business_metrics(self, product_data: Dict[str, Any], recommended_price: float) -> Dict[str, Any]:
         """Calculate business impact metrics"""
-        current_price = float(product_data.get('current_price', 0))
-        stock_left = int(product_data.get('stock_left', 0))
-        
-        # Estimate demand response
-        price_change_percent = (recommended_price - current_price) / current_price
-        elasticity = self.estimate_price_elasticity(product_data)
-        demand_change_percent = elasticity * price_change_percent
-        
-        # Base demand estimation
-        base_demand = min(stock_left * 0.3, 50)  # Conservative estimate
-        new_demand = base_demand * (1 + demand_change_percent)
-        actual_sales = min(new_demand, stock_left)
-        
-        # Revenue calculations
-        current_revenue = base_demand * current_price
-        new_revenue = actual_sales * recommended_price
-        revenue_impact = new_revenue - current_revenue
-        
-        # Waste reduction
-        waste_reduction = max(0, actual_sales - base_demand)
-        
-        return {
-            'estimated_demand_change_percent': float(demand_change_percent * 100),
-            'estimated_sales_units': float(actual_sales),
-            'current_revenue_estimate': float(current_revenue),
-            'new_revenue_estimate': float(new_revenue),
-            'revenue_impact': float(revenue_impact),
-            'waste_reduction_units': float(waste_reduction),
-            'margin_impact_percent': float((recommended_price - current_price) / current_price * 100)
+        return self.business_metrics_batch([product_data], np.array([recommended_price], dtype=np.float64))[0]
+    
+    def business_metrics_batch(self, products: List[Dict[str, Any]],
+                               recommended_prices: np.ndarray) -> List[Dict[str, Any]]:
+        """Business impact metrics for a batch, computed column-wise"""
+        current_price = numeric_column(products, 'current_price', 0)
+        stock_left = numeric_column(products, 'stock_left', 0, np.int64).astype(np.float64)
+        elasticity = np.array([self.estimate_price_elasticity(p) for p in products], dtype=np.float64)
+        recommended_price = np.asarray(recommended_prices, dtype=np.float64)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Estimate demand response
+            price_change_percent = (recommended_price - current_price) / current_price
+            demand_change_percent = elasticity * price_change_percent
+            
+            # Base demand estimation
+            base_demand = np.minimum(stock_left * 0.3, 50)  # Conservative estimate
+            new_demand = base_demand * (1 + demand_change_percent)
+            actual_sales = np.minimum(new_demand, stock_left)
+            
+            # Revenue calculations
+            current_revenue = base_demand * current_price
+            new_revenue = actual_sales * recommended_price
+            revenue_impact = new_revenue - current_revenue
+            
+            # Waste reduction
+            waste_reduction = np.maximum(0, actual_sales - base_demand)
+        
+        columns = {
+            'estimated_demand_change_percent': demand_change_percent * 100,
+            'estimated_sales_units': actual_sales,
+            'current_revenue_estimate': current_revenue,
+            'new_revenue_estimate': new_revenue,
+            'revenue_impact': revenue_impact,
+            'waste_reduction_units': waste_reduction,
+            'margin_impact_percent': price_change_percent * 100
         }
+        rows = {name: values.tolist() for name, values in columns.items()}
+        return [{name: rows[name][i] for name in columns} for i in range(len(products))]
     
     def calculate_confidence(self, features_scaled: np.ndarray) -> float:
         """Calculate prediction confidence"""
@@ -414,14 +674,15 @@ class RealtimePricingModel:
         
         return float(confidence)
     
-    def generate_reasoning(self, product_data: Dict[str, Any], recommended_price: float) -> str:
+    def generate_reasoning(self, product_data: Dict[str, Any], recommended_price: float,
+                           context: Optional[PricingContext] = None) -> str:
         """Generate human-readable reasoning for the price recommendation"""
         current_price = float(product_data.get('current_price', 0))
-        days_to_expiry = int(product_data.get('days_to_expiry', 7))
+        days_to_expiry = self._days_to_expiry(product_data, context or PricingContext())
         stock_left = int(product_data.get('stock_left', 0))
         
         price_change = recommended_price - current_price
-        price_change_percent = (price_change / current_price) * 100
+        price_change_percent = (price_change / current_price) * 100 if current_price > 0 else 0.0
         
         reasoning_parts = []
         
@@ -448,35 +709,43 @@ class RealtimePricingModel:
         
         return ". ".join(reasoning_parts) + "."
     
-    def fallback_pricing(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
+    def fallback_pricing(self, product_data: Dict[str, Any], context: Optional[PricingContext] = None) -> Dict[str, Any]:
         """Fallback rule-based pricing when ML model is not available"""
-        current_price = float(product_data.get('current_price', 0))
-        days_to_expiry = int(product_data.get('days_to_expiry', 7))
-        stock_left = int(product_data.get('stock_left', 50))
-        
-        # Simple rule-based pricing
-        discount = 0
-        if days_to_expiry <= 1:
-            discount = 40
-        elif days_to_expiry <= 2:
-            discount = 25
-        elif days_to_expiry <= 5:
-            discount = 15
-        elif stock_left > 100:
-            discount = 10
-        
-        recommended_price = current_price * (1 - discount / 100)
-        
-        return {
-            'product_id': product_data.get('product_id', ''),
-            'current_price': current_price,
-            'final_recommended_price': recommended_price,
-            'discount_percent': discount,
-            'confidence_score': 0.6,
-            'reasoning': f"Rule-based pricing: {discount}% discount based on {days_to_expiry} days to expiry and {stock_left} units in stock",
-            'fallback_mode': True,
-            'timestamp': datetime.now().isoformat()
-        }
+        return self.fallback_pricing_batch([product_data], context)[0]
+    
+    def _days_to_expiry(self, product_data: Dict[str, Any], context: PricingContext) -> int:
+        """Explicit days_to_expiry, else derived from expiry_date on the pass clock"""
+        if 'days_to_expiry' in product_data:
+            return int(product_data['days_to_expiry'])
+        if 'expiry_date' in product_data:
+            return context.expiry_offsets(product_data['expiry_date'])[0]
+        return 7
+    
+    def fallback_pricing_batch(self, products: List[Dict[str, Any]],
+                               context: Optional[PricingContext] = None) -> List[Dict[str, Any]]:
+        """Rule-based pricing for a whole batch in one vectorized pass"""
+        context = context or PricingContext()
+        current_prices = numeric_column(products, 'current_price', 0)
+        days = np.array([self._days_to_expiry(p, context) for p in products], dtype=np.int64)
+        stock = numeric_column(products, 'stock_left', 50, np.int64)
+        
+        recommended, discounts = apply_rule_pricing(current_prices, days, stock, profile='realtime_fallback')
+        discount_percents = np.round(discounts * 100, 6)
+        timestamp = context.now.isoformat()
+        
+        return [
+            {
+                'product_id': product.get('product_id', ''),
+                'current_price': float(current_prices[i]),
+                'final_recommended_price': float(recommended[i]),
+                'discount_percent': float(discount_percents[i]),
+                'confidence_score': 0.6,
+                'reasoning': f"Rule-based pricing: {discount_percents[i]:g}% discount based on {days[i]} days to expiry and {stock[i]} units in stock",
+                'fallback_mode': True,
+                'timestamp': timestamp
+            }
+            for i, product in enumerate(products)
+        ]
     
     def update_price_history(self, product_id: str, recommendation: Dict[str, Any]):
         """Update price history for learning"""
@@ -490,14 +759,17 @@ class RealtimePricingModel:
             'confidence': recommendation['confidence_score']
         })
         
+        self.urgency_tracker.update_discount(product_id, recommendation['discount_percent'])
+        
         # Keep only recent history
         if len(self.price_history[product_id]) > 50:
             self.price_history[product_id] = self.price_history[product_id][-50:]
     
-    def save_model(self):
-        """Save the trained model to disk"""
+    def save_model(self, path: Optional[str] = None) -> bool:
+        """Save the trained model to disk (model_path unless another path is given)"""
+        path = path or self.model_path
         try:
-            os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
             
             model_data = {
                 'rf_model': self.rf_model,
@@ -506,17 +778,21 @@ class RealtimePricingModel:
                 'feature_names': self.feature_names,
                 'q_table': self.q_table,
                 'price_history': self.price_history,
+                'demand_forecaster': self.demand_forecaster,
                 'model_performance': self.model_performance,
                 'last_training_time': self.last_training_time,
+                'model_version': self.model_version,
                 'is_trained': self.is_trained
             }
             
-            with open(self.model_path, 'wb') as f:
+            with open(path, 'wb') as f:
                 pickle.dump(model_data, f)
             
-            print(f"Model saved to {self.model_path}")
+            print(f"Model saved to {path}")
+            return True
         except Exception as e:
             print(f"Error saving model: {e}")
+            return False
     
     def load_model(self) -> bool:
         """Load trained model from disk"""
@@ -531,8 +807,10 @@ class RealtimePricingModel:
                 self.feature_names = model_data['feature_names']
                 self.q_table = model_data.get('q_table', {})
                 self.price_history = model_data.get('price_history', {})
+                self.demand_forecaster = model_data.get('demand_forecaster') or DemandForecaster()
                 self.model_performance = model_data.get('model_performance', {})
                 self.last_training_time = model_data.get('last_training_time')
+                self.model_version = model_data.get('model_version')
                 self.is_trained = model_data.get('is_trained', False)
                 
                 print(f"Model loaded from {self.model_path}")
@@ -543,16 +821,32 @@ class RealtimePricingModel:
         
         return False
 
-# Global model instance
-realtime_pricing_model = RealtimePricingModel()
+# Global model instance, created on first access
+_realtime_pricing_model = None
+
+def get_realtime_pricing_model() -> RealtimePricingModel:
+    """Return the shared model instance, constructing it on first use"""
+    global _realtime_pricing_model
+    if _realtime_pricing_model is None:
+        _realtime_pricing_model = RealtimePricingModel()
+    return _realtime_pricing_model
+
+def __getattr__(name):
+    # Keep `from realtime_pricing_model import realtime_pricing_model` working
+    # without constructing the instance at import time.
+    if name == 'realtime_pricing_model':
+        return get_realtime_pricing_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def initialize_pricing_model():
     """Initialize the pricing model"""
+    model = get_realtime_pricing_model()
+    
     # Try to load existing model
-    if not realtime_pricing_model.load_model():
+    if not model.load_model():
         print("No existing model found, will use fallback pricing until trained")
     
-    return realtime_pricing_model
+    return model
 
 if __name__ == "__main__":
     # Test the pricing model
@@ -570,4 +864,4 @@ if __name__ == "__main__":
     
     recommendation = model.predict_optimal_price(sample_product)
     print("\nPricing Recommendation:")
-    print(json.dumps(recommendation, indent=2))
+    print(json.dumps(project(recommendation), indent=2))
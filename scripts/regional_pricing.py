@@ -0,0 +1,141 @@
+"""
+Regional Seasonal Pricing
+
+Region x season x category demand multipliers, precomputed into a dense
+NumPy table once per pricing pass. State -> region and the per-region
+seasonal adjustments mirror `stateRegions` / `seasonalFactors` in
+app/api/upload-csv/route.ts; the category component is the model's
+month-based seasonal factor. Pricing a batch is then an index lookup per
+product instead of string matching and month checks per product.
+
+Rows with no state or region get a neutral 1.0 regional multiplier, so
+their factor is exactly the category factor that models trained before
+regions existed were fitted on.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+STATE_REGIONS = {
+    'Punjab': 'North', 'Haryana': 'North', 'Himachal Pradesh': 'North', 'Uttar Pradesh': 'North',
+    'Uttarakhand': 'North', 'Delhi': 'North', 'Rajasthan': 'North',
+    'Tamil Nadu': 'South', 'Kerala': 'South', 'Karnataka': 'South', 'Andhra Pradesh': 'South',
+    'Telangana': 'South',
+    'West Bengal': 'East', 'Bihar': 'East', 'Jharkhand': 'East', 'Odisha': 'East', 'Assam': 'East',
+    'Arunachal Pradesh': 'East', 'Manipur': 'East', 'Meghalaya': 'East', 'Mizoram': 'East',
+    'Nagaland': 'East', 'Sikkim': 'East', 'Tripura': 'East',
+    'Maharashtra': 'West', 'Gujarat': 'West', 'Goa': 'West',
+    'Madhya Pradesh': 'Central', 'Chhattisgarh': 'Central'
+}
+
+# Region assumed for a state the table does not know
+DEFAULT_REGION = 'West'
+
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+SEASONS = ['Regular', 'Winter', 'Summer', 'Monsoon', 'Festival']
+
+# Percentage adjustment per region and season ('Regular' is 0)
+SEASONAL_ADJUSTMENTS = {
+    'North': {'Winter': 15, 'Summer': 10, 'Monsoon': 15, 'Festival': 25},
+    'South': {'Winter': 10, 'Summer': 20, 'Monsoon': 15, 'Festival': 25},
+    'East': {'Winter': 15, 'Summer': 10, 'Monsoon': 20, 'Festival': 25},
+    'West': {'Winter': 10, 'Summer': 15, 'Monsoon': 15, 'Festival': 25},
+    'Central': {'Winter': 15, 'Summer': 15, 'Monsoon': 15, 'Festival': 20}
+}
+
+# Season used when a product carries no explicit season (index 0 = January)
+MONTH_SEASONS = ['Winter', 'Winter', 'Summer', 'Summer', 'Summer', 'Monsoon',
+                 'Monsoon', 'Monsoon', 'Monsoon', 'Festival', 'Festival', 'Winter']
+
+# Category groups with distinct month behaviour; index 0 catches everything else
+CATEGORY_GROUPS = ['Other', 'Fruits & Vegetables', 'Dairy', 'Meat & Seafood']
+
+REGION_INDEX = {region: i for i, region in enumerate(REGIONS)}
+SEASON_INDEX = {season: i for i, season in enumerate(SEASONS)}
+
+# Extra row of the adjustment matrix for products without location data
+NO_REGION = len(REGIONS)
+
+def category_group(category: Optional[str]) -> int:
+    """Index into CATEGORY_GROUPS, using the same substring rules as the model"""
+    category_lower = (category or '').lower()
+    if 'fruits' in category_lower or 'vegetables' in category_lower:
+        return 1
+    if 'dairy' in category_lower:
+        return 2
+    if 'meat' in category_lower or 'seafood' in category_lower:
+        return 3
+    return 0
+
+def product_region(product: Dict[str, Any]) -> Optional[str]:
+    """Region of a product record, derived from its state when not given (None without either)"""
+    region = product.get('region') or product.get('Region')
+    if region in REGION_INDEX:
+        return region
+    state = product.get('state') or product.get('State')
+    if not state:
+        return None
+    return STATE_REGIONS.get(state, DEFAULT_REGION)
+
+def region_code(region: Optional[str]) -> int:
+    """Row of the adjustment matrix; NO_REGION (all 1.0) when there is no location"""
+    if region is None:
+        return NO_REGION
+    return REGION_INDEX.get(region, REGION_INDEX[DEFAULT_REGION])
+
+def regional_adjustment_matrix() -> np.ndarray:
+    """(regions + 1, seasons) multipliers, e.g. a 25% festival adjustment -> 1.25
+
+    The last row (NO_REGION) is neutral.
+    """
+    matrix = np.ones((len(REGIONS) + 1, len(SEASONS)), dtype=np.float64)
+    for region, adjustments in SEASONAL_ADJUSTMENTS.items():
+        for season, percent in adjustments.items():
+            matrix[REGION_INDEX[region], SEASON_INDEX[season]] = 1 + percent / 100
+    return matrix
+
+REGIONAL_ADJUSTMENTS = regional_adjustment_matrix()
+
+class SeasonalFactorTable:
+    """Dense (category group, region, season) factor table for one month"""
+
+    def __init__(self, month: int, category_factor: Callable[[str, int], float]):
+        self.month = month
+        self.default_season = SEASON_INDEX[MONTH_SEASONS[month - 1]]
+        category_factors = np.array([category_factor(group, month) for group in CATEGORY_GROUPS])
+        self.table = category_factors[:, None, None] * REGIONAL_ADJUSTMENTS[None, :, :]
+
+        self._category_codes: Dict[Any, int] = {}
+
+    def category_code(self, category: Optional[str]) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = category_group(category)
+            self._category_codes[category] = code
+        return code
+
+    def season_code(self, season: Optional[str]) -> int:
+        return SEASON_INDEX.get(season, self.default_season)
+
+    def factor(self, product: Dict[str, Any]) -> float:
+        """Factor for one product record"""
+        return float(self.table[self.category_code(product.get('category')),
+                                region_code(product_region(product)),
+                                self.season_code(product.get('season'))])
+
+    def factors(self, categories: Iterable[Optional[str]], regions: Iterable[Optional[str]],
+                seasons: Optional[Iterable[Optional[str]]] = None) -> np.ndarray:
+        """Factors for whole columns at once (one fancy-index into the table)"""
+        category_idx = np.array([self.category_code(category) for category in categories], dtype=np.intp)
+        region_idx = np.array([region_code(region) for region in regions], dtype=np.intp)
+        if seasons is None:
+            season_idx = np.full(category_idx.size, self.default_season, dtype=np.intp)
+        else:
+            season_idx = np.array([self.season_code(season) for season in seasons], dtype=np.intp)
+        return self.table[category_idx, region_idx, season_idx]
+
+    def product_factors(self, products: List[Dict[str, Any]]) -> np.ndarray:
+        return self.factors([product.get('category') for product in products],
+                            [product_region(product) for product in products],
+                            [product.get('season') for product in products])
@@ -0,0 +1,214 @@
+"""
+Report Export
+
+Streams pricing recommendations as CSV, JSONL or Parquet without holding
+the whole result in memory. Rows flow through generators in fixed-size
+chunks: products are priced a chunk at a time, and each chunk is written
+(or encoded for an HTTP response) before the next is produced, so memory
+is bounded by the chunk size rather than the catalog size. Partitioned
+inventories are exported by one process per partition.
+
+Usage:
+    python scripts/report_export.py --format csv --output data/exports/pricing-report.csv
+    python scripts/report_export.py --format parquet --partitioned --output data/exports
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from functools import partial
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+REPORT_COLUMNS = ['product_id', 'name', 'category', 'location', 'current_price', 'recommended_price',
+                  'discount_percent', 'stock_left', 'expiry_date', 'expected_revenue', 'fallback_mode']
+
+FORMAT_EXTENSIONS = {'csv': 'csv', 'jsonl': 'jsonl', 'parquet': 'parquet'}
+
+Chunk = List[Dict[str, Any]]
+
+def chunked(rows: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """Group any iterable into lists of at most chunk_size items"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def iter_report_chunks(model, products: Iterable[Dict[str, Any]], chunk_size: int = 5000) -> Iterator[Chunk]:
+    """Price products a chunk at a time and yield report rows"""
+    from batch_pricing import price_products
+
+    for batch in chunked(products, chunk_size):
+        recommendations = price_products(model, batch)
+        yield [_report_row(product, recommendation) for product, recommendation in zip(batch, recommendations)]
+
+def _report_row(product: Dict[str, Any], recommendation: Dict[str, Any]) -> Dict[str, Any]:
+    recommended_price = float(recommendation['final_recommended_price'])
+    sales_volume = float(product.get('sales_volume') or 0)
+    return {
+        'product_id': product.get('product_id', ''),
+        'name': product.get('name', ''),
+        'category': product.get('category', ''),
+        'location': product.get('location', ''),
+        'current_price': float(product.get('current_price') or 0),
+        'recommended_price': round(recommended_price, 2),
+        'discount_percent': round(float(recommendation['discount_percent']), 2),
+        'stock_left': int(product.get('stock_left') or 0),
+        'expiry_date': product.get('expiry_date') or '',
+        'expected_revenue': round(recommended_price * sales_volume, 2),
+        'fallback_mode': bool(recommendation.get('fallback_mode', False))
+    }
+
+def iter_csv_bytes(chunks: Iterable[Chunk], columns: List[str] = REPORT_COLUMNS) -> Iterator[bytes]:
+    """Encode chunks as CSV, yielding one bytes block per chunk"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+def iter_jsonl_bytes(chunks: Iterable[Chunk]) -> Iterator[bytes]:
+    """Encode chunks as JSON lines, yielding one bytes block per chunk"""
+    for chunk in chunks:
+        yield ''.join(json.dumps(row, default=str) + '\n' for row in chunk).encode('utf-8')
+
+STREAMING_ENCODERS: Dict[str, Callable[[Iterable[Chunk]], Iterator[bytes]]] = {
+    'csv': iter_csv_bytes,
+    'jsonl': iter_jsonl_bytes
+}
+
+CONTENT_TYPES = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+def write_parquet(chunks: Iterable[Chunk], path: str, columns: List[str] = REPORT_COLUMNS) -> int:
+    """Write chunks as Parquet, one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pylist(chunk).select(columns)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def export_chunks(chunks: Iterable[Chunk], path: str, fmt: str = 'csv') -> Dict[str, Any]:
+    """Stream chunks to a file and report rows, bytes and throughput"""
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(f"Unknown export format '{fmt}'. Available: {sorted(FORMAT_EXTENSIONS)}")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    rows = 0
+    def counted(source):
+        nonlocal rows
+        for chunk in source:
+            rows += len(chunk)
+            yield chunk
+
+    start_time = time.perf_counter()
+    if fmt == 'parquet':
+        size = write_parquet(counted(chunks), path)
+    else:
+        size = 0
+        with open(path, 'wb') as f:
+            for block in STREAMING_ENCODERS[fmt](counted(chunks)):
+                f.write(block)
+                size += len(block)
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        'path': path,
+        'format': fmt,
+        'rows': rows,
+        'bytes': size,
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed) if elapsed > 0 else 0
+    }
+
+def export_recommendations(model, products: Iterable[Dict[str, Any]], path: str, fmt: str = 'csv',
+                           chunk_size: int = 5000) -> Dict[str, Any]:
+    """Price and export a product stream in one bounded-memory pass"""
+    return export_chunks(iter_report_chunks(model, products, chunk_size), path, fmt)
+
+def _export_partition(output_dir: str, fmt: str, base_dir: str, chunk_size: int,
+                      location: str, records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Process-pool worker: price and export one partition with its own model"""
+    from partitioned_inventory import partition_dirname
+    from realtime_pricing_model import RealtimePricingModel
+
+    dirname = partition_dirname(location)
+    model = RealtimePricingModel(model_path=os.path.join(base_dir, dirname, 'pricing_model.pkl'))
+    model.load_model()
+    path = os.path.join(output_dir, f"{dirname}.{FORMAT_EXTENSIONS[fmt]}")
+    return export_recommendations(model, records, path, fmt, chunk_size)
+
+def export_partitions(inventory, output_dir: str, fmt: str = 'csv', locations: Optional[Iterable[str]] = None,
+                      max_workers: Optional[int] = None, chunk_size: int = 5000) -> Dict[str, Any]:
+    """Export every partition to its own file, one worker process per partition"""
+    start_time = time.perf_counter()
+    worker = partial(_export_partition, output_dir, fmt, inventory.base_dir, chunk_size)
+    results = inventory.map_records(worker, locations, max_workers)
+    elapsed = time.perf_counter() - start_time
+
+    rows = sum(result['rows'] for result in results.values())
+    return {
+        'partitions': len(results),
+        'rows': rows,
+        'bytes': sum(result['bytes'] for result in results.values()),
+        'seconds': round(elapsed, 3),
+        'rows_per_sec': round(rows / elapsed) if elapsed > 0 else 0,
+        'files': {location: result['path'] for location, result in results.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream a pricing report to CSV/JSONL/Parquet')
+    parser.add_argument('--csv', default='public/data/grocery-inventory.csv', help='Inventory CSV to price')
+    parser.add_argument('--format', choices=sorted(FORMAT_EXTENSIONS), default='csv')
+    parser.add_argument('--output', default=None, help='Output file (or directory with --partitioned)')
+    parser.add_argument('--partitioned', action='store_true', help='One file per warehouse location')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.partitioned:
+        from partitioned_inventory import PartitionedInventory
+
+        inventory = PartitionedInventory()
+        inventory.load_csv(args.csv)
+        output_dir = args.output or 'data/exports/partitions'
+        stats = export_partitions(inventory, output_dir, args.format, max_workers=args.workers,
+                                  chunk_size=args.chunk_size)
+        stats.pop('files')
+    else:
+        from inventory_schema import iter_inventory_records
+        from realtime_pricing_model import initialize_pricing_model
+
+        output = args.output or f"data/exports/pricing-report.{FORMAT_EXTENSIONS[args.format]}"
+        stats = export_recommendations(initialize_pricing_model(), iter_inventory_records(args.csv), output,
+                                       args.format, args.chunk_size)
+
+    for key, value in stats.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Product Search Service
+
+Paginated search, similar-product and filter queries over a resident
+ProductVectorStore, served by the pricing service (see pricing_service.py)
+so /api/vector-search can use the real index instead of mock data.
+
+Ranked result lists are cached in an LRU keyed by the normalized query,
+filters and the store's `index_version`; every page of a query is cut from
+the same cached ranking, and any change to the store invalidates it.
+
+Usage:
+    python scripts/search_service.py --products 10000 --requests 2000
+"""
+
+import argparse
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Longest ranking kept per query; deeper pages are not served
+MAX_RANKED_RESULTS = 1000
+
+Ranking = Tuple[np.ndarray, np.ndarray, int]
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive cache key for a query"""
+    return ' '.join(str(query).lower().split())
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Tuple:
+    """Hashable form of the filters the vector-search route accepts"""
+    filters = filters or {}
+    category = filters.get('category')
+    max_price = filters.get('max_price')
+    min_stock = filters.get('min_stock')
+    return (
+        normalize_query(category) if category else None,
+        float(max_price) if max_price not in (None, '') else None,
+        float(min_stock) if min_stock not in (None, '') else None
+    )
+
+class SearchCache:
+    """LRU of ranked results, cleared whenever the index version moves on"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[Tuple, Ranking]' = OrderedDict()
+        self.index_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, index_version: int, key: Tuple) -> Optional[Ranking]:
+        if index_version != self.index_version:
+            self.entries.clear()
+            self.index_version = index_version
+        ranking = self.entries.get(key)
+        if ranking is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return ranking
+
+    def put(self, key: Tuple, ranking: Ranking):
+        self.entries[key] = ranking
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'index_version': self.index_version
+        }
+
+def page_bounds(page: Any, page_size: Any) -> Tuple[int, int]:
+    """Validated (page, page_size); raises ValueError on bad input"""
+    page, page_size = int(page), int(page_size)
+    if page < 1 or page_size < 1:
+        raise ValueError('page and page_size must be positive')
+    return page, min(page_size, MAX_PAGE_SIZE)
+
+class ProductSearchService:
+    """Paginated, cached queries over one ProductVectorStore"""
+
+    def __init__(self, vector_store, cache_size: int = 1024):
+        self.vector_store = vector_store
+        self.cache = SearchCache(cache_size)
+
+        # Filter columns, rebuilt lazily once per index version
+        self._columns_version: Optional[int] = None
+        self._categories = np.zeros(0, dtype=object)
+        self._prices = np.zeros(0, dtype=np.float64)
+        self._stock = np.zeros(0, dtype=np.float64)
+
+    def _filter_columns(self):
+        store = self.vector_store
+        if self._columns_version != store.index_version:
+            products = store.products_data
+            # Normalized once per distinct category, then gathered through the category codes
+            self._categories = products.text_values(
+                'category', lambda values: [normalize_query(value or '') for value in values])
+            self._prices = products.numeric('current_price', 0)
+            self._stock = products.numeric('stock_left', 0)
+            self._columns_version = store.index_version
+        return self._categories, self._prices, self._stock
+
+    def _filter_mask(self, filters: Tuple) -> Optional[np.ndarray]:
+        category, max_price, min_stock = filters
+        if category is None and max_price is None and min_stock is None:
+            return None
+        categories, prices, stock = self._filter_columns()
+        mask = np.ones(len(prices), dtype=bool)
+        if category is not None:
+            # Substring match, like the route's mock filter
+            mask &= np.fromiter((category in value for value in categories), dtype=bool, count=len(categories))
+        if max_price is not None:
+            mask &= prices <= max_price
+        if min_stock is not None:
+            mask &= stock >= min_stock
+        return mask
+
+    @staticmethod
+    def _rank(similarities: np.ndarray, mask: Optional[np.ndarray]) -> Ranking:
+        """Indices and scores of positive matches, best first, capped at MAX_RANKED_RESULTS"""
+        eligible = similarities > 0
+        if mask is not None:
+            eligible &= mask
+        candidates = np.flatnonzero(eligible)
+        total = len(candidates)
+        if total > MAX_RANKED_RESULTS:
+            top = np.argpartition(-similarities[candidates], MAX_RANKED_RESULTS - 1)[:MAX_RANKED_RESULTS]
+            candidates = candidates[top]
+        order = np.lexsort((candidates, -similarities[candidates]))
+        candidates = candidates[order]
+        return candidates, similarities[candidates], total
+
+    def _cached_ranking(self, key: Tuple, similarities_fn) -> Tuple[Ranking, bool]:
+        store = self.vector_store
+        ranking = self.cache.get(store.index_version, key)
+        if ranking is not None:
+            return ranking, True
+        ranking = self._rank(similarities_fn(), self._filter_mask(key[-1]))
+        self.cache.put(key, ranking)
+        return ranking, False
+
+    def _page(self, ranking: Ranking, page: int, page_size: int, extra: Dict[str, Any]) -> Dict[str, Any]:
+        indices, scores, total = ranking
+        start = (page - 1) * page_size
+        products = self.vector_store.products_data
+        results = [products.record(idx, similarity_score=float(score))
+                   for idx, score in zip(indices[start:start + page_size], scores[start:start + page_size])]
+        response = dict(extra)
+        response.update({
+            'results': results,
+            'page': page,
+            'page_size': page_size,
+            'total_found': total,
+            'has_more': start + page_size < min(total, len(indices)),
+            'index_version': self.vector_store.index_version
+        })
+        return response
+
+    def search(self, query: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE,
+               filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """One page of products ranked by similarity to a text query"""
+        start_time = time.perf_counter()
+        store = self.vector_store
+        page, page_size = page_bounds(page, page_size)
+        with store.lock:
+            if store.product_vectors is None:
+                return self._page((np.zeros(0, dtype=np.intp), np.zeros(0), 0), page, page_size,
+                                  {'query': query, 'cached': False, 'search_time_ms': 0.0})
+
+            key = ('search', normalize_query(query), normalize_filters(filters))
+            similarities_fn = lambda: store.encoder.similarity(store.encoder.transform([query]),
+                                                               store.product_vectors).flatten()
+            ranking, cached = self._cached_ranking(key, similarities_fn)
+            return self._page(ranking, page, page_size, {
+                'query': query,
+                'cached': cached,
+                'search_time_ms': round((time.perf_counter() - start_time) * 1000, 3)
+            })
+
+    def similar(self, product_id: str, page: int = 1, page_size: int = 5) -> Optional[Dict[str, Any]]:
+        """One page of products most similar to a stored product (None if unknown)"""
+        store = self.vector_store
+        page, page_size = page_bounds(page, page_size)
+        with store.lock:
+            product_idx = store.product_index.get(product_id)
+            if product_idx is None or store.product_vectors is None:
+                return None
+
+            def similarities_fn():
+                product_vector = store.product_vectors[product_idx:product_idx + 1]
+                similarities = store.encoder.similarity(product_vector, store.product_vectors).flatten()
+                similarities[product_idx] = -1
+                return similarities
+
+            ranking, cached = self._cached_ranking(('similar', product_id, normalize_filters(None)),
+                                                   similarities_fn)
+            return self._page(ranking, page, page_size, {'product_id': product_id, 'cached': cached})
+
+    @staticmethod
+    def _slice(items: List[Dict[str, Any]], page: int, page_size: int, key: str) -> Dict[str, Any]:
+        page, page_size = page_bounds(page, page_size)
+        start = (page - 1) * page_size
+        return {
+            key: items[start:start + page_size],
+            'page': page,
+            'page_size': page_size,
+            'total_found': len(items),
+            'has_more': start + page_size < len(items)
+        }
+
+    def expiring(self, days: int = 7, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        return self._slice(self.vector_store.get_expiring_products(int(days)), page, page_size, 'expiring_products')
+
+    def low_stock(self, threshold: int = 20, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        return self._slice(self.vector_store.get_low_stock_products(int(threshold)), page, page_size,
+                           'low_stock_products')
+
+    def by_category(self, category: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        return self._slice(self.vector_store.get_products_by_category(category), page, page_size, 'products')
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self.cache.get_stats()
+        stats['indexed_products'] = len(self.vector_store.products_data)
+        return stats
+
+def synthetic_store(products: int, encoder: str = 'tfidf', seed: int = 42):
+    """In-memory store of `products` rows cycled from the demo inventory CSV"""
+    import os
+    import tempfile
+    from inventory_schema import load_inventory_records
+    from vector_store import ProductVectorStore
+
+    base = load_inventory_records('public/data/grocery-inventory.csv')
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(products):
+        record = dict(base[i % len(base)])
+        record['product_id'] = f"{i:08d}"
+        record['stock_left'] = int(rng.integers(0, 300))
+        records.append(record)
+
+    store = ProductVectorStore(os.path.join(tempfile.mkdtemp(), 'vector_store.pkl'), encoder=encoder)
+    store.index_products(records)
+    return store
+
+async def measure_end_to_end(products: int = 10_000, requests: int = 2000, concurrency: int = 32,
+                             distinct_queries: int = 200) -> Dict[str, Any]:
+    """HTTP round-trip latency of /search through the pricing service at catalog scale"""
+    import asyncio
+    import random
+    from pricing_service import PricingService, request_json
+
+    store = synthetic_store(products)
+    service = PricingService(vector_store=store)
+    service.warm_up()
+    server = await service.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+
+    words = sorted({word for p in store.products_data[:2000] for word in str(p.get('name', '')).lower().split()})
+    rng = random.Random(42)
+    queries = [' '.join(rng.sample(words, 2)) for _ in range(distinct_queries)]
+    paths = [f"/search?q={queries[rng.randrange(distinct_queries)].replace(' ', '%20')}"
+             f"&page={rng.randint(1, 3)}&page_size=20" for _ in range(requests)]
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(path):
+        async with semaphore:
+            start = time.perf_counter()
+            status, _ = await request_json('127.0.0.1', port, 'GET', path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            return status
+
+    start_time = time.perf_counter()
+    statuses = await asyncio.gather(*[timed(path) for path in paths])
+    elapsed = time.perf_counter() - start_time
+
+    server.close()
+    await server.wait_closed()
+    service.close()
+
+    p50, p99 = np.percentile(latencies, [50, 99])
+    return {
+        'products': products,
+        'requests': requests,
+        'ok': sum(1 for status in statuses if status == 200),
+        'requests_per_sec': round(requests / elapsed),
+        'latency_p50_ms': round(float(p50), 2),
+        'latency_p99_ms': round(float(p99), 2),
+        'cache': service.search.get_stats()
+    }
+
+def main():
+    import asyncio
+
+    parser = argparse.ArgumentParser(description='Measure end-to-end search latency through the pricing service')
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+
+    results = asyncio.run(measure_end_to_end(args.products, args.requests, args.concurrency))
+    for key, value in results.items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Shared Model and Index State
+
+Publishes the trained ensemble, the product vectors and the product columns
+as plain .npy arrays that worker processes memory-map read-only. Every
+worker attached to the same version shares one copy in the page cache, so
+adding workers no longer multiplies memory by the size of the forests,
+the vector matrix and products_data.
+
+Layout under the state root:
+    versions/<version>/*.npy   flattened trees, CSR vectors, product columns
+    versions/<version>/meta.json
+    CURRENT                    name of the active version, swapped atomically
+
+Publishing writes a complete new version directory and then replaces the
+CURRENT pointer with os.replace, so readers see either the old or the new
+state, never a mix. Workers call `refresh()` between requests to pick up a
+new version after retraining or reindexing.
+"""
+
+import json
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+POINTER_FILE = 'CURRENT'
+VERSIONS_DIR = 'versions'
+
+# Product fields stored as typed columns; anything else stays out of shared state
+NUMERIC_PRODUCT_FIELDS = ['current_price', 'stock_left', 'reorder_level', 'reorder_quantity',
+                          'sales_volume', 'inventory_turnover_rate']
+TEXT_PRODUCT_FIELDS = ['product_id', 'name', 'category', 'supplier_name', 'location', 'status',
+                       'expiry_date', 'state', 'region']
+
+TREE_LEAF = -1
+
+def flatten_trees(trees: List[Any]) -> Dict[str, np.ndarray]:
+    """Concatenate fitted sklearn trees into flat node arrays with global child indices"""
+    offsets = np.cumsum([0] + [tree.tree_.node_count for tree in trees])
+    children_left, children_right, features, thresholds, values = [], [], [], [], []
+    for offset, tree in zip(offsets, trees):
+        structure = tree.tree_
+        children_left.append(np.where(structure.children_left == TREE_LEAF, TREE_LEAF,
+                                      structure.children_left + offset))
+        children_right.append(np.where(structure.children_right == TREE_LEAF, TREE_LEAF,
+                                       structure.children_right + offset))
+        features.append(structure.feature)
+        thresholds.append(structure.threshold)
+        values.append(structure.value[:, 0, 0])
+
+    return {
+        'roots': offsets[:-1].astype(np.int64),
+        'children_left': np.concatenate(children_left).astype(np.int64),
+        'children_right': np.concatenate(children_right).astype(np.int64),
+        'feature': np.concatenate(features).astype(np.int64),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'value': np.concatenate(values).astype(np.float64)
+    }
+
+class FlatTreeEnsemble:
+    """Evaluates flattened trees for a batch, all trees at once per depth level"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.roots = arrays['roots']
+        self.children_left = arrays['children_left']
+        self.children_right = arrays['children_right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+
+    def tree_values(self, X: np.ndarray) -> np.ndarray:
+        """Leaf value of every tree for every row, shape (n_rows, n_trees)"""
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_trees = len(self.roots)
+        nodes = np.tile(self.roots, len(X))
+        rows = np.repeat(np.arange(len(X)), n_trees)
+        pending = np.arange(len(nodes))
+        # Only (row, tree) pairs that have not reached a leaf are advanced each level
+        while len(pending):
+            current = nodes[pending]
+            left = self.children_left[current]
+            internal = left != TREE_LEAF
+            pending, current, left = pending[internal], current[internal], left[internal]
+            go_left = X[rows[pending], self.feature[current]] <= self.threshold[current]
+            nodes[pending] = np.where(go_left, left, self.children_right[current])
+        return self.value[nodes].reshape(len(X), n_trees)
+
+class SharedForestRegressor(FlatTreeEnsemble):
+    """Drop-in for RandomForestRegressor.predict"""
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.tree_values(X).mean(axis=1)
+
+class SharedBoostingRegressor(FlatTreeEnsemble):
+    """Drop-in for GradientBoostingRegressor.predict (squared error loss)"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], init_value: float, learning_rate: float):
+        super().__init__(arrays)
+        self.init_value = init_value
+        self.learning_rate = learning_rate
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.init_value + self.learning_rate * self.tree_values(X).sum(axis=1)
+
+class SharedScaler:
+    """Drop-in for StandardScaler.transform"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+class SharedProducts:
+    """Read-only product records backed by memory-mapped columns
+
+    Behaves like the products_data list: indexing builds a fresh dict for
+    one row, and `index_of` finds a product ID by binary search over a
+    shared sorted index, so no per-worker dict of the catalog is needed.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], id_order: np.ndarray, sorted_ids: np.ndarray):
+        self.columns = columns
+        self.id_order = id_order
+        self.sorted_ids = sorted_ids
+
+    def __len__(self) -> int:
+        return len(self.id_order)
+
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        product = {}
+        for name, column in self.columns.items():
+            value = column[index]
+            if column.dtype.kind == 'U':
+                if value:
+                    product[name] = str(value)
+            elif not np.isnan(value):
+                product[name] = int(value) if name == 'stock_left' else float(value)
+        return product
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def index_of(self, product_id: str) -> Optional[int]:
+        position = int(np.searchsorted(self.sorted_ids, product_id))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == product_id:
+            return int(self.id_order[position])
+        return None
+
+class SharedState:
+    """One attached (read-only, memory-mapped) version of the shared state"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = os.path.basename(path)
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+
+        self.rf_model = None
+        self.gb_model = None
+        self.scaler = None
+        if self.meta.get('model'):
+            model_meta = self.meta['model']
+            self.rf_model = SharedForestRegressor(self._load_group('rf'))
+            self.gb_model = SharedBoostingRegressor(self._load_group('gb'), model_meta['gb_init'],
+                                                    model_meta['gb_learning_rate'])
+            self.scaler = SharedScaler(self._load('scaler_mean'), self._load('scaler_scale'))
+
+        self.products = None
+        self.product_vectors = None
+        self.encoder = None
+        if self.meta.get('store'):
+            store_meta = self.meta['store']
+            columns = {name: self._load(f"product_{name}") for name in store_meta['product_columns']}
+            self.products = SharedProducts(columns, self._load('product_id_order'), self._load('product_id_sorted'))
+            self.product_vectors = self._load_vectors(store_meta)
+            with open(os.path.join(path, 'encoder.pkl'), 'rb') as f:
+                self.encoder = pickle.load(f)
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode='r')
+
+    def _load_group(self, prefix: str) -> Dict[str, np.ndarray]:
+        names = ['roots', 'children_left', 'children_right', 'feature', 'threshold', 'value']
+        return {name: self._load(f"{prefix}_{name}") for name in names}
+
+    def _load_vectors(self, store_meta: Dict[str, Any]):
+        if store_meta['vectors_format'] == 'dense':
+            return self._load('vectors')
+        from scipy.sparse import csr_matrix
+        return csr_matrix((self._load('vectors_data'), self._load('vectors_indices'), self._load('vectors_indptr')),
+                          shape=tuple(store_meta['vectors_shape']), copy=False)
+
+    def attach_model(self, model):
+        """Point a RealtimePricingModel at the shared estimators (no copy)"""
+        if self.rf_model is None:
+            raise ValueError(f"Shared state {self.version} has no model")
+        model.rf_model = self.rf_model
+        model.gb_model = self.gb_model
+        model.scaler = self.scaler
+        model.feature_names = self.meta['model']['feature_names']
+        model.model_performance = self.meta['model'].get('model_performance', {})
+        model.is_trained = True
+        model.shared_state_version = self.version
+        model.model_version = f"shared-{self.version}"
+        return model
+
+    def search_products(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Same results as ProductVectorStore.search_products, over the shared vectors"""
+        if self.product_vectors is None:
+            return []
+        similarities = self.encoder.similarity(self.encoder.transform([query]), self.product_vectors).flatten()
+        results = []
+        for idx in np.argsort(similarities)[::-1][:top_k]:
+            if similarities[idx] > 0:
+                product = self.products[idx]
+                product['similarity_score'] = float(similarities[idx])
+                results.append(product)
+        return results
+
+    def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
+        index = self.products.index_of(product_id) if self.products is not None else None
+        return None if index is None else self.products[index]
+
+def _model_arrays(model) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    arrays = {}
+    for name, values in flatten_trees(list(model.rf_model.estimators_)).items():
+        arrays[f"rf_{name}"] = values
+    for name, values in flatten_trees([stage[0] for stage in model.gb_model.estimators_]).items():
+        arrays[f"gb_{name}"] = values
+    arrays['scaler_mean'] = np.asarray(model.scaler.mean_, dtype=np.float64)
+    arrays['scaler_scale'] = np.asarray(model.scaler.scale_, dtype=np.float64)
+
+    meta = {
+        'feature_names': list(model.feature_names),
+        'gb_init': float(np.ravel(model.gb_model.init_.constant_)[0]),
+        'gb_learning_rate': float(model.gb_model.learning_rate),
+        'model_performance': model.model_performance,
+        'last_training_time': str(model.last_training_time)
+    }
+    return arrays, meta
+
+def _store_arrays(store) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    products = store.products_data
+    arrays = {}
+    columns = []
+    # Straight from the store's typed columns, no per-row dicts
+    for name in NUMERIC_PRODUCT_FIELDS:
+        if name in products.numbers:
+            arrays[f"product_{name}"] = products.numeric(name)
+            columns.append(name)
+    for name in TEXT_PRODUCT_FIELDS:
+        if name == 'product_id' or name in products.fields:
+            values = products.text_values(name, lambda values: ['' if v is None else str(v) for v in values])
+            arrays[f"product_{name}"] = values.astype(str)
+            columns.append(name)
+    arrays['product_id_order'] = np.argsort(arrays['product_product_id'], kind='stable')
+    arrays['product_id_sorted'] = arrays['product_product_id'][arrays['product_id_order']]
+
+    vectors = store.product_vectors
+    meta = {'product_columns': columns, 'encoder_config': store.encoder.get_config()}
+    if store.encoder.dense:
+        arrays['vectors'] = np.ascontiguousarray(vectors)
+        meta['vectors_format'] = 'dense'
+    else:
+        vectors = vectors.tocsr()
+        arrays['vectors_data'] = vectors.data
+        arrays['vectors_indices'] = vectors.indices
+        arrays['vectors_indptr'] = vectors.indptr
+        meta['vectors_format'] = 'csr'
+        meta['vectors_shape'] = list(vectors.shape)
+    return arrays, meta
+
+def publish_shared_state(root: str, model=None, vector_store=None, keep: int = 3) -> str:
+    """Write a new state version and atomically make it current; returns its name"""
+    if model is None and vector_store is None:
+        raise ValueError("Nothing to publish: pass a trained model and/or an indexed vector store")
+
+    version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+    versions_dir = os.path.join(root, VERSIONS_DIR)
+    staging = os.path.join(versions_dir, f".staging-{version}")
+    os.makedirs(staging)
+
+    arrays: Dict[str, np.ndarray] = {}
+    meta: Dict[str, Any] = {'version': version, 'published_at': time.time()}
+    if model is not None:
+        if not model.is_trained:
+            raise ValueError("Cannot publish an untrained model")
+        model_arrays, meta['model'] = _model_arrays(model)
+        arrays.update(model_arrays)
+    if vector_store is not None:
+        store_arrays, meta['store'] = _store_arrays(vector_store)
+        arrays.update(store_arrays)
+        with open(os.path.join(staging, 'encoder.pkl'), 'wb') as f:
+            pickle.dump(vector_store.encoder, f)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(staging, f"{name}.npy"), values, allow_pickle=False)
+    with open(os.path.join(staging, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+    os.rename(staging, os.path.join(versions_dir, version))
+
+    pointer_tmp = os.path.join(root, f".{POINTER_FILE}.tmp")
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+    os.replace(pointer_tmp, os.path.join(root, POINTER_FILE))
+
+    prune_versions(root, keep)
+    print(f"Published shared state {version} ({sum(a.nbytes for a in arrays.values()) / 1e6:.1f} MB)")
+    return version
+
+def prune_versions(root: str, keep: int = 3):
+    """Delete old versions; attached workers keep their mappings until they refresh"""
+    versions_dir = os.path.join(root, VERSIONS_DIR)
+    current = read_current_version(root)
+    versions = sorted(name for name in os.listdir(versions_dir) if not name.startswith('.'))
+    for name in versions[:-keep] if keep > 0 else versions:
+        if name != current:
+            shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+
+def read_current_version(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+class SharedStateReader:
+    """Worker-side handle: attach the current version and swap when it changes"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.state: Optional[SharedState] = None
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Attach the current version if it changed; returns True on swap"""
+        version = read_current_version(self.root)
+        if version is None or (self.state is not None and self.state.version == version):
+            return False
+        # A single reference assignment: in-flight requests keep the old snapshot
+        self.state = SharedState(os.path.join(self.root, VERSIONS_DIR, version))
+        return True
+
+    def attach_model(self, model):
+        """Refresh, then point a pricing model at the current shared estimators"""
+        self.refresh()
+        if self.state is None:
+            raise FileNotFoundError(f"No shared state published under {self.root}")
+        return self.state.attach_model(model)
+
+def _worker_price(root: str, products: List[Dict[str, Any]]) -> Tuple[str, List[float]]:
+    """Example process-pool worker: attach shared state and price a batch"""
+    from realtime_pricing_model import RealtimePricingModel
+
+    reader = SharedStateReader(root)
+    model = reader.attach_model(RealtimePricingModel(model_path=os.path.join(root, 'unused.pkl')))
+    return reader.state.version, model.predict_price_array(products).tolist()
+
+if __name__ == "__main__":
+    from concurrent.futures import ProcessPoolExecutor
+    from realtime_pricing_model import initialize_pricing_model
+    from vector_store import get_vector_store
+
+    root = 'data/shared_state'
+    model = initialize_pricing_model()
+    store = get_vector_store()
+    store.load_store()
+    if not model.is_trained:
+        print("Train the pricing model first (data/pricing_model.pkl)")
+    else:
+        publish_shared_state(root, model, store if store.product_vectors is not None else None)
+        products = store.products_data[:100] or [{'product_id': 'demo', 'current_price': 4.0, 'stock_left': 30}]
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            for version, prices in executor.map(_worker_price, [root] * 4, [products] * 4):
+                print(f"Worker priced {len(prices)} products with shared state {version}")
@@ -0,0 +1,685 @@
+"""
+Shelf Detection Worker
+
+CPU object detection for shelf camera frames. Frames (base64 JPEG/PNG/PPM
+or decoded arrays) from any number of cameras share one queue and are run
+through the detector in batches; detections are counted per class, mapped
+to Product_IDs and summed over every camera that sees the product. Each
+change of that total is emitted as a `shelf_count` update and handed to
+sinks (an append-only JSONL feed, the vector store and model, ...).
+
+Static shelves are cheap: each frame is downscaled once and compared per
+shelf region (ROI) with the frame last inferred for that region; unchanged
+regions reuse their cached detections, and stock updates are only emitted
+when a product's total visible count changes.
+
+Detectors:
+    ColorPrototypeDetector  tiny built-in model (colour prototypes per class,
+                            pure NumPy), so the worker runs offline with no
+                            model download; loadable from a .json file
+    OpenCVDetector          any YOLO-style ONNX/Darknet/TF model readable by
+                            cv2.dnn, batched through blobFromImages
+
+Usage:
+    python scripts/shelf_detection.py --cameras 4 --frames 50
+    python scripts/shelf_detection.py --cameras 4 --frames 50 --no-frame-diff
+    python scripts/shelf_detection.py --model models/shelf.onnx --classes apple,banana,orange
+"""
+
+import argparse
+import base64
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+Detection = Dict[str, Any]
+StockUpdate = Dict[str, Any]
+
+# Colour prototypes (RGB) of the built-in detector; classes match inventory product names
+BUILTIN_PROTOTYPES = {
+    'apple': (200, 30, 35),
+    'banana': (235, 215, 60),
+    'orange': (250, 145, 20),
+    'broccoli': (40, 135, 50)
+}
+
+DEFAULT_UPDATES_PATH = 'data/camera_stock_updates.jsonl'
+
+STAGES = ['decode', 'gate', 'infer', 'map']
+
+Roi = Tuple[int, int, int, int]
+
+# (camera_id, frame, timestamp, frame_id); frame_id lets a caller match results to its frames
+QueuedFrame = Tuple[str, Any, str, Optional[int]]
+
+def _decode_ppm(data: bytes) -> np.ndarray:
+    """Binary PPM (P6, 8-bit) without any imaging library"""
+    fields = []
+    position = 2
+    while len(fields) < 3:
+        while data[position:position + 1].isspace():
+            position += 1
+        if data[position:position + 1] == b'#':
+            position = data.index(b'\n', position) + 1
+            continue
+        end = position
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(int(data[position:end]))
+        position = end
+    width, height, max_value = fields
+    if max_value != 255:
+        raise ValueError('Only 8-bit PPM frames are supported')
+    pixels = np.frombuffer(data, dtype=np.uint8, count=width * height * 3, offset=position + 1)
+    return pixels.reshape(height, width, 3)
+
+def encode_ppm(frame: np.ndarray) -> bytes:
+    height, width = frame.shape[:2]
+    return f"P6\n{width} {height}\n255\n".encode('ascii') + np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+
+def decode_frame(data: Any) -> np.ndarray:
+    """HxWx3 uint8 RGB frame from an array, raw bytes or a (data URL) base64 string"""
+    if isinstance(data, np.ndarray):
+        frame = data
+    else:
+        if isinstance(data, str):
+            if data.startswith('data:'):
+                data = data.split(',', 1)[1]
+            data = base64.b64decode(data)
+        if data[:2] == b'P6':
+            frame = _decode_ppm(data)
+        else:
+            frame = _decode_compressed(data)
+
+    if frame.ndim == 2:
+        frame = np.repeat(frame[:, :, None], 3, axis=2)
+    return frame[:, :, :3].astype(np.uint8, copy=False)
+
+def _decode_compressed(data: bytes) -> np.ndarray:
+    """JPEG/PNG via OpenCV, else Pillow"""
+    try:
+        import cv2
+    except ImportError:
+        cv2 = None
+    if cv2 is not None:
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError('Could not decode image')
+        return frame[:, :, ::-1]
+
+    try:
+        import io
+        from PIL import Image
+    except ImportError:
+        raise ImportError("JPEG/PNG frames require opencv-python or Pillow (PPM frames decode without either)")
+    return np.asarray(Image.open(io.BytesIO(data)).convert('RGB'))
+
+class ColorPrototypeDetector:
+    """Tiny built-in detector: nearest-colour cells grouped into blobs
+
+    Frames are average-pooled into `cell_size` cells, each cell is assigned
+    to the nearest colour prototype within `max_distance`, and connected
+    cells of one class become one detection.
+    """
+
+    name = 'color-prototype'
+
+    def __init__(self, prototypes: Optional[Dict[str, Iterable[float]]] = None, cell_size: int = 8,
+                 max_distance: float = 60.0, min_cells: int = 2):
+        prototypes = prototypes or BUILTIN_PROTOTYPES
+        self.class_names = list(prototypes)
+        self.prototypes = np.array([prototypes[name] for name in self.class_names], dtype=np.float32)
+        self.cell_size = cell_size
+        self.max_distance = max_distance
+        self.min_cells = min_cells
+
+    @classmethod
+    def load(cls, path: str) -> 'ColorPrototypeDetector':
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config['prototypes'], config.get('cell_size', 8), config.get('max_distance', 60.0),
+                   config.get('min_cells', 2))
+
+    def save(self, path: str):
+        config = {
+            'prototypes': {name: self.prototypes[i].tolist() for i, name in enumerate(self.class_names)},
+            'cell_size': self.cell_size,
+            'max_distance': self.max_distance,
+            'min_cells': self.min_cells
+        }
+        with open(path, 'w') as f:
+            json.dump(config, f, indent=2)
+
+    def _cell_labels(self, frames: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(class index or -1, distance) per cell for a stack of same-size frames"""
+        count, height, width, _ = frames.shape
+        cells_y, cells_x = height // self.cell_size, width // self.cell_size
+        cropped = frames[:, :cells_y * self.cell_size, :cells_x * self.cell_size].astype(np.float32)
+        pooled = cropped.reshape(count, cells_y, self.cell_size, cells_x, self.cell_size, 3).mean(axis=(2, 4))
+
+        distances = np.linalg.norm(pooled[..., None, :] - self.prototypes, axis=-1)
+        labels = distances.argmin(axis=-1)
+        best = np.take_along_axis(distances, labels[..., None], axis=-1)[..., 0]
+        labels[best > self.max_distance] = -1
+        return labels, best
+
+    def _blobs(self, labels: np.ndarray, distances: np.ndarray) -> List[Detection]:
+        from scipy import ndimage
+
+        detections = []
+        for class_index, class_name in enumerate(self.class_names):
+            mask = labels == class_index
+            if not mask.any():
+                continue
+            components, _ = ndimage.label(mask)
+            for component, region in enumerate(ndimage.find_objects(components), start=1):
+                cells = components[region] == component
+                size = int(cells.sum())
+                if size < self.min_cells:
+                    continue
+                mean_distance = float(distances[region][cells].mean())
+                y, x = region[0].start * self.cell_size, region[1].start * self.cell_size
+                detections.append({
+                    'name': class_name,
+                    'confidence': round(1 - mean_distance / (self.max_distance * 2), 3),
+                    'bbox': [x, y, (region[1].stop - region[1].start) * self.cell_size,
+                             (region[0].stop - region[0].start) * self.cell_size]
+                })
+        return detections
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        results: List[Optional[List[Detection]]] = [None] * len(frames)
+        # Frames of one size share a single vectorized pooling/distance pass
+        by_shape: Dict[Tuple[int, ...], List[int]] = {}
+        for i, frame in enumerate(frames):
+            by_shape.setdefault(frame.shape, []).append(i)
+        for indices in by_shape.values():
+            labels, distances = self._cell_labels(np.stack([frames[i] for i in indices]))
+            for offset, i in enumerate(indices):
+                results[i] = self._blobs(labels[offset], distances[offset])
+        return results
+
+class OpenCVDetector:
+    """YOLO-style model (ONNX, Darknet, TF) run on CPU through cv2.dnn"""
+
+    name = 'opencv-dnn'
+
+    def __init__(self, model_path: str, class_names: List[str], input_size: int = 640,
+                 conf_threshold: float = 0.4, nms_threshold: float = 0.45, config_path: Optional[str] = None):
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError("Model files require opencv-python (pip install opencv-python)")
+        self.cv2 = cv2
+        self.net = cv2.dnn.readNet(model_path, config_path) if config_path else cv2.dnn.readNet(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.class_names = class_names
+        self.input_size = input_size
+        self.conf_threshold = conf_threshold
+        self.nms_threshold = nms_threshold
+
+    def detect_batch(self, frames: List[np.ndarray]) -> List[List[Detection]]:
+        size = self.input_size
+        blob = self.cv2.dnn.blobFromImages(frames, 1 / 255.0, (size, size), swapRB=False, crop=False)
+        self.net.setInput(blob)
+        output = np.asarray(self.net.forward())
+        if output.ndim == 2:
+            output = output[None]
+        if output.shape[1] < output.shape[2]:
+            # YOLOv8 layout (batch, 4 + classes, boxes)
+            output = output.transpose(0, 2, 1)
+        return [self._parse(rows, frame.shape) for rows, frame in zip(output, frames)]
+
+    def _parse(self, rows: np.ndarray, shape: Tuple[int, ...]) -> List[Detection]:
+        if rows.shape[1] == 4 + len(self.class_names):
+            scores = rows[:, 4:]
+        else:
+            # YOLOv5 layout: objectness then class scores
+            scores = rows[:, 5:] * rows[:, 4:5]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(rows)), class_ids]
+        keep = confidences >= self.conf_threshold
+        if not keep.any():
+            return []
+
+        scale_x, scale_y = shape[1] / self.input_size, shape[0] / self.input_size
+        cx, cy, w, h = (rows[keep, i] for i in range(4))
+        boxes = np.stack([(cx - w / 2) * scale_x, (cy - h / 2) * scale_y, w * scale_x, h * scale_y], axis=1)
+        confidences, class_ids = confidences[keep], class_ids[keep]
+
+        selected = self.cv2.dnn.NMSBoxes(boxes.tolist(), confidences.tolist(), self.conf_threshold,
+                                         self.nms_threshold)
+        return [
+            {
+                'name': self.class_names[class_ids[i]] if class_ids[i] < len(self.class_names) else str(class_ids[i]),
+                'confidence': round(float(confidences[i]), 3),
+                'bbox': [int(v) for v in boxes[i]]
+            }
+            for i in np.asarray(selected).flatten()
+        ]
+
+def create_detector(model_path: Optional[str] = None, class_names: Optional[List[str]] = None, **kwargs):
+    """Built-in detector by default, a .json prototype file, or a cv2.dnn model file"""
+    if model_path is None:
+        return ColorPrototypeDetector(**kwargs)
+    if model_path.endswith('.json'):
+        return ColorPrototypeDetector.load(model_path)
+    if not class_names:
+        raise ValueError('class_names are required for model files')
+    return OpenCVDetector(model_path, class_names, **kwargs)
+
+class ShelfProductMapper:
+    """Detected class -> Product_ID for each camera
+
+    An explicit planogram ({camera_id: {class: product_id}}, '*' for all
+    cameras) wins; otherwise the class is matched by name against the
+    inventory, preferring products at the camera's warehouse location.
+    """
+
+    def __init__(self, products: Optional[List[Dict[str, Any]]] = None,
+                 planogram: Optional[Dict[str, Dict[str, str]]] = None,
+                 camera_locations: Optional[Dict[str, str]] = None):
+        self.planogram = planogram or {}
+        self.camera_locations = camera_locations or {}
+        self.by_name: Dict[str, List[Dict[str, Any]]] = {}
+        for product in products or []:
+            name = str(product.get('name') or '').strip().lower()
+            if name:
+                self.by_name.setdefault(name, []).append(product)
+        self._cache: Dict[Tuple[str, str], Optional[str]] = {}
+
+    def product_id(self, camera_id: str, class_name: str) -> Optional[str]:
+        key = (camera_id, class_name)
+        if key in self._cache:
+            return self._cache[key]
+
+        product_id = self.planogram.get(camera_id, {}).get(class_name) or self.planogram.get('*', {}).get(class_name)
+        if product_id is None:
+            candidates = self.by_name.get(class_name.lower(), [])
+            location = self.camera_locations.get(camera_id)
+            at_location = [p for p in candidates if location and p.get('location') == location]
+            match = (at_location or candidates or [None])[0]
+            product_id = match.get('product_id') if match else None
+
+        self._cache[key] = product_id
+        return product_id
+
+def jsonl_sink(path: str = DEFAULT_UPDATES_PATH) -> Callable[[List[StockUpdate]], None]:
+    """Append stock updates as JSON lines"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    def write(updates: List[StockUpdate]):
+        with open(path, 'a') as f:
+            f.writelines(json.dumps(update) + '\n' for update in updates)
+    return write
+
+def inventory_sink(model, vector_store, expiry_scheduler=None) -> Callable[[List[StockUpdate]], None]:
+    """Write camera counts to the vector store and feed them to the model
+
+    For a product mapped to shelf cameras the units on its shelves are its
+    sellable stock, so `shelf_count` (summed over cameras) becomes the
+    record's stock_left. With an ExpiryRepricingScheduler the written
+    records are (re)scheduled as well.
+    """
+    def observe(updates: List[StockUpdate]):
+        records = []
+        for update in updates:
+            product = vector_store.get_product_by_id(update['product_id'])
+            if product is not None:
+                records.append(dict(product, stock_left=update['shelf_count']))
+        if records:
+            vector_store.upsert_products(records)
+            model.observe_inventory(records)
+            if expiry_scheduler is not None:
+                expiry_scheduler.schedule_products(records)
+    return observe
+
+class FrameDiffGate:
+    """Per-ROI change detection on downscaled frames
+
+    Each frame is block-averaged to a grey thumbnail (`downscale` px per
+    cell) once; an ROI is considered changed when more than
+    `changed_fraction` of its cells differ by over `pixel_threshold` from the
+    thumbnail taken when the ROI was last inferred. Comparing against that
+    reference (not the previous frame) lets slow changes accumulate, and
+    `max_skipped` forces a periodic re-inference per ROI. Because a single
+    product is a tiny share of a whole-frame ROI, changing half of one
+    `item_size` footprint's cells also counts as a change.
+    """
+
+    def __init__(self, downscale: int = 8, pixel_threshold: float = 20.0, changed_fraction: float = 0.02,
+                 max_skipped: int = 600, item_size: int = 24):
+        self.downscale = downscale
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.max_skipped = max_skipped
+        self.item_cells = max(1, (item_size // downscale) ** 2 // 2)
+        self.rois: Dict[str, List[Roi]] = {}
+        self.references: Dict[Tuple[str, int], np.ndarray] = {}
+        self.skipped: Dict[Tuple[str, int], int] = {}
+
+    def set_rois(self, camera_id: str, rois: List[Roi]):
+        """Shelf regions (x, y, w, h) of one camera; the whole frame by default"""
+        self.rois[camera_id] = [tuple(int(v) for v in roi) for roi in rois]
+        for key in [key for key in self.references if key[0] == camera_id]:
+            del self.references[key]
+            self.skipped.pop(key, None)
+
+    def camera_rois(self, camera_id: str, shape: Tuple[int, ...]) -> List[Roi]:
+        return self.rois.get(camera_id) or [(0, 0, shape[1], shape[0])]
+
+    def thumbnail(self, frame: np.ndarray) -> np.ndarray:
+        scale = self.downscale
+        cells_y, cells_x = frame.shape[0] // scale, frame.shape[1] // scale
+        cropped = frame[:cells_y * scale, :cells_x * scale]
+        return cropped.reshape(cells_y, scale, cells_x, scale, 3).mean(axis=(1, 3, 4), dtype=np.float32)
+
+    def changed_rois(self, camera_id: str, frame: np.ndarray) -> List[int]:
+        """Indices of this camera's ROIs that need inference; updates their references"""
+        thumbnail = self.thumbnail(frame)
+        scale = self.downscale
+        changed = []
+        for index, (x, y, w, h) in enumerate(self.camera_rois(camera_id, frame.shape)):
+            key = (camera_id, index)
+            cells = thumbnail[y // scale:-(-(y + h) // scale), x // scale:-(-(x + w) // scale)]
+            reference = self.references.get(key)
+            if reference is not None and reference.shape == cells.shape and cells.size:
+                moved = np.count_nonzero(np.abs(cells - reference) > self.pixel_threshold)
+                skipped = self.skipped.get(key, 0)
+                if moved < min(self.changed_fraction * cells.size, self.item_cells) and skipped < self.max_skipped:
+                    self.skipped[key] = skipped + 1
+                    continue
+            self.references[key] = cells.copy()
+            self.skipped[key] = 0
+            changed.append(index)
+        return changed
+
+class DetectionWorker:
+    """Batches frames from many cameras through one detector
+
+    With a FrameDiffGate (the default) only changed shelf regions are
+    inferred; the last detections of unchanged regions are reused, and a
+    stock update is emitted only when a product's visible count, summed
+    over all cameras, changes.
+    """
+
+    def __init__(self, detector=None, mapper: Optional[ShelfProductMapper] = None,
+                 sinks: Optional[List[Callable[[List[StockUpdate]], None]]] = None, batch_size: int = 16,
+                 max_queue: int = 1024, gate: Optional[FrameDiffGate] = None, frame_diff: bool = True):
+        self.detector = detector or ColorPrototypeDetector()
+        self.mapper = mapper or ShelfProductMapper()
+        self.sinks = list(sinks or [])
+        self.batch_size = batch_size
+        self.queue: deque = deque()
+        self.max_queue = max_queue
+        self.queue_lock = threading.Lock()
+        self.gate = (gate or FrameDiffGate()) if frame_diff else None
+
+        # Last detections per (camera, ROI), visible units per camera and product, and their sum
+        self.roi_detections: Dict[Tuple[str, int], List[Detection]] = {}
+        self.camera_counts: Dict[str, Dict[str, int]] = {}
+        self.shelf_counts: Dict[str, int] = {}
+
+        self.rois_inferred = 0
+        self.rois_skipped = 0
+        self.events_emitted = 0
+        self.events_suppressed = 0
+        self.frames = 0
+        self.batches = 0
+        self.dropped_frames = 0
+        self.busy_seconds = 0.0
+        self.stage_ms: Dict[str, deque] = {stage: deque(maxlen=1000) for stage in STAGES}
+
+    def submit(self, camera_id: str, frame: Any, timestamp: Optional[str] = None,
+               frame_id: Optional[int] = None) -> Optional[QueuedFrame]:
+        """Queue one frame; returns the oldest frame if it was dropped to make room"""
+        dropped = None
+        with self.queue_lock:
+            if len(self.queue) >= self.max_queue:
+                dropped = self.queue.popleft()
+                self.dropped_frames += 1
+            self.queue.append((camera_id, frame, timestamp or datetime.now().isoformat(), frame_id))
+        return dropped
+
+    def next_batch(self) -> List[QueuedFrame]:
+        """Take up to batch_size queued frames, from whichever cameras queued them"""
+        with self.queue_lock:
+            return [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+
+    def process_pending(self) -> List[Dict[str, Any]]:
+        """Run every queued frame through the detector; returns per-frame results"""
+        results = []
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                return results
+            results.extend(self.process_batch(batch))
+
+    def process_frames(self, items: List[Tuple[str, Any, str]]) -> List[Dict[str, Any]]:
+        """Run (camera_id, frame, timestamp) items directly, bypassing the queue"""
+        results = []
+        for start in range(0, len(items), self.batch_size):
+            results.extend(self.process_batch([item + (None,) for item in items[start:start + self.batch_size]]))
+        return results
+
+    def set_rois(self, camera_id: str, rois: List[Roi]):
+        if self.gate is None:
+            raise ValueError('ROIs require a FrameDiffGate')
+        self.gate.set_rois(camera_id, rois)
+        for key in [key for key in self.roi_detections if key[0] == camera_id]:
+            del self.roi_detections[key]
+
+    def process_batch(self, batch: List[QueuedFrame]) -> List[Dict[str, Any]]:
+        """Per-frame results; a frame that cannot be decoded gets an 'error' instead"""
+        start_time = time.perf_counter()
+        frames = []
+        failed = []
+        for item in batch:
+            try:
+                frames.append(decode_frame(item[1]))
+            except (ValueError, ImportError) as e:
+                failed.append((item, str(e)))
+        if failed:
+            batch = [item for item in batch if not any(item is failed_item for failed_item, _ in failed)]
+        decoded = time.perf_counter()
+
+        # (frame position, ROI index, ROI) of every region that needs inference
+        pending: List[Tuple[int, int, Roi]] = []
+        frame_rois: List[List[Roi]] = []
+        for position, ((camera_id, _, _, _), frame) in enumerate(zip(batch, frames)):
+            if self.gate is None:
+                rois = [(0, 0, frame.shape[1], frame.shape[0])]
+                changed = [0]
+            else:
+                rois = self.gate.camera_rois(camera_id, frame.shape)
+                changed = self.gate.changed_rois(camera_id, frame)
+            frame_rois.append(rois)
+            pending.extend((position, index, rois[index]) for index in changed)
+            self.rois_skipped += len(rois) - len(changed)
+        gated = time.perf_counter()
+
+        crops = [frames[position][y:y + h, x:x + w] for position, _, (x, y, w, h) in pending]
+        detections = self.detector.detect_batch(crops) if crops else []
+        # Kept per frame: a batch can hold several frames of one camera
+        frame_inferred: Dict[int, Dict[int, List[Detection]]] = {}
+        for (position, index, (x, y, _, _)), roi_detections in zip(pending, detections):
+            for detection in roi_detections:
+                bx, by, bw, bh = detection['bbox']
+                detection['bbox'] = [bx + x, by + y, bw, bh]
+            frame_inferred.setdefault(position, {})[index] = roi_detections
+        self.rois_inferred += len(pending)
+        inferred = time.perf_counter()
+
+        results = []
+        updates = []
+        for position, ((camera_id, _, timestamp, frame_id), rois) in enumerate(zip(batch, frame_rois)):
+            # Applied in submission order, so each frame sees its own regions plus the reused ones
+            for index, roi_detections in frame_inferred.get(position, {}).items():
+                self.roi_detections[(camera_id, index)] = roi_detections
+            frame_detections = [detection for index in range(len(rois))
+                                for detection in self.roi_detections.get((camera_id, index), [])]
+            frame_updates = self.stock_updates(camera_id, frame_detections, timestamp)
+            updates.extend(frame_updates)
+            results.append({'camera_id': camera_id, 'timestamp': timestamp, 'frame_id': frame_id,
+                            'detections': frame_detections, 'stock_updates': frame_updates})
+        results.extend({'camera_id': camera_id, 'timestamp': timestamp, 'frame_id': frame_id, 'error': error,
+                        'detections': [], 'stock_updates': []}
+                       for (camera_id, _, timestamp, frame_id), error in failed)
+        self.emit(updates)
+        mapped = time.perf_counter()
+
+        count = len(batch)
+        if count:
+            timings = (decoded - start_time, gated - decoded, inferred - gated, mapped - inferred)
+            for stage, seconds in zip(STAGES, timings):
+                self.stage_ms[stage].append(seconds * 1000 / count)
+            self.frames += count
+            self.batches += 1
+            self.busy_seconds += mapped - start_time
+        return results
+
+    def stock_updates(self, camera_id: str, detections: List[Detection], timestamp: str) -> List[StockUpdate]:
+        """One update per mapped product whose shelf count (all cameras) changed with this frame"""
+        counts: Dict[str, int] = {}
+        for detection in detections:
+            product_id = self.mapper.product_id(camera_id, detection['name'])
+            if product_id is not None:
+                counts[product_id] = counts.get(product_id, 0) + 1
+
+        previous = self.camera_counts.get(camera_id, {})
+        self.camera_counts[camera_id] = counts
+
+        updates = []
+        # A product that left this camera's view drops out of the sum
+        for product_id in counts.keys() | previous.keys():
+            delta = counts.get(product_id, 0) - previous.get(product_id, 0)
+            if not delta:
+                self.events_suppressed += 1
+                continue
+            shelf_count = self.shelf_counts.get(product_id, 0) + delta
+            self.shelf_counts[product_id] = shelf_count
+            updates.append({
+                'product_id': product_id,
+                'shelf_count': shelf_count,
+                'cameras': sum(1 for camera in self.camera_counts.values() if camera.get(product_id)),
+                'camera_id': camera_id,
+                'source': 'camera',
+                'timestamp': timestamp
+            })
+        return updates
+
+    def emit(self, updates: List[StockUpdate]):
+        if not updates:
+            return
+        self.events_emitted += len(updates)
+        for sink in self.sinks:
+            try:
+                sink(updates)
+            except Exception as e:
+                print(f"Error delivering stock updates: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stages = {}
+        for stage, samples in self.stage_ms.items():
+            values = np.fromiter(samples, dtype=np.float64)
+            p50, p99 = np.percentile(values, [50, 99]) if len(values) else (0.0, 0.0)
+            stages[stage] = {'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3)}
+        checked = self.rois_inferred + self.rois_skipped
+        return {
+            'detector': self.detector.name,
+            'frames': self.frames,
+            'batches': self.batches,
+            'queued': len(self.queue),
+            'dropped_frames': self.dropped_frames,
+            'frames_per_sec': round(self.frames / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            'rois_inferred': self.rois_inferred,
+            'rois_skipped': self.rois_skipped,
+            'inference_skip_rate': round(self.rois_skipped / checked, 3) if checked else 0.0,
+            'events_emitted': self.events_emitted,
+            'events_suppressed': self.events_suppressed,
+            'stage_latency_per_frame': stages
+        }
+
+def grid_rois(shape: Tuple[int, ...], rows: int, cols: int) -> List[Roi]:
+    """Split a frame into rows x cols ROIs (e.g. one per shelf and bay)"""
+    height, width = shape[:2]
+    ys = np.linspace(0, height, rows + 1).astype(int)
+    xs = np.linspace(0, width, cols + 1).astype(int)
+    return [(int(xs[c]), int(ys[r]), int(xs[c + 1] - xs[c]), int(ys[r + 1] - ys[r]))
+            for r in range(rows) for c in range(cols)]
+
+def shelf_slots(size: Tuple[int, int] = (240, 320), item_size: int = 24) -> List[Tuple[int, int]]:
+    height, width = size
+    return [(y, x) for y in range(8, height - item_size, item_size + 16) for x in range(8, width - item_size, item_size + 16)]
+
+def render_shelf(rng: np.random.Generator, slot_classes: List[Optional[str]], size: Tuple[int, int] = (240, 320),
+                 item_size: int = 24) -> np.ndarray:
+    """Grey shelf with sensor noise and one coloured item per occupied slot"""
+    frame = np.full((size[0], size[1], 3), 110, dtype=np.uint8)
+    frame += rng.integers(0, 12, size=frame.shape, dtype=np.uint8)
+    for (y, x), class_name in zip(shelf_slots(size, item_size), slot_classes):
+        if class_name is not None:
+            frame[y:y + item_size, x:x + item_size] = BUILTIN_PROTOTYPES[class_name]
+    return frame
+
+def synthetic_shelf_frame(rng: np.random.Generator, counts: Dict[str, int], size: Tuple[int, int] = (240, 320),
+                          item_size: int = 24) -> np.ndarray:
+    """Shelf with `counts[class]` coloured items laid out on a grid"""
+    slot_classes = [name for name, count in counts.items() for _ in range(count)]
+    return render_shelf(rng, slot_classes, size, item_size)
+
+def synthetic_footage(rng: np.random.Generator, cameras: int, frames: int, change_probability: float = 0.02,
+                      size: Tuple[int, int] = (240, 320)) -> Iterable[Tuple[str, np.ndarray]]:
+    """(camera_id, frame) from static shelves where single items are occasionally taken or restocked"""
+    names = list(BUILTIN_PROTOTYPES)
+    slot_count = len(shelf_slots(size))
+    layouts = [[names[i] if i < len(names) else None for i in rng.integers(0, len(names) + 2, slot_count)]
+               for _ in range(cameras)]
+    for _ in range(frames):
+        for camera, layout in enumerate(layouts):
+            if rng.random() < change_probability:
+                slot = int(rng.integers(slot_count))
+                layout[slot] = None if layout[slot] else names[int(rng.integers(len(names)))]
+            yield f"camera-{camera}", render_shelf(rng, layout, size)
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the shelf detection worker on synthetic camera frames')
+    parser.add_argument('--model', default=None, help='.json prototype model or cv2.dnn model file')
+    parser.add_argument('--classes', default=None, help='Comma-separated class names for model files')
+    parser.add_argument('--cameras', type=int, default=4)
+    parser.add_argument('--frames', type=int, default=50, help='Frames per camera')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--output', default=None, help='Append stock updates to this JSONL file')
+    parser.add_argument('--no-frame-diff', action='store_true', help='Run inference on every frame')
+    args = parser.parse_args()
+
+    from inventory_schema import load_inventory_records
+
+    detector = create_detector(args.model, args.classes.split(',') if args.classes else None)
+    mapper = ShelfProductMapper(load_inventory_records('public/data/grocery-inventory.csv'))
+    worker = DetectionWorker(detector, mapper, [jsonl_sink(args.output)] if args.output else [], args.batch_size,
+                             frame_diff=not args.no_frame_diff)
+
+    rng = np.random.default_rng(42)
+    for camera_id, frame in synthetic_footage(rng, args.cameras, args.frames):
+        if worker.gate is not None and camera_id not in worker.gate.rois:
+            worker.set_rois(camera_id, grid_rois(frame.shape, 6, 2))
+        worker.submit(camera_id, base64.b64encode(encode_ppm(frame)).decode('ascii'))
+    results = worker.process_pending()
+
+    updates = [update for result in results for update in result['stock_updates']]
+    print(f"Stock updates: {len(updates)}, last: {updates[-1] if updates else None}")
+    for key, value in worker.get_stats().items():
+        print(f"{key}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,27 @@
 import csv
 import time
-import random
 import os
 from datetime import datetime, timedelta
 
+import numpy as np
+
+from inventory_schema import CSV_COLUMN_MAP, record_location
+from pricing_rules import apply_rule_pricing, days_until, parse_expiry_dates
+from product_table import ProductTable
+
+# Written back under the CSV's own column names
+CSV_HEADERS = {field: column for column, field in CSV_COLUMN_MAP.items()}
+
+# Fields the simulation changes; every other CSV column is written back exactly as read
+SIMULATED_FIELDS = ['stock_left', 'updated_at', 'recommended_price', 'price_change']
+
 class InventorySimulator:
     def __init__(self, csv_path="public/data/grocery-inventory.csv"):
         self.csv_path = csv_path
-        self.products = []
+        self.products = ProductTable()
+        # Raw CSV rows and header, so untouched values keep their formatting (e.g. "$4.60")
+        self.source_rows = None
+        self.source_columns = []
         self.load_initial_data()
     
     def load_initial_data(self):
@@ -15,7 +29,10 @@ class InventorySimulator:
         try:
             with open(self.csv_path, 'r') as file:
                 reader = csv.DictReader(file)
-                self.products = list(reader)
+                self.source_rows = list(reader)
+                self.source_columns = list(reader.fieldnames or [])
+            # Numbers are parsed once here, not on every tick
+            self.products = ProductTable.from_records(self.source_rows, rename=CSV_COLUMN_MAP)
             print(f"Loaded {len(self.products)} products for simulation")
         except FileNotFoundError:
             print(f"CSV file not found: {self.csv_path}")
@@ -23,7 +40,7 @@ class InventorySimulator:
     
     def create_sample_data(self):
         """Create sample data if CSV doesn't exist"""
-        self.products = [
+        self.products = ProductTable.from_records([
             {
                 'product_id': '01-903-5373',
                 'name': 'Organic Bananas',
@@ -48,62 +65,62 @@ class InventorySimulator:
                 'stock_left': '32',
                 'category': 'Seafood'
             }
-        ]
+        ])
+    
+    def products_by_location(self):
+        """Group simulated products by warehouse/store location"""
+        partitions = {}
+        for product in self.products:
+            partitions.setdefault(record_location(product), []).append(product)
+        return partitions
     
     def simulate_stock_changes(self):
         """Simulate realistic stock level changes"""
-        for product in self.products:
-            current_stock = int(product['stock_left'])
-            
-            # Simulate sales (stock decreases)
-            if random.random() < 0.7:  # 70% chance of sales
-                sales = random.randint(1, min(10, current_stock))
-                current_stock = max(0, current_stock - sales)
-            
-            # Simulate restocking (occasional stock increases)
-            if random.random() < 0.1 and current_stock < 20:  # 10% chance of restocking when low
-                restock = random.randint(20, 100)
-                current_stock += restock
-                print(f"Restocked {product['name']}: +{restock} units")
-            
-            product['stock_left'] = str(current_stock)
-            
-            # Update timestamp
-            product['updated_at'] = datetime.now().isoformat()
+        if not self.products:
+            return
+        
+        stock = self.products.numeric('stock_left', 0).astype(np.int64)
+        count = len(stock)
+        
+        # Simulate sales (stock decreases): 70% chance, 1-10 units, never more than is left
+        selling = (np.random.random(count) < 0.7) & (stock > 0)
+        sales = np.random.randint(1, np.minimum(10, np.maximum(stock, 1)) + 1)
+        stock = np.where(selling, np.maximum(0, stock - sales), stock)
+        
+        # Simulate restocking (occasional stock increases): 10% chance when low
+        restocking = (np.random.random(count) < 0.1) & (stock < 20)
+        restock = np.random.randint(20, 101, count)
+        stock = np.where(restocking, stock + restock, stock)
+        for idx in np.flatnonzero(restocking):
+            print(f"Restocked {self.products[idx].get('name')}: +{restock[idx]} units")
+        
+        self.products.set_numeric('stock_left', stock, integer=True)
+        
+        # Update timestamp
+        self.products.set_text('updated_at', datetime.now().isoformat())
     
     def simulate_price_changes(self):
         """Simulate dynamic price changes based on stock and expiry"""
-        for product in self.products:
-            base_price = float(product['current_price'])
-            stock_left = int(product['stock_left'])
-            
-            # Calculate days to expiry
-            expiry_date = datetime.strptime(product['expiry_date'], '%Y-%m-%d')
-            days_to_expiry = (expiry_date - datetime.now()).days
-            
-            # Price adjustment factors
-            price_multiplier = 1.0
-            
-            # Expiry-based pricing
-            if days_to_expiry <= 1:
-                price_multiplier *= 0.6  # 40% off
-            elif days_to_expiry <= 3:
-                price_multiplier *= 0.75  # 25% off
-            elif days_to_expiry <= 7:
-                price_multiplier *= 0.85  # 15% off
-            
-            # Stock-based pricing
-            if stock_left > 100:
-                price_multiplier *= 0.9  # 10% off for overstocked
-            elif stock_left < 10:
-                price_multiplier *= 1.1  # 10% markup for low stock
-            
-            # Apply random market fluctuation
-            price_multiplier *= (0.95 + random.random() * 0.1)  # ±5% random variation
-            
-            new_price = round(base_price * price_multiplier, 2)
-            product['recommended_price'] = str(new_price)
-            product['price_change'] = str(round(new_price - base_price, 2))
+        if not self.products:
+            return
+        
+        base_prices = self.products.numeric('current_price', 0)
+        stock_left = self.products.numeric('stock_left', 0).astype(np.int64)
+        
+        # Calculate days to expiry (each distinct date string is parsed once)
+        expiry_dates = self.products.text_values('expiry_date', parse_expiry_dates)
+        days_to_expiry = days_until(expiry_dates)
+        
+        # Expiry- and stock-based multipliers from the shared 'simulator' rule profile
+        new_prices, _ = apply_rule_pricing(base_prices, days_to_expiry, stock_left, profile='simulator')
+        
+        # Apply random market fluctuation
+        new_prices *= 0.95 + np.random.random(len(new_prices)) * 0.1  # ±5% random variation
+        
+        new_prices = np.round(new_prices, 2)
+        price_changes = np.round(new_prices - base_prices, 2)
+        self.products.set_numeric('recommended_price', new_prices)
+        self.products.set_numeric('price_change', price_changes)
     
     def append_to_csv(self):
         """Append updated data to CSV file"""
@@ -111,13 +128,27 @@ class InventorySimulator:
             # Create directory if it doesn't exist
             os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
             
+            # Source columns are copied verbatim; only simulated fields are re-rendered
+            if self.source_rows is not None:
+                columns = list(self.source_columns)
+                written_fields = [name for name in SIMULATED_FIELDS if name in self.products.fields]
+            else:
+                columns = []
+                written_fields = list(self.products.fields)
+            columns += [CSV_HEADERS.get(name, name) for name in written_fields
+                        if CSV_HEADERS.get(name, name) not in columns]
+            
             # Write updated data
             with open(self.csv_path, 'w', newline='') as file:
                 if self.products:
-                    fieldnames = self.products[0].keys()
-                    writer = csv.DictWriter(file, fieldnames=fieldnames)
+                    writer = csv.DictWriter(file, fieldnames=columns)
                     writer.writeheader()
-                    writer.writerows(self.products)
+                    for index in range(len(self.products)):
+                        record = self.products.record(index)
+                        row = dict(self.source_rows[index]) if self.source_rows is not None else {}
+                        row.update({CSV_HEADERS.get(name, name): record[name] for name in written_fields
+                                    if name in record})
+                        writer.writerow(row)
             
             print(f"Updated {len(self.products)} products in {self.csv_path}")
             
@@ -1,17 +1,32 @@
-import pathway as pw
-import pandas as pd
+import argparse
 import json
 import time
-from typing import Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 import os
 
 class InventoryStreamProcessor:
     def __init__(self, csv_path: str = "public/data/grocery-inventory.csv"):
         self.csv_path = csv_path
-        self.schema = pw.Schema.from_pandas(pd.read_csv(csv_path).head(0))
+        self._schema = None
+    
+    @property
+    def schema(self):
+        """Pathway schema inferred from the CSV header, built on first use"""
+        if self._schema is None:
+            import pathway as pw
+            import pandas as pd
+            self._schema = pw.Schema.from_pandas(pd.read_csv(self.csv_path).head(0))
+        return self._schema
+        
+    def setup_stream(self, on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        """Setup Pathway stream from CSV file
+        
+        When `on_batch` is given, it is called on the Pathway thread with the
+        rows added or changed at each commit (see serve_pipeline, which
+        reprices them and publishes the results to the live price hub).
+        """
+        import pathway as pw
         
-    def setup_stream(self):
-        """Setup Pathway stream from CSV file"""
         # Create a streaming table from CSV
         inventory_table = pw.io.csv.read(
             self.csv_path,
@@ -33,16 +48,90 @@ class InventoryStreamProcessor:
         # Output to JSON for API consumption
         pw.io.jsonlines.write(processed_table, "data/live_inventory.jsonl")
         
+        if on_batch is not None:
+            changed_rows = []
+            
+            def on_change(key, row, event_time, is_addition):
+                if is_addition:
+                    changed_rows.append(dict(row))
+            
+            def on_time_end(event_time):
+                if changed_rows:
+                    batch = changed_rows[:]
+                    changed_rows.clear()
+                    on_batch(batch)
+            
+            pw.io.subscribe(processed_table, on_change=on_change, on_time_end=on_time_end)
+        
         return processed_table
     
-    def run_pipeline(self):
+    def run_pipeline(self, on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
         """Start the streaming pipeline"""
         print("Starting Pathway streaming pipeline...")
-        processed_table = self.setup_stream()
+        processed_table = self.setup_stream(on_batch)
+        
+        import pathway as pw
         
         # Run the computation
         pw.run()
+    
+    def serve_pipeline(self, host: str = '127.0.0.1', port: int = 8765):
+        """Run the pipeline next to a pricing service that streams its repricing
+        
+        The service (and its PriceUpdateHub) runs on an event loop thread.
+        Each committed batch of changed rows is priced on the service's
+        pricing thread and published to the hub, so GET /stream subscribers
+        receive price deltas rather than raw inventory rows.
+        """
+        import asyncio
+        import threading
+        from batch_pricing import price_products
+        from pricing_service import PricingService
+        from product_table import ProductTable
+        
+        service = PricingService()
+        service.warm_up()
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+        
+        async def serve():
+            server = await service.start(host, port)
+            started.set()
+            async with server:
+                await server.serve_forever()
+        
+        threading.Thread(target=loop.run_until_complete, args=(serve(),), name='pricing-service',
+                         daemon=True).start()
+        started.wait()
+        
+        async def reprice(products: List[Dict[str, Any]]):
+            recommendations = await service.run_cpu(price_products, service.model, products)
+            service.hub.publish_recommendations(recommendations)
+        
+        def on_batch(rows: List[Dict[str, Any]]):
+            # Parse '$4.60'-style values the same way the stores do
+            products = ProductTable.from_records(rows).records()
+            asyncio.run_coroutine_threadsafe(reprice(products), loop).result()
+        
+        try:
+            self.run_pipeline(on_batch)
+        finally:
+            service.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream inventory CSV changes through Pathway')
+    parser.add_argument('--csv', default='public/data/grocery-inventory.csv')
+    parser.add_argument('--serve', action='store_true',
+                        help='Reprice changed rows and stream price deltas from a pricing service (GET /stream)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PRICING_SERVICE_PORT', 8765)))
+    args = parser.parse_args()
+    
+    processor = InventoryStreamProcessor(args.csv)
+    if args.serve:
+        processor.serve_pipeline(args.host, args.port)
+    else:
+        processor.run_pipeline()
 
 if __name__ == "__main__":
-    processor = InventoryStreamProcessor()
-    processor.run_pipeline()
+    main()
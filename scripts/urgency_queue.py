@@ -0,0 +1,229 @@
+"""
+Urgency Queue
+
+Indexed max-priority queue keyed by product ID, used to keep the N most
+urgent SKUs (by urgency score or discount) without re-scoring and sorting
+the catalog on every read. Updates are O(log N); reading the top k is
+O(k log k) and does not modify the queue.
+"""
+
+import heapq
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+SECONDS_PER_DAY = 86400
+
+# calculate_urgency_score stops changing with time once days_to_expiry >= this
+URGENCY_EXPIRY_HORIZON_DAYS = 7
+
+class IndexedPriorityQueue:
+    """Binary max-heap with a key -> heap position index"""
+
+    def __init__(self):
+        self.keys: List[Hashable] = []
+        self.priorities: List[float] = []
+        self.position: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.position
+
+    def get(self, key: Hashable) -> Optional[float]:
+        index = self.position.get(key)
+        return None if index is None else self.priorities[index]
+
+    def _swap(self, i: int, j: int):
+        self.keys[i], self.keys[j] = self.keys[j], self.keys[i]
+        self.priorities[i], self.priorities[j] = self.priorities[j], self.priorities[i]
+        self.position[self.keys[i]] = i
+        self.position[self.keys[j]] = j
+
+    def _sift_up(self, index: int):
+        while index > 0:
+            parent = (index - 1) // 2
+            if self.priorities[parent] >= self.priorities[index]:
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index: int):
+        size = len(self.keys)
+        while True:
+            largest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size and self.priorities[child] > self.priorities[largest]:
+                    largest = child
+            if largest == index:
+                return
+            self._swap(index, largest)
+            index = largest
+
+    def update(self, key: Hashable, priority: float):
+        """Insert a key or change its priority"""
+        index = self.position.get(key)
+        if index is None:
+            self.keys.append(key)
+            self.priorities.append(priority)
+            self.position[key] = len(self.keys) - 1
+            self._sift_up(len(self.keys) - 1)
+            return
+
+        previous = self.priorities[index]
+        self.priorities[index] = priority
+        if priority > previous:
+            self._sift_up(index)
+        elif priority < previous:
+            self._sift_down(index)
+
+    def remove(self, key: Hashable) -> bool:
+        index = self.position.pop(key, None)
+        if index is None:
+            return False
+
+        last = len(self.keys) - 1
+        if index != last:
+            self.keys[index] = self.keys[last]
+            self.priorities[index] = self.priorities[last]
+            self.position[self.keys[index]] = index
+        self.keys.pop()
+        self.priorities.pop()
+
+        if index < len(self.keys):
+            self._sift_up(index)
+            self._sift_down(self.position[self.keys[index]])
+        return True
+
+    def top(self, k: int) -> List[Tuple[Hashable, float]]:
+        """Highest-priority k entries in order, without popping"""
+        if not self.keys or k <= 0:
+            return []
+        results = []
+        frontier = [(-self.priorities[0], 0)]
+        size = len(self.keys)
+        while frontier and len(results) < k:
+            negated, index = heapq.heappop(frontier)
+            results.append((self.keys[index], -negated))
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size:
+                    heapq.heappush(frontier, (-self.priorities[child], child))
+        return results
+
+class UrgencyTracker:
+    """Most-urgent and most-discounted SKUs, maintained incrementally
+
+    Urgency scores come from the pricing model's `calculate_urgency_score`.
+    Because the expiry component depends on the clock, each product is also
+    scheduled in a min-heap at the instant its days-to-expiry next changes;
+    `advance` re-scores only those products.
+    """
+
+    def __init__(self, score_fn: Callable[[int, int], float]):
+        self.score_fn = score_fn
+        self.urgency = IndexedPriorityQueue()
+        self.discounts = IndexedPriorityQueue()
+
+        self.stock: Dict[str, int] = {}
+        self.expiry_seconds: Dict[str, int] = {}
+        self.expiry_heap: List[Tuple[int, str, int]] = []
+        self.expiry_generation: Dict[str, int] = {}
+        self.rescored = 0
+
+    def _rescore(self, product_id: str, now_seconds: int, schedule: bool):
+        expiry = self.expiry_seconds.get(product_id)
+        days = URGENCY_EXPIRY_HORIZON_DAYS if expiry is None else (expiry - now_seconds) // SECONDS_PER_DAY
+        self.urgency.update(product_id, self.score_fn(days, self.stock.get(product_id, 0)))
+        self.rescored += 1
+
+        if schedule and expiry is not None:
+            next_days = min(days, URGENCY_EXPIRY_HORIZON_DAYS)
+            fire_at = expiry - next_days * SECONDS_PER_DAY + 1
+            heapq.heappush(self.expiry_heap, (int(fire_at), product_id, self.expiry_generation[product_id]))
+
+    def update(self, product_id: str, stock_left: Optional[int] = None, expiry_seconds: Optional[int] = None,
+               now: Optional[datetime] = None):
+        """Record a stock and/or expiry change for one product and re-score it"""
+        if stock_left is not None:
+            self.stock[product_id] = int(stock_left)
+        expiry_changed = expiry_seconds is not None and self.expiry_seconds.get(product_id) != expiry_seconds
+        if expiry_changed:
+            self.expiry_seconds[product_id] = int(expiry_seconds)
+            self.expiry_generation[product_id] = self.expiry_generation.get(product_id, 0) + 1
+        self._rescore(product_id, int((now or datetime.now()).timestamp()), schedule=expiry_changed)
+        if expiry_changed:
+            self._compact_heap()
+
+    def update_discount(self, product_id: str, discount_percent: float):
+        self.discounts.update(product_id, float(discount_percent))
+
+    def remove(self, product_id: str):
+        self.urgency.remove(product_id)
+        self.discounts.remove(product_id)
+        self.stock.pop(product_id, None)
+        self.expiry_seconds.pop(product_id, None)
+        # Invalidate any scheduled re-score
+        self.expiry_generation[product_id] = self.expiry_generation.get(product_id, 0) + 1
+        self._compact_heap()
+
+    def _compact_heap(self):
+        """Drop superseded re-scores once they outnumber the live ones"""
+        if len(self.expiry_heap) > 2 * len(self.expiry_seconds) + 64:
+            self.expiry_heap = [entry for entry in self.expiry_heap
+                                if entry[2] == self.expiry_generation.get(entry[1]) and entry[1] in self.expiry_seconds]
+            heapq.heapify(self.expiry_heap)
+
+    def advance(self, now: Optional[datetime] = None) -> int:
+        """Re-score products whose days-to-expiry changed; returns how many"""
+        now_seconds = int((now or datetime.now()).timestamp())
+        count = 0
+        while self.expiry_heap and self.expiry_heap[0][0] <= now_seconds:
+            _, product_id, generation = heapq.heappop(self.expiry_heap)
+            if generation == self.expiry_generation.get(product_id) and product_id in self.urgency:
+                self._rescore(product_id, now_seconds, schedule=True)
+                count += 1
+        return count
+
+    def most_urgent(self, n: int = 10, now: Optional[datetime] = None) -> List[Tuple[str, float]]:
+        self.advance(now)
+        return self.urgency.top(n)
+
+    def most_discounted(self, n: int = 10) -> List[Tuple[str, float]]:
+        return self.discounts.top(n)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'tracked_products': len(self.urgency),
+            'discounted_products': len(self.discounts),
+            'scheduled_rescores': len(self.expiry_heap),
+            'rescored': self.rescored
+        }
+
+if __name__ == "__main__":
+    import random
+    import time
+    from datetime import timedelta
+
+    def urgency_score(days_to_expiry: int, stock_left: int) -> float:
+        return max(0, (7 - days_to_expiry) / 7) * 0.7 + (1 - min(stock_left / 20, 1.0)) * 0.3
+
+    rng = random.Random(42)
+    tracker = UrgencyTracker(urgency_score)
+    now = datetime.now()
+    base = int(now.timestamp())
+    for i in range(100_000):
+        tracker.update(str(i), rng.randint(0, 200), base + rng.randint(0, 30) * SECONDS_PER_DAY, now)
+
+    start = time.perf_counter()
+    for _ in range(10_000):
+        tracker.update(str(rng.randrange(100_000)), stock_left=rng.randint(0, 200), now=now)
+    print(f"10k stock updates: {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    start = time.perf_counter()
+    top = tracker.most_urgent(20, now)
+    print(f"Top 20 read: {(time.perf_counter() - start) * 1000:.3f}ms")
+
+    start = time.perf_counter()
+    rescored = tracker.advance(now + timedelta(days=1))
+    print(f"Advance one day: {rescored} products re-scored in {(time.perf_counter() - start) * 1000:.1f}ms")
+    print(top[:5])
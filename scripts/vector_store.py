@@ -1,93 +1,256 @@
 import numpy as np
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import functools
 import json
 import pickle
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 import os
+import threading
+
+from pricing_rules import parse_expiry_dates
+from product_table import ProductTable
+from product_encoders import ProductEncoder, TfidfEncoder, create_encoder, encoder_from_config
+
+# Derived tier tokens. Tiers are stored per product as small integer columns
+# and only turned into text when a product's vector is (re-)encoded.
+PRICE_TIER_BOUNDS = [5, 15]
+PRICE_TIER_TOKENS = ['budget affordable cheap', 'moderate mid-range', 'premium expensive high-end']
+
+STOCK_TIER_BOUNDS = [20, 100]
+STOCK_TIER_TOKENS = ['low-stock urgent limited', 'moderate-stock available', 'high-stock abundant overstocked']
+
+# Bucket b holds products with days_to_expiry < EXPIRY_BUCKET_LIMITS[b] (i.e. <= 2, <= 7, later)
+EXPIRY_BUCKET_LIMITS = [3, 8]
+EXPIRY_BUCKET_TOKENS = ['urgent expiring soon clearance', 'short-term perishable', 'fresh long-lasting']
+NO_EXPIRY_BUCKET = -1
+
+SECONDS_PER_DAY = 86400
+MISSING_EXPIRY = np.iinfo(np.int64).max
+
+def _epoch_seconds(moment: datetime) -> int:
+    return int(np.datetime64(moment, 's').astype(np.int64))
+
+def _expiry_buckets(expiry_seconds: np.ndarray, now: datetime) -> np.ndarray:
+    """Expiry bucket per product, using timedelta.days flooring like the rest of the code"""
+    missing = expiry_seconds == MISSING_EXPIRY
+    days = np.floor_divide(np.where(missing, 0, expiry_seconds) - _epoch_seconds(now), SECONDS_PER_DAY)
+    buckets = np.digitize(days, EXPIRY_BUCKET_LIMITS).astype(np.int8)
+    buckets[missing] = NO_EXPIRY_BUCKET
+    return buckets
+
+def _synchronized(method):
+    """Run a store method under the store lock (the time tick mutates from its own thread)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 class ProductVectorStore:
-    def __init__(self, store_path="data/vector_store.pkl"):
+    def __init__(self, store_path="data/vector_store.pkl", encoder='tfidf'):
         self.store_path = store_path
-        self.vectorizer = TfidfVectorizer(
-            max_features=1000,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
+        # 'tfidf' refits on every reindex; 'hashing' and 'embedding' are
+        # stateless, so products can be added or updated without re-encoding
+        # the rest of the corpus. sklearn is only imported on first encode.
+        self.encoder = encoder if isinstance(encoder, ProductEncoder) else create_encoder(encoder)
         self.product_vectors = None
         self.product_index = {}
-        self.products_data = []
+        self.products_data = ProductTable()
         self.last_update = None
         
+        # Derived per-product columns, kept in step with products_data
+        self.price_tiers = np.zeros(0, dtype=np.int8)
+        self.stock_tiers = np.zeros(0, dtype=np.int8)
+        self.expiry_buckets = np.zeros(0, dtype=np.int8)
+        self.expiry_seconds = np.zeros(0, dtype=np.int64)
+        self._expiry_order = np.zeros(0, dtype=np.int64)
+        self._sorted_expiry = np.zeros(0, dtype=np.int64)
+        self.bucket_time = None  # Instant the expiry buckets were computed for
+        
+        # Bumped on every change to products or vectors; keys search result caches
+        self.index_version = 0
+        
+        # Guards products, vectors and derived columns against the time tick thread
+        self.lock = threading.RLock()
+        
     def create_product_features(self, product: Dict[str, Any]) -> str:
         """Create searchable text features from product data"""
+        columns = self._derive_columns(ProductTable.from_records([product]), datetime.now())
+        return self._compose_feature_text(product, columns['price_tiers'][0], columns['stock_tiers'][0],
+                                          columns['expiry_buckets'][0])
+    
+    def _compose_feature_text(self, product: Dict[str, Any], price_tier: int, stock_tier: int,
+                              expiry_bucket: int) -> str:
+        """Join name/category with the token text of precomputed tiers"""
         features = []
         
         # Product name and category
         if 'name' in product:
-            features.append(product['name'])
+            features.append(str(product['name']))
         if 'category' in product:
-            features.append(product['category'])
-        
-        # Price range categorization
-        price = float(product.get('current_price', 0))
-        if price < 5:
-            features.append('budget affordable cheap')
-        elif price < 15:
-            features.append('moderate mid-range')
+            features.append(str(product['category']))
+        
+        features.append(PRICE_TIER_TOKENS[price_tier])
+        features.append(STOCK_TIER_TOKENS[stock_tier])
+        if expiry_bucket != NO_EXPIRY_BUCKET:
+            features.append(EXPIRY_BUCKET_TOKENS[expiry_bucket])
+        
+        return ' '.join(features)
+    
+    def _feature_texts(self, indices) -> List[str]:
+        """Feature text for stored rows, built from the derived tier columns"""
+        return [
+            self._compose_feature_text(self.products_data[i], self.price_tiers[i], self.stock_tiers[i],
+                                       self.expiry_buckets[i])
+            for i in indices
+        ]
+    
+    def _derive_columns(self, products: ProductTable, now: datetime, indices=None) -> Dict[str, np.ndarray]:
+        """Vectorized price tier, stock tier and expiry bucket for table rows (all, or `indices`)"""
+        prices = products.numeric('current_price', 0, indices)
+        stocks = products.numeric('stock_left', 0, indices).astype(np.int64)
+        # Each distinct expiry date string is parsed once
+        expiry_dates = products.text_values('expiry_date', parse_expiry_dates, indices=indices)
+        
+        expiry_seconds = expiry_dates.astype(np.int64)
+        expiry_seconds[np.isnat(expiry_dates)] = MISSING_EXPIRY
+        
+        return {
+            'price_tiers': np.digitize(prices, PRICE_TIER_BOUNDS).astype(np.int8),
+            'stock_tiers': np.digitize(stocks, STOCK_TIER_BOUNDS).astype(np.int8),
+            'expiry_seconds': expiry_seconds,
+            'expiry_buckets': _expiry_buckets(expiry_seconds, now)
+        }
+    
+    def _set_derived_columns(self, columns: Dict[str, np.ndarray], indices=None, append: bool = False):
+        """Store derived columns for all rows, append new rows, or overwrite given rows"""
+        self.index_version += 1
+        start = len(self.expiry_seconds)
+        if indices is not None and not append:
+            indices = np.asarray(indices, dtype=np.int64)
+            previous_expiry = self.expiry_seconds[indices]
+        for name, values in columns.items():
+            if append:
+                setattr(self, name, np.concatenate([getattr(self, name), values]))
+            elif indices is None:
+                setattr(self, name, values)
+            else:
+                getattr(self, name)[indices] = values
+        
+        # Sorted expiry index used to find rows whose bucket changes over time;
+        # small changes are spliced in rather than re-sorting every row
+        if append:
+            changed = len(self.expiry_seconds) - start
         else:
-            features.append('premium expensive high-end')
-        
-        # Stock level categorization
-        stock = int(product.get('stock_left', 0))
-        if stock < 20:
-            features.append('low-stock urgent limited')
-        elif stock < 100:
-            features.append('moderate-stock available')
+            changed = len(self.expiry_seconds) if indices is None else len(indices)
+        if (indices is None and not append) or changed * 8 > len(self.expiry_seconds):
+            self._expiry_order = np.argsort(self.expiry_seconds, kind='stable')
+            self._sorted_expiry = self.expiry_seconds[self._expiry_order]
+        elif append:
+            self._insert_expiry_rows(np.arange(start, len(self.expiry_seconds)))
         else:
-            features.append('high-stock abundant overstocked')
+            self._remove_expiry_rows(indices, previous_expiry)
+            self._insert_expiry_rows(indices)
+    
+    def _remove_expiry_rows(self, indices: np.ndarray, expiry_seconds: np.ndarray):
+        """Drop rows from the sorted expiry index, located by their previous expiry"""
+        positions = []
+        for idx, seconds in zip(indices.tolist(), expiry_seconds.tolist()):
+            low = np.searchsorted(self._sorted_expiry, seconds, side='left')
+            high = np.searchsorted(self._sorted_expiry, seconds, side='right')
+            positions.append(low + int(np.flatnonzero(self._expiry_order[low:high] == idx)[0]))
+        self._expiry_order = np.delete(self._expiry_order, positions)
+        self._sorted_expiry = np.delete(self._sorted_expiry, positions)
+    
+    def _insert_expiry_rows(self, indices: np.ndarray):
+        """Insort rows into the sorted expiry index at their current expiry"""
+        seconds = self.expiry_seconds[indices]
+        by_expiry = np.argsort(seconds, kind='stable')
+        positions = np.searchsorted(self._sorted_expiry, seconds[by_expiry], side='right')
+        self._expiry_order = np.insert(self._expiry_order, positions, indices[by_expiry])
+        self._sorted_expiry = np.insert(self._sorted_expiry, positions, seconds[by_expiry])
+    
+    @_synchronized
+    def refresh_time_buckets(self, now: Optional[datetime] = None) -> int:
+        """Recompute expiry buckets that changed since the last tick
         
-        # Expiry urgency
-        if 'expiry_date' in product:
-            try:
-                expiry_date = pd.to_datetime(product['expiry_date'])
-                days_to_expiry = (expiry_date - pd.Timestamp.now()).days
-                
-                if days_to_expiry <= 2:
-                    features.append('urgent expiring soon clearance')
-                elif days_to_expiry <= 7:
-                    features.append('short-term perishable')
-                else:
-                    features.append('fresh long-lasting')
-            except:
-                pass
+        Only rows whose expiry falls in a window that crossed a bucket
+        boundary are examined and re-encoded. Returns the number of rows
+        whose vectors were refreshed.
+        """
+        if self.product_vectors is None or self.bucket_time is None:
+            return 0
         
-        return ' '.join(features)
+        now = now or datetime.now()
+        previous = _epoch_seconds(self.bucket_time)
+        current = _epoch_seconds(now)
+        
+        if current < previous:
+            # Clock moved backwards: fall back to checking every row
+            candidates = np.arange(len(self.products_data))
+        else:
+            windows = [
+                self._expiry_order[np.searchsorted(self._sorted_expiry, previous + limit * SECONDS_PER_DAY):
+                                   np.searchsorted(self._sorted_expiry, current + limit * SECONDS_PER_DAY)]
+                for limit in EXPIRY_BUCKET_LIMITS
+            ]
+            candidates = np.unique(np.concatenate(windows))
+        
+        self.bucket_time = now
+        if len(candidates) == 0:
+            return 0
+        
+        new_buckets = _expiry_buckets(self.expiry_seconds[candidates], now)
+        changed = candidates[new_buckets != self.expiry_buckets[candidates]]
+        if len(changed) == 0:
+            return 0
+        
+        self.expiry_buckets[changed] = new_buckets[new_buckets != self.expiry_buckets[candidates]]
+        self._replace_vectors(changed.tolist(), self.encoder.transform(self._feature_texts(changed)))
+        return int(len(changed))
     
+    def schedule_time_tick(self, interval_seconds: float = 600) -> threading.Event:
+        """Run refresh_time_buckets periodically on a daemon thread
+        
+        The refresh holds the store lock, so it never interleaves with
+        searches or upserts. Returns an event; set it to stop the ticker.
+        """
+        stop_event = threading.Event()
+        
+        def tick():
+            while not stop_event.wait(interval_seconds):
+                refreshed = self.refresh_time_buckets()
+                if refreshed:
+                    print(f"Refreshed expiry buckets for {refreshed} products")
+        
+        threading.Thread(target=tick, name='vector-store-time-tick', daemon=True).start()
+        return stop_event
+    
+    @_synchronized
     def index_products(self, products: List[Dict[str, Any]]):
         """Index products into the vector store"""
         print(f"Indexing {len(products)} products...")
         
-        # Store product data
+        # Store product data as typed columns
+        if not isinstance(products, ProductTable):
+            products = ProductTable.from_records(products)
         self.products_data = products
         
-        # Create feature text for each product
-        feature_texts = []
+        # Derive tier columns for the whole batch at once
+        self.bucket_time = datetime.now()
+        self._set_derived_columns(self._derive_columns(products, self.bucket_time))
+        
+        # Create index mapping
         self.product_index = {}
+        for i, product_id in enumerate(products.text_values('product_id').tolist()):
+            self.product_index[product_id if product_id is not None else f"product_{i}"] = i
         
-        for i, product in enumerate(products):
-            feature_text = self.create_product_features(product)
-            feature_texts.append(feature_text)
-            
-            # Create index mapping
-            product_id = product.get('product_id', f"product_{i}")
-            self.product_index[product_id] = i
+        # Create feature text for each product
+        feature_texts = self._feature_texts(range(len(products)))
         
-        # Create TF-IDF vectors
+        # Create product vectors
         if feature_texts:
-            self.product_vectors = self.vectorizer.fit_transform(feature_texts)
+            self.product_vectors = self.encoder.fit_transform(feature_texts)
             self.last_update = datetime.now()
             
             print(f"Vector store created with {self.product_vectors.shape[0]} products")
@@ -98,6 +261,7 @@ class ProductVectorStore:
         else:
             print("No products to index")
     
+    @_synchronized
     def search_products(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Search for products using vector similarity"""
         if self.product_vectors is None:
@@ -105,10 +269,10 @@ class ProductVectorStore:
             return []
         
         # Transform query to vector
-        query_vector = self.vectorizer.transform([query])
+        query_vector = self.encoder.transform([query])
         
         # Calculate similarities
-        similarities = cosine_similarity(query_vector, self.product_vectors).flatten()
+        similarities = self.encoder.similarity(query_vector, self.product_vectors).flatten()
         
         # Get top-k results
         top_indices = np.argsort(similarities)[::-1][:top_k]
@@ -116,12 +280,11 @@ class ProductVectorStore:
         results = []
         for idx in top_indices:
             if similarities[idx] > 0:  # Only return relevant results
-                product = self.products_data[idx].copy()
-                product['similarity_score'] = float(similarities[idx])
-                results.append(product)
+                results.append(self.products_data.record(idx, similarity_score=float(similarities[idx])))
         
         return results
     
+    @_synchronized
     def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get product by ID"""
         if product_id in self.product_index:
@@ -129,16 +292,17 @@ class ProductVectorStore:
             return self.products_data[idx]
         return None
     
+    @_synchronized
     def get_similar_products(self, product_id: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """Find similar products to a given product"""
         if product_id not in self.product_index:
             return []
         
         product_idx = self.product_index[product_id]
-        product_vector = self.product_vectors[product_idx]
+        product_vector = self.product_vectors[product_idx:product_idx + 1]
         
         # Calculate similarities with all other products
-        similarities = cosine_similarity(product_vector, self.product_vectors).flatten()
+        similarities = self.encoder.similarity(product_vector, self.product_vectors).flatten()
         
         # Exclude the product itself
         similarities[product_idx] = -1
@@ -149,67 +313,63 @@ class ProductVectorStore:
         results = []
         for idx in top_indices:
             if similarities[idx] > 0:
-                product = self.products_data[idx].copy()
-                product['similarity_score'] = float(similarities[idx])
-                results.append(product)
+                results.append(self.products_data.record(idx, similarity_score=float(similarities[idx])))
         
         return results
     
+    @_synchronized
     def get_products_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Get all products in a specific category"""
-        results = []
-        for product in self.products_data:
-            if product.get('category', '').lower() == category.lower():
-                results.append(product)
-        return results
+        # Compared once per distinct category rather than once per product
+        matches = self.products_data.text_values(
+            'category', lambda values: [(value or '').lower() == category.lower() for value in values])
+        return self.products_data.records(np.flatnonzero(matches))
     
+    @_synchronized
     def get_expiring_products(self, days_threshold: int = 7) -> List[Dict[str, Any]]:
         """Get products expiring within threshold days"""
+        # 0 <= days_to_expiry <= threshold is a contiguous range of the sorted expiry column
+        now = _epoch_seconds(datetime.now())
+        window = self._expiry_order[
+            np.searchsorted(self._sorted_expiry, now):
+            np.searchsorted(self._sorted_expiry, now + (days_threshold + 1) * SECONDS_PER_DAY)
+        ]
+        
+        # Sort by expiry urgency, keeping catalog order within a day
+        indices = np.sort(window)
+        days = (self.expiry_seconds[indices] - now) // SECONDS_PER_DAY
+        
         results = []
-        current_date = pd.Timestamp.now()
-        
-        for product in self.products_data:
-            if 'expiry_date' in product:
-                try:
-                    expiry_date = pd.to_datetime(product['expiry_date'])
-                    days_to_expiry = (expiry_date - current_date).days
-                    
-                    if 0 <= days_to_expiry <= days_threshold:
-                        product_copy = product.copy()
-                        product_copy['days_to_expiry'] = days_to_expiry
-                        results.append(product_copy)
-                except:
-                    continue
-        
-        # Sort by expiry urgency
-        results.sort(key=lambda x: x.get('days_to_expiry', 999))
+        for idx, days_to_expiry in zip(indices[np.argsort(days, kind='stable')], np.sort(days, kind='stable')):
+            results.append(self.products_data.record(idx, days_to_expiry=int(days_to_expiry)))
         return results
     
+    @_synchronized
     def get_low_stock_products(self, stock_threshold: int = 20) -> List[Dict[str, Any]]:
         """Get products with low stock levels"""
-        results = []
-        for product in self.products_data:
-            stock = int(product.get('stock_left', 0))
-            if stock <= stock_threshold:
-                product_copy = product.copy()
-                product_copy['stock_urgency'] = 'critical' if stock < 5 else 'low'
-                results.append(product_copy)
+        stock = self.products_data.numeric('stock_left', 0).astype(np.int64)
+        low = np.flatnonzero(stock <= stock_threshold)
         
         # Sort by stock level (lowest first)
-        results.sort(key=lambda x: int(x.get('stock_left', 0)))
-        return results
+        low = low[np.argsort(stock[low], kind='stable')]
+        return [self.products_data.record(idx, stock_urgency='critical' if stock[idx] < 5 else 'low') for idx in low]
     
+    @_synchronized
     def save_store(self):
         """Save vector store to disk"""
         try:
             os.makedirs(os.path.dirname(self.store_path), exist_ok=True)
             
             store_data = {
-                'vectorizer': self.vectorizer,
+                # Stateless encoders are rebuilt from their config, so only a
+                # fitted TF-IDF vocabulary is ever pickled with the vectors
+                'encoder_config': self.encoder.get_config(),
+                'encoder': None if self.encoder.stateless else self.encoder,
                 'product_vectors': self.product_vectors,
                 'product_index': self.product_index,
                 'products_data': self.products_data,
-                'last_update': self.last_update
+                'last_update': self.last_update,
+                'bucket_time': self.bucket_time
             }
             
             with open(self.store_path, 'wb') as f:
@@ -219,6 +379,7 @@ class ProductVectorStore:
         except Exception as e:
             print(f"Error saving vector store: {e}")
     
+    @_synchronized
     def load_store(self) -> bool:
         """Load vector store from disk"""
         try:
@@ -226,64 +387,183 @@ class ProductVectorStore:
                 with open(self.store_path, 'rb') as f:
                     store_data = pickle.load(f)
                 
-                self.vectorizer = store_data['vectorizer']
+                if 'vectorizer' in store_data:
+                    # Stores saved before pluggable encoders
+                    self.encoder = TfidfEncoder(vectorizer=store_data['vectorizer'])
+                elif store_data.get('encoder') is not None:
+                    self.encoder = store_data['encoder']
+                else:
+                    # A custom embed_fn can only come from the encoder this store was built with
+                    self.encoder = encoder_from_config(store_data['encoder_config'],
+                                                       embed_fn=getattr(self.encoder, 'embed_fn', None))
                 self.product_vectors = store_data['product_vectors']
                 self.product_index = store_data['product_index']
                 self.products_data = store_data['products_data']
+                if not isinstance(self.products_data, ProductTable):
+                    # Stores saved with a list of dict records
+                    self.products_data = ProductTable.from_records(self.products_data)
                 self.last_update = store_data['last_update']
                 
+                # Rebuild derived columns as of the saved tick, then bring any
+                # expiry buckets that went stale on disk up to date
+                self.bucket_time = store_data.get('bucket_time') or self.last_update or datetime.now()
+                self._set_derived_columns(self._derive_columns(self.products_data, self.bucket_time))
+                refreshed = self.refresh_time_buckets()
+                
                 print(f"Vector store loaded from {self.store_path}")
                 print(f"Last updated: {self.last_update}")
                 print(f"Products indexed: {len(self.products_data)}")
+                if refreshed:
+                    print(f"Refreshed expiry buckets for {refreshed} products")
                 return True
         except Exception as e:
             print(f"Error loading vector store: {e}")
         
         return False
     
+    def _stack_vectors(self, new_vectors):
+        """Append encoded rows to the vector matrix"""
+        if self.product_vectors is None:
+            return new_vectors
+        if self.encoder.dense:
+            return np.vstack([self.product_vectors, new_vectors])
+        
+        from scipy.sparse import vstack
+        return vstack([self.product_vectors, new_vectors], format='csr')
+    
+    def _replace_vectors(self, indices: List[int], new_vectors):
+        """Overwrite the vectors of existing rows in place"""
+        self.index_version += 1
+        if self.encoder.dense:
+            self.product_vectors[indices] = new_vectors
+        else:
+            # Append the new rows, then gather rows back into place: O(nnz), no LIL round-trip
+            from scipy.sparse import vstack
+            order = np.arange(self.product_vectors.shape[0])
+            order[np.asarray(indices)] = order.size + np.arange(len(indices))
+            stacked = vstack([self.product_vectors, new_vectors], format='csr')
+            self.product_vectors = stacked[order]
+    
+    @_synchronized
+    def add_products(self, products: List[Dict[str, Any]]):
+        """Add products, encoding only the new rows when the encoder is stateless
+        
+        Products whose product_id is already stored (or repeated in the batch)
+        are merged through upsert_products instead of adding a second row.
+        """
+        if not products:
+            return
+        product_ids = [product.get('product_id') for product in products if product.get('product_id') is not None]
+        if len(set(product_ids)) < len(product_ids) or any(pid in self.product_index for pid in product_ids):
+            self.upsert_products(products)
+            return
+        start = len(self.products_data)
+        self.products_data.extend(products)
+        if not self.encoder.stateless:
+            # TF-IDF vocabulary depends on the whole corpus
+            self.index_products(self.products_data)
+            return
+        
+        added = np.arange(start, len(self.products_data))
+        for idx, product_id in zip(added.tolist(), self.products_data.text_values('product_id', indices=added).tolist()):
+            self.product_index[product_id if product_id is not None else f"product_{idx}"] = idx
+        columns = self._derive_columns(self.products_data, self.bucket_time or datetime.now(), added)
+        self._set_derived_columns(columns, append=True)
+        
+        feature_texts = self._feature_texts(range(start, len(self.products_data)))
+        self.product_vectors = self._stack_vectors(self.encoder.transform(feature_texts))
+        self.last_update = datetime.now()
+        print(f"Added {len(products)} products (total {len(self.products_data)})")
+    
+    @_synchronized
     def update_product(self, product_id: str, updated_data: Dict[str, Any]):
         """Update a single product in the vector store"""
         if product_id in self.product_index:
             idx = self.product_index[product_id]
-            self.products_data[idx].update(updated_data)
+            self.products_data.update_row(idx, updated_data)
             
-            # Re-index all products (in production, this could be optimized)
-            self.index_products(self.products_data)
+            if self.encoder.stateless:
+                # Only this product's tiers and vector change
+                columns = self._derive_columns(self.products_data, self.bucket_time or datetime.now(), [idx])
+                self._set_derived_columns(columns, indices=[idx])
+                self._replace_vectors([idx], self.encoder.transform(self._feature_texts([idx])))
+                self.last_update = datetime.now()
+            else:
+                # TF-IDF must be refit over the whole corpus
+                self.index_products(self.products_data)
             print(f"Updated product {product_id}")
         else:
             print(f"Product {product_id} not found in vector store")
     
+    @_synchronized
+    def upsert_products(self, products: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Bulk insert-or-update by product_id with one encode per batch"""
+        existing, new = [], []
+        new_positions = {}
+        for product in products:
+            product_id = product.get('product_id')
+            idx = self.product_index.get(product_id)
+            if idx is not None:
+                self.products_data.update_row(idx, product)
+                existing.append(idx)
+            elif product_id is not None and product_id in new_positions:
+                # Repeated new ID within the batch: later fields win, one row is added
+                merged = dict(new[new_positions[product_id]])
+                merged.update(product)
+                new[new_positions[product_id]] = merged
+            else:
+                if product_id is not None:
+                    new_positions[product_id] = len(new)
+                new.append(product)
+        existing = sorted(set(existing))
+        
+        if not self.encoder.stateless or self.product_vectors is None:
+            # TF-IDF (or an empty store) needs one full index over the merged corpus
+            if existing or new:
+                self.products_data.extend(new)
+                self.index_products(self.products_data)
+            return {'updated': len(existing), 'added': len(new)}
+        
+        if existing:
+            columns = self._derive_columns(self.products_data, self.bucket_time or datetime.now(), existing)
+            self._set_derived_columns(columns, indices=existing)
+            self._replace_vectors(existing, self.encoder.transform(self._feature_texts(existing)))
+            self.last_update = datetime.now()
+        if new:
+            self.add_products(new)
+        return {'updated': len(existing), 'added': len(new)}
+    
+    def vector_memory_bytes(self) -> int:
+        """Memory held by the product vector matrix"""
+        if self.product_vectors is None:
+            return 0
+        if self.encoder.dense:
+            return int(self.product_vectors.nbytes)
+        vectors = self.product_vectors
+        return int(vectors.data.nbytes + vectors.indices.nbytes + vectors.indptr.nbytes)
+    
+    @_synchronized
     def get_analytics(self) -> Dict[str, Any]:
         """Get analytics about the vector store"""
         if not self.products_data:
             return {}
         
-        # Category distribution
-        categories = {}
-        total_stock = 0
-        total_value = 0
-        expiring_soon = 0
+        # Category distribution, in order of first appearance
+        category_names, first, counts = np.unique(self.products_data.text_values('category', missing='Unknown'),
+                                                  return_index=True, return_counts=True)
+        order = np.argsort(first)
+        categories = dict(zip(category_names[order].tolist(), counts[order].tolist()))
         
-        for product in self.products_data:
-            # Category count
-            category = product.get('category', 'Unknown')
-            categories[category] = categories.get(category, 0) + 1
-            
-            # Stock and value
-            stock = int(product.get('stock_left', 0))
-            price = float(product.get('current_price', 0))
-            total_stock += stock
-            total_value += stock * price
-            
-            # Expiring products
-            if 'expiry_date' in product:
-                try:
-                    expiry_date = pd.to_datetime(product['expiry_date'])
-                    days_to_expiry = (expiry_date - pd.Timestamp.now()).days
-                    if days_to_expiry <= 7:
-                        expiring_soon += 1
-                except:
-                    pass
+        # Stock and value
+        stock = self.products_data.numeric('stock_left', 0).astype(np.int64)
+        prices = self.products_data.numeric('current_price', 0)
+        total_stock = int(stock.sum())
+        total_value = float((stock * prices).sum())
+        
+        # Expiring (or expired) products, from the derived expiry column
+        has_expiry = self.expiry_seconds != MISSING_EXPIRY
+        days_to_expiry = (self.expiry_seconds[has_expiry] - _epoch_seconds(datetime.now())) // SECONDS_PER_DAY
+        expiring_soon = int(np.count_nonzero(days_to_expiry <= 7))
         
         return {
             'total_products': len(self.products_data),
@@ -291,18 +571,35 @@ class ProductVectorStore:
             'total_stock_units': total_stock,
             'total_inventory_value': round(total_value, 2),
             'products_expiring_soon': expiring_soon,
+            'encoder': self.encoder.name,
+            'vector_memory_bytes': self.vector_memory_bytes(),
             'last_update': self.last_update.isoformat() if self.last_update else None
         }
 
-# Global vector store instance
-vector_store = ProductVectorStore()
+# Global vector store instance, created on first access
+_vector_store = None
+
+def get_vector_store() -> ProductVectorStore:
+    """Return the shared vector store, constructing it on first use"""
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = ProductVectorStore()
+    return _vector_store
+
+def __getattr__(name):
+    # Keep `from vector_store import vector_store` working without
+    # constructing the instance at import time.
+    if name == 'vector_store':
+        return get_vector_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def initialize_vector_store_from_csv(csv_path="public/data/grocery-inventory.csv"):
     """Initialize vector store from CSV data"""
+    from inventory_schema import load_inventory_records
+    
     try:
-        df = pd.read_csv(csv_path)
-        products = df.to_dict('records')
-        vector_store.index_products(products)
+        products = load_inventory_records(csv_path)
+        get_vector_store().index_products(products)
         return True
     except Exception as e:
         print(f"Error initializing vector store from CSV: {e}")
@@ -311,6 +608,7 @@ def initialize_vector_store_from_csv(csv_path="public/data/grocery-inventory.csv
 if __name__ == "__main__":
     # Test the vector store
     print("Testing Product Vector Store...")
+    vector_store = get_vector_store()
     
     # Initialize with sample data
     sample_products = [